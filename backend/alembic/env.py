@@ -3,14 +3,15 @@ from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 from alembic import context
 from app.config import settings
+from app.database import sync_database_url
 from app.models import Base
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
 
-# Override the sqlalchemy.url with our settings
-config.set_main_option("sqlalchemy.url", settings.database_url)
+# Override the sqlalchemy.url with our settings (migrations run on a sync driver)
+config.set_main_option("sqlalchemy.url", sync_database_url(settings.database_url))
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
@@ -28,7 +29,7 @@ target_metadata = Base.metadata
 
 def get_url():
     """Get database URL from settings"""
-    return settings.database_url
+    return sync_database_url(settings.database_url)
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
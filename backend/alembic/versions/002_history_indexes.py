@@ -0,0 +1,54 @@
+"""History indexes for per-user listings
+
+Revision ID: 002
+Revises: 001
+Create Date: 2024-06-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+HISTORY_TABLES = ('search_history', 'image_history')
+
+
+def upgrade() -> None:
+    is_postgres = op.get_bind().dialect.name == 'postgresql'
+
+    # CONCURRENTLY keeps the tables writable while the indexes build, but it
+    # cannot run inside the migration transaction
+    with op.get_context().autocommit_block():
+        for table in HISTORY_TABLES:
+            # Serves every dashboard listing: WHERE user_id = ? ORDER BY timestamp DESC, id DESC
+            op.create_index(
+                f'ix_{table}_user_timestamp',
+                table,
+                ['user_id', sa.text('timestamp DESC'), sa.text('id DESC')],
+                unique=False,
+                postgresql_concurrently=True,
+            )
+            if is_postgres:
+                # Rows are appended in time order, so a tiny BRIN index covers time-range scans
+                op.create_index(
+                    f'ix_{table}_timestamp_brin',
+                    table,
+                    ['timestamp'],
+                    unique=False,
+                    postgresql_using='brin',
+                    postgresql_concurrently=True,
+                )
+
+
+def downgrade() -> None:
+    is_postgres = op.get_bind().dialect.name == 'postgresql'
+
+    with op.get_context().autocommit_block():
+        for table in reversed(HISTORY_TABLES):
+            if is_postgres:
+                op.drop_index(f'ix_{table}_timestamp_brin', table_name=table, postgresql_concurrently=True)
+            op.drop_index(f'ix_{table}_user_timestamp', table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,72 @@
+"""Search listing summary columns
+
+Revision ID: 003
+Revises: 002
+Create Date: 2024-06-15 00:00:00.000000
+
+"""
+import json
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+search_history = sa.table(
+    'search_history',
+    sa.column('id', sa.Integer),
+    sa.column('results', sa.Text),
+    sa.column('result_count', sa.Integer),
+    sa.column('first_title', sa.String),
+)
+
+
+def summarize(results_json):
+    try:
+        results = json.loads(results_json)
+    except (TypeError, ValueError):
+        return None, None
+    if not isinstance(results, list):
+        return None, None
+    first = results[0] if results and isinstance(results[0], dict) else {}
+    title = first.get('title')
+    return len(results), title[:1000] if title else None
+
+
+def upgrade() -> None:
+    op.add_column('search_history', sa.Column('result_count', sa.Integer(), nullable=True))
+    op.add_column('search_history', sa.Column('first_title', sa.String(length=1000), nullable=True))
+
+    # Backfill in id-ordered batches so no single statement rewrites the whole table
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(search_history.c.id, search_history.c.results)
+            .where(search_history.c.id > last_id)
+            .order_by(search_history.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        updates = []
+        for row in rows:
+            count, title = summarize(row.results)
+            updates.append({'row_id': row.id, 'result_count': count, 'first_title': title})
+        bind.execute(
+            search_history.update()
+            .where(search_history.c.id == sa.bindparam('row_id'))
+            .values(result_count=sa.bindparam('result_count'), first_title=sa.bindparam('first_title')),
+            updates,
+        )
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    op.drop_column('search_history', 'first_title')
+    op.drop_column('search_history', 'result_count')
@@ -0,0 +1,94 @@
+"""Content-addressed search result storage
+
+Revision ID: 004
+Revises: 003
+Create Date: 2024-07-01 00:00:00.000000
+
+"""
+import hashlib
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql, sqlite
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+search_results = sa.table(
+    'search_results',
+    sa.column('hash', sa.String),
+    sa.column('results', sa.Text),
+)
+
+search_history = sa.table(
+    'search_history',
+    sa.column('id', sa.Integer),
+    sa.column('results', sa.Text),
+    sa.column('results_hash', sa.String),
+)
+
+
+def upgrade() -> None:
+    op.create_table('search_results',
+        sa.Column('hash', sa.String(length=64), nullable=False),
+        sa.Column('results', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('hash')
+    )
+    with op.batch_alter_table('search_history') as batch_op:
+        batch_op.add_column(sa.Column('results_hash', sa.String(length=64), nullable=True))
+        batch_op.create_foreign_key('fk_search_history_results_hash', 'search_results', ['results_hash'], ['hash'])
+        batch_op.alter_column('results', existing_type=sa.Text(), nullable=True)
+
+    # Move inline blobs into search_results, one id-ordered batch at a time
+    bind = op.get_bind()
+    dialect_insert = postgresql.insert if bind.dialect.name == 'postgresql' else sqlite.insert
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(search_history.c.id, search_history.c.results)
+            .where(search_history.c.id > last_id, search_history.c.results.isnot(None))
+            .order_by(search_history.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        blobs = {}
+        updates = []
+        for row in rows:
+            digest = hashlib.sha256(row.results.encode()).hexdigest()
+            blobs[digest] = row.results
+            updates.append({'row_id': row.id, 'digest': digest})
+        bind.execute(
+            dialect_insert(search_results)
+            .values([{'hash': digest, 'results': results} for digest, results in blobs.items()])
+            .on_conflict_do_nothing(index_elements=['hash'])
+        )
+        bind.execute(
+            search_history.update()
+            .where(search_history.c.id == sa.bindparam('row_id'))
+            .values(results_hash=sa.bindparam('digest'), results=None),
+            updates,
+        )
+        last_id = rows[-1].id
+    # Postgres only returns the freed space to the OS after VACUUM FULL / pg_repack
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    bind.execute(
+        search_history.update()
+        .where(search_history.c.results.is_(None))
+        .values(results=sa.select(search_results.c.results)
+                .where(search_results.c.hash == search_history.c.results_hash)
+                .scalar_subquery())
+    )
+    with op.batch_alter_table('search_history') as batch_op:
+        batch_op.alter_column('results', existing_type=sa.Text(), nullable=False)
+        batch_op.drop_constraint('fk_search_history_results_hash', type_='foreignkey')
+        batch_op.drop_column('results_hash')
+    op.drop_table('search_results')
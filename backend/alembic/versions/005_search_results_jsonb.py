@@ -0,0 +1,25 @@
+"""Store shared search results as JSONB on Postgres
+
+Revision ID: 005
+Revises: 004
+Create Date: 2024-07-15 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # SQLite keeps TEXT; the application type reads and writes strings either way
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('ALTER TABLE search_results ALTER COLUMN results TYPE JSONB USING results::jsonb')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('ALTER TABLE search_results ALTER COLUMN results TYPE TEXT USING results::text')
@@ -0,0 +1,60 @@
+"""History change log for incremental dashboard sync
+
+Revision ID: 006
+Revises: 005
+Create Date: 2024-08-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+history_changes = sa.table(
+    'history_changes',
+    sa.column('user_id', sa.Integer),
+    sa.column('kind', sa.String),
+    sa.column('entry_id', sa.Integer),
+    sa.column('op', sa.String),
+    sa.column('created_at', sa.DateTime),
+)
+
+
+def upgrade() -> None:
+    op.create_table('history_changes',
+        sa.Column('seq', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=10), nullable=False),
+        sa.Column('entry_id', sa.Integer(), nullable=False),
+        sa.Column('op', sa.String(length=10), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('seq')
+    )
+    op.create_index('ix_history_changes_user_seq', 'history_changes', ['user_id', 'seq'], unique=False)
+
+    # Existing entries enter the log as upserts in timeline order, so a client
+    # syncing from 0 receives the full history
+    existing = sa.union_all(*(
+        sa.select(
+            sa.column('user_id'),
+            sa.literal_column(f"'{kind}'").label('kind'),
+            sa.column('id').label('entry_id'),
+            sa.literal_column("'upsert'").label('op'),
+            sa.column('timestamp').label('created_at'),
+        ).select_from(sa.table(table))
+        for kind, table in (('search', 'search_history'), ('image', 'image_history'))
+    )).subquery()
+    op.execute(history_changes.insert().from_select(
+        ['user_id', 'kind', 'entry_id', 'op', 'created_at'],
+        sa.select(existing).order_by(existing.c.created_at, existing.c.entry_id),
+    ))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_history_changes_user_seq', table_name='history_changes')
+    op.drop_table('history_changes')
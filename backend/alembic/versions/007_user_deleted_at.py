@@ -0,0 +1,26 @@
+"""Deleted-at marker on users
+
+Revision ID: 007
+Revises: 006
+Create Date: 2024-10-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+    deleted = sa.text('deleted_at IS NOT NULL')
+    op.create_index('ix_users_deleted', 'users', ['id'], sqlite_where=deleted, postgresql_where=deleted)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_deleted', table_name='users')
+    op.drop_column('users', 'deleted_at')
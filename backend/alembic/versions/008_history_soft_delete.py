@@ -0,0 +1,78 @@
+"""Soft-delete tombstones on history tables
+
+Revision ID: 008
+Revises: 007
+Create Date: 2024-10-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+HISTORY_TABLES = ('search_history', 'image_history')
+LIVE = sa.text('deleted_at IS NULL')
+TOMBSTONED = sa.text('deleted_at IS NOT NULL')
+
+
+def create_listing_index(table, name, where=None):
+    op.create_index(
+        name,
+        table,
+        ['user_id', sa.text('timestamp DESC'), sa.text('id DESC')],
+        unique=False,
+        sqlite_where=where,
+        postgresql_where=where,
+        postgresql_concurrently=True,
+    )
+
+
+def replace_listing_index(table, where=None):
+    """Swap the listing index for one with a different predicate, never leaving the table without one"""
+    name = f'ix_{table}_user_timestamp'
+    if op.get_bind().dialect.name == 'postgresql':
+        create_listing_index(table, f'{name}_new', where)
+        op.drop_index(name, table_name=table, postgresql_concurrently=True)
+        op.execute(f'ALTER INDEX {name}_new RENAME TO {name}')
+    else:
+        op.drop_index(name, table_name=table)
+        create_listing_index(table, name, where)
+
+
+def upgrade() -> None:
+    for table in HISTORY_TABLES:
+        op.add_column(table, sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+
+    # CONCURRENTLY keeps the tables writable while the indexes build
+    with op.get_context().autocommit_block():
+        for table in HISTORY_TABLES:
+            # Listings only ever read live rows, so tombstones stay out of their index
+            replace_listing_index(table, LIVE)
+            # Compaction walks tombstones oldest first
+            op.create_index(
+                f'ix_{table}_deleted',
+                table,
+                ['deleted_at'],
+                unique=False,
+                sqlite_where=TOMBSTONED,
+                postgresql_where=TOMBSTONED,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    # Tombstoned rows would reappear in listings without the column
+    for table in HISTORY_TABLES:
+        op.execute(f'DELETE FROM {table} WHERE deleted_at IS NOT NULL')
+
+    with op.get_context().autocommit_block():
+        for table in reversed(HISTORY_TABLES):
+            op.drop_index(f'ix_{table}_deleted', table_name=table, postgresql_concurrently=True)
+            replace_listing_index(table)
+
+    for table in reversed(HISTORY_TABLES):
+        op.drop_column(table, 'deleted_at')
@@ -0,0 +1,36 @@
+"""Support for sweeping unreferenced search results
+
+Revision ID: 009
+Revises: 008
+Create Date: 2024-10-20 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Left NULL on existing rows; the sweep treats those as long unused
+    op.add_column('search_results', sa.Column('used_at', sa.DateTime(timezone=True), nullable=True))
+
+    # The sweep probes search_history by hash for every candidate blob
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_search_history_results_hash',
+            'search_history',
+            ['results_hash'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_search_history_results_hash', table_name='search_history', postgresql_concurrently=True)
+    op.drop_column('search_results', 'used_at')
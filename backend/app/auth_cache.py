@@ -0,0 +1,85 @@
+import hashlib
+import time
+from typing import Optional
+from sqlalchemy import event, inspect
+from app.cache import TTLCache
+from app.config import settings
+from app.models import User
+from app.schemas import CurrentUser
+
+
+class PrincipalCache:
+    """Caches verified bearer tokens and the users they resolve to.
+
+    Tokens are keyed by their SHA-256 digest (the raw JWT is never stored) and
+    map to a username until the token's own ``exp``; usernames map to an
+    immutable ``CurrentUser``. On a warm cache an authenticated request needs
+    neither a JWT decode nor a users query. Entries for a user are dropped
+    whenever that user row is updated or deleted.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60.0):
+        self._tokens = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._users = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def token_digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get_username(self, token: str) -> Optional[str]:
+        entry = self._tokens.get(self.token_digest(token))
+        if entry is None:
+            return None
+        username, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            self._tokens.pop(self.token_digest(token))
+            return None
+        return username
+
+    def remember_token(self, token: str, username: str, expires_at: Optional[float]):
+        ttl = self._tokens.ttl
+        if expires_at is not None:
+            ttl = min(ttl, expires_at - time.time())
+        if ttl > 0:
+            self._tokens.set(self.token_digest(token), (username, expires_at), ttl=ttl)
+
+    def get_user(self, username: str) -> Optional[CurrentUser]:
+        return self._users.get(username)
+
+    def remember_user(self, user: CurrentUser):
+        self._users.set(user.username, user)
+
+    def invalidate_user(self, username: Optional[str] = None, user_id: Optional[int] = None):
+        """Forget a user (by name or id) and every token that resolved to them"""
+        usernames = {username} if username is not None else set()
+        if user_id is not None:
+            usernames.update(name for name, cached in self._users.items() if cached.id == user_id)
+        for name in usernames:
+            self._users.pop(name)
+        if usernames:
+            self._tokens.discard_where(lambda _, entry: entry[0] in usernames)
+
+    def clear(self):
+        self._tokens.clear()
+        self._users.clear()
+
+    def stats(self) -> dict:
+        return {"tokens": self._tokens.stats(), "users": self._users.stats()}
+
+
+principal_cache = PrincipalCache(
+    maxsize=settings.auth_cache_max_entries,
+    ttl=settings.auth_cache_ttl_seconds,
+)
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_updated_user(mapper, connection, target):
+    history = inspect(target).attrs.username.history
+    for username in list(history.deleted or []) + [target.username]:
+        principal_cache.invalidate_user(username=username)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target):
+    principal_cache.invalidate_user(username=target.username)
@@ -0,0 +1,240 @@
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Annotated, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from pydantic import Field, TypeAdapter, ValidationError
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.change_log import CHANGE_UPSERT, log_changes
+from app.models import ImageHistory, SearchHistory, User
+from app.recent_activity import HISTORY_KINDS, recent_activity
+from app.results_store import store_statement, results_digest
+from app.schemas import ImageImportRecord, ImportLineError, ImportReport, SearchImportRecord
+from app.search_backend import summarize_results
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IMPORT_CHUNK_SIZE = 1000
+MAX_IMPORT_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+MAX_IMPORT_LINE_BYTES = 1024 * 1024
+
+import_record = TypeAdapter(Annotated[Union[SearchImportRecord, ImageImportRecord], Field(discriminator="type")])
+
+HISTORY_COLUMNS = {
+    SearchHistory: ["user_id", "query", "results_hash", "result_count", "first_title", "timestamp"],
+    ImageHistory: ["user_id", "prompt", "image_url", "timestamp"],
+}
+
+
+async def ndjson_lines(stream: AsyncIterator[bytes], max_line_bytes: int = MAX_IMPORT_LINE_BYTES) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """Complete lines of an NDJSON byte stream with their 1-based numbers; blank lines are skipped.
+
+    A line longer than ``max_line_bytes`` is discarded as it streams past and
+    comes back as ``None``, so one runaway line can't grow the buffer without
+    bound. Each chunk is scanned once, however many chunks a line spans.
+    """
+    pending = bytearray()
+    too_long = False
+    number = 0
+    async for data in stream:
+        start = 0
+        while True:
+            end = data.find(b"\n", start)
+            if end < 0:
+                break
+            number += 1
+            if too_long or len(pending) + end - start > max_line_bytes:
+                yield number, None
+            else:
+                pending += data[start:end]
+                if pending.strip():
+                    yield number, bytes(pending)
+            pending.clear()
+            too_long = False
+            start = end + 1
+        if not too_long:
+            pending += data[start:]
+            if len(pending) > max_line_bytes:
+                pending.clear()
+                too_long = True
+    if too_long:
+        yield number + 1, None
+    elif pending.strip():
+        yield number + 1, bytes(pending)
+
+
+def first_error(e: ValidationError) -> str:
+    error = e.errors()[0]
+    location = ".".join(str(part) for part in error["loc"])
+    return f"{location}: {error['msg']}" if location else error["msg"]
+
+
+async def copy_rows(db: AsyncSession, model, rows: List[dict]) -> List[int]:
+    """Write rows with Postgres ``COPY``; ids are reserved from the table's sequence up front"""
+    table = model.__tablename__
+    columns = HISTORY_COLUMNS[model]
+    ids = (await db.execute(
+        text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)"),
+        {"table": table, "count": len(rows)},
+    )).scalars().all()
+    connection = await (await db.connection()).get_raw_connection()
+    await connection.driver_connection.copy_records_to_table(
+        table,
+        columns=["id", *columns],
+        records=[(new_id, *(row[column] for column in columns)) for new_id, row in zip(ids, rows)],
+    )
+    return list(ids)
+
+
+async def insert_rows(db: AsyncSession, model, rows: List[dict]) -> List[int]:
+    """Write rows with one executemany ``INSERT ... RETURNING`` (batched multi-row VALUES)"""
+    result = await db.execute(insert(model).returning(model.id, sort_by_parameter_order=True), rows)
+    return list(result.scalars().all())
+
+
+class HistoryImporter:
+    """Loads NDJSON history records in chunks, one transaction per chunk.
+
+    Every line is validated on its own; bad lines are reported and skipped
+    while the rest of their chunk is written. A chunk that fails in the
+    database is rolled back and reported as a whole, and the import carries on
+    with the next one. Rows go in with ``COPY`` on Postgres and batched
+    ``INSERT ... RETURNING`` elsewhere, and are added to the change log like
+    any other history write.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker, chunk_size: int = DEFAULT_IMPORT_CHUNK_SIZE):
+        self.session_factory = session_factory
+        self.chunk_size = chunk_size
+        self.method = "insert"
+        self.lines = 0
+        self.counts = {"search": 0, "image": 0}
+        self.failed = 0
+        self.chunks = 0
+        self.errors: List[ImportLineError] = []
+        self.errors_truncated = False
+
+    def _error(self, chunk: int, line, error: str):
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(ImportLineError(chunk=chunk, line=line, error=error))
+        else:
+            self.errors_truncated = True
+
+    async def run(self, lines: AsyncIterator[Tuple[int, bytes]]) -> ImportReport:
+        started = time.perf_counter()
+        chunk = []
+        async for line in lines:
+            chunk.append(line)
+            if len(chunk) >= self.chunk_size:
+                await self._import_chunk(chunk)
+                chunk = []
+        if chunk:
+            await self._import_chunk(chunk)
+
+        elapsed = time.perf_counter() - started
+        imported = sum(self.counts.values())
+        logger.info(f"Imported {imported} history rows from {self.lines} lines in {elapsed:.2f}s ({self.failed} failed)")
+        return ImportReport(
+            method=self.method,
+            lines=self.lines,
+            imported=imported,
+            searches=self.counts["search"],
+            images=self.counts["image"],
+            failed=self.failed,
+            chunks=self.chunks,
+            elapsed_seconds=round(elapsed, 3),
+            rows_per_second=round(imported / elapsed, 1) if elapsed > 0 else 0.0,
+            errors=self.errors,
+            errors_truncated=self.errors_truncated,
+        )
+
+    async def _import_chunk(self, lines: List[Tuple[int, bytes]]):
+        self.chunks += 1
+        self.lines += len(lines)
+        number = self.chunks
+        records = []
+        for line_number, raw in lines:
+            if raw is None:
+                self.failed += 1
+                self._error(number, line_number, f"line exceeds {MAX_IMPORT_LINE_BYTES} bytes")
+                continue
+            try:
+                records.append((line_number, import_record.validate_json(raw)))
+            except ValidationError as e:
+                self.failed += 1
+                self._error(number, line_number, first_error(e))
+        if not records:
+            return
+
+        valid = []
+        unknown = 0
+        try:
+            async with self.session_factory() as db:
+                async with db.begin():
+                    user_ids = {record.user_id for _, record in records}
+                    known = set((await db.execute(
+                        select(User.id).where(User.id.in_(user_ids), User.deleted_at.is_(None))
+                    )).scalars().all())
+                    for line_number, record in records:
+                        if record.user_id in known:
+                            valid.append(record)
+                        else:
+                            unknown += 1
+                            self.failed += 1
+                            self._error(number, line_number, f"user_id: unknown user {record.user_id}")
+                    written = await self._write(db, valid)
+        except Exception as e:
+            logger.error(f"Import chunk {number} rolled back: {e}")
+            # Unknown-user records were already counted as they were found
+            self.failed += len(records) - unknown
+            self._error(number, None, f"chunk rolled back: {e}")
+            return
+
+        for kind, count in written.items():
+            self.counts[kind] += count
+        for user_id in {record.user_id for record in valid}:
+            recent_activity.forget(user_id)
+
+    async def _write(self, db: AsyncSession, records) -> Dict[str, int]:
+        use_copy = db.get_bind().dialect.name == "postgresql"
+        self.method = "copy" if use_copy else "insert"
+        now = datetime.now(timezone.utc)
+        blobs = {}
+        rows = {SearchHistory: [], ImageHistory: []}
+        for record in records:
+            timestamp = record.timestamp or now
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.replace(tzinfo=timezone.utc)
+            if record.type == "search":
+                results_json = json.dumps(record.results)
+                digest = results_digest(results_json)
+                blobs[digest] = results_json
+                result_count, first_title = summarize_results(record.results)
+                rows[SearchHistory].append({
+                    "user_id": record.user_id, "query": record.query, "results_hash": digest,
+                    "result_count": result_count, "first_title": first_title, "timestamp": timestamp,
+                })
+            else:
+                rows[ImageHistory].append({
+                    "user_id": record.user_id, "prompt": record.prompt, "image_url": record.image_url, "timestamp": timestamp,
+                })
+
+        if blobs:
+            await db.execute(store_statement(db.get_bind().dialect.name, [
+                {"hash": digest, "results": results_json} for digest, results_json in blobs.items()
+            ]))
+        written = {}
+        changes = []
+        for model, model_rows in rows.items():
+            if not model_rows:
+                continue
+            ids = await (copy_rows if use_copy else insert_rows)(db, model, model_rows)
+            kind = HISTORY_KINDS[model]
+            written[kind] = len(ids)
+            changes.extend((row["user_id"], kind, new_id, CHANGE_UPSERT) for row, new_id in zip(model_rows, ids))
+        await log_changes(db, changes)
+        return written
@@ -0,0 +1,41 @@
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import HistoryChange, User
+
+CHANGE_UPSERT = "upsert"
+CHANGE_DELETE = "delete"
+
+
+async def log_changes(db: AsyncSession, changes: Iterable[Tuple[int, str, int, str]]) -> Dict[int, Tuple[int, int]]:
+    """Append ``(user_id, kind, entry_id, op)`` rows to the change log in the caller's transaction.
+
+    Returns each user's newest ``seq`` before and after the append, which is
+    how the recent-activity buffers tell their own writes from other workers'.
+
+    The owning users rows are locked first (``FOR NO KEY UPDATE``, which does
+    not conflict with the key-share locks taken by history foreign keys), so
+    each user's writers take sequence numbers one at a time and commit them in
+    that order. A client that has seen ``seq`` N can then never have a smaller
+    one appear later. SQLite ignores the lock; its writers are serialized anyway.
+    """
+    rows = [
+        {"user_id": user_id, "kind": kind, "entry_id": entry_id, "op": op}
+        for user_id, kind, entry_id, op in changes
+    ]
+    if not rows:
+        return {}
+    user_ids = sorted({row["user_id"] for row in rows})
+    await db.execute(select(User.id).where(User.id.in_(user_ids)).order_by(User.id).with_for_update(key_share=True))
+    previous = dict((await db.execute(
+        select(HistoryChange.user_id, func.max(HistoryChange.seq))
+        .where(HistoryChange.user_id.in_(user_ids))
+        .group_by(HistoryChange.user_id)
+    )).all())
+    result = await db.execute(insert(HistoryChange).returning(HistoryChange.user_id, HistoryChange.seq), rows)
+    latest = {}
+    for user_id, seq in result.all():
+        latest[user_id] = max(seq, latest.get(user_id, 0))
+    return {user_id: (previous.get(user_id, 0), seq) for user_id, seq in latest.items()}
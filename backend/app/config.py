@@ -13,6 +13,11 @@ class Settings:
         self.secret_key = os.getenv("SECRET_KEY", "your-super-secret-key-here-change-in-production")
         self.algorithm = os.getenv("ALGORITHM", "HS256")
         self.access_token_expire_minutes = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+        # 0 sizes the bcrypt process pool to the number of cores
+        self.password_hash_workers = int(os.getenv("PASSWORD_HASH_WORKERS", "0"))
+        self.password_hash_queue_limit = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "64"))
+        self.auth_cache_ttl_seconds = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+        self.auth_cache_max_entries = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
 
         # Server
         self.host = os.getenv("HOST", "0.0.0.0")
@@ -28,6 +33,51 @@ class Settings:
         # Based on the documentation, this is the correct MCP server endpoint
         self.flux_base_url = os.getenv("FLUX_BASE_URL", "https://server.smithery.ai/@falahgs/flux-imagegen-mcp-server/mcp")
 
+        # MCP session pool
+        self.mcp_pool_size = int(os.getenv("MCP_POOL_SIZE", "4"))
+        self.mcp_connect_timeout = float(os.getenv("MCP_CONNECT_TIMEOUT", "15"))
+        self.mcp_health_check_interval = float(os.getenv("MCP_HEALTH_CHECK_INTERVAL", "30"))
+
+        # DuckDuckGo calls run on a dedicated thread pool with a per-call deadline
+        self.search_workers = int(os.getenv("SEARCH_WORKERS", "8"))
+        self.search_queue_limit = int(os.getenv("SEARCH_QUEUE_LIMIT", "32"))
+        self.search_timeout_seconds = float(os.getenv("SEARCH_TIMEOUT_SECONDS", "10"))
+
+        # Shared search result cache (stale entries are served while refreshed)
+        self.search_cache_ttl_seconds = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "300"))
+        self.search_cache_stale_seconds = float(os.getenv("SEARCH_CACHE_STALE_SECONDS", "600"))
+        self.search_cache_max_bytes = int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+        # Optional write-behind buffer for history rows, committed in batches
+        self.history_write_behind = os.getenv("HISTORY_WRITE_BEHIND", "False").lower() == "true"
+        self.history_batch_size = int(os.getenv("HISTORY_BATCH_SIZE", "100"))
+        self.history_flush_interval_seconds = float(os.getenv("HISTORY_FLUSH_INTERVAL_SECONDS", "0.05"))
+        self.history_max_pending = int(os.getenv("HISTORY_MAX_PENDING", "10000"))
+        self.history_enqueue_timeout_seconds = float(os.getenv("HISTORY_ENQUEUE_TIMEOUT_SECONDS", "1"))
+
+        # Per-user ring buffers that answer first dashboard pages from memory
+        self.recent_activity_per_user = int(os.getenv("RECENT_ACTIVITY_PER_USER", "50"))
+        self.recent_activity_max_users = int(os.getenv("RECENT_ACTIVITY_MAX_USERS", "10000"))
+
+        # Soft deletes: dashboard deletes set a tombstone and compaction removes the rows later
+        self.history_soft_delete = os.getenv("HISTORY_SOFT_DELETE", "False").lower() == "true"
+        self.history_compaction_interval_seconds = float(os.getenv("HISTORY_COMPACTION_INTERVAL_SECONDS", "300"))
+        self.history_compaction_batch_size = int(os.getenv("HISTORY_COMPACTION_BATCH_SIZE", "500"))
+        self.history_compaction_pause_seconds = float(os.getenv("HISTORY_COMPACTION_PAUSE_SECONDS", "0.1"))
+        # UTC hours as "start-end" (e.g. "2-6"); empty compacts at any hour
+        self.history_compaction_hours = os.getenv("HISTORY_COMPACTION_HOURS", "")
+
+        # Background purge of deleted accounts' history, in batches of this many rows
+        self.user_purge_batch_size = int(os.getenv("USER_PURGE_BATCH_SIZE", "1000"))
+        self.user_purge_pause_seconds = float(os.getenv("USER_PURGE_PAUSE_SECONDS", "0.05"))
+        # A purge claim not renewed for this long is treated as abandoned by a dead worker
+        self.user_purge_claim_timeout_seconds = float(os.getenv("USER_PURGE_CLAIM_TIMEOUT_SECONDS", "300"))
+
+        # Background image generation jobs
+        self.image_job_workers = int(os.getenv("IMAGE_JOB_WORKERS", "8"))
+        self.image_job_queue_size = int(os.getenv("IMAGE_JOB_QUEUE_SIZE", "1000"))
+        self.image_job_retention_seconds = float(os.getenv("IMAGE_JOB_RETENTION_SECONDS", "3600"))
+
 # Create settings instance
 settings = Settings()
 
@@ -1,66 +1,100 @@
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import declarative_base
 from sqlalchemy.exc import SQLAlchemyError
 from app.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Fix: Ensure correct database driver for SQLAlchemy sync engine
-db_url = settings.database_url.replace("+asyncpg", "")  # remove async if present
+def async_database_url(url: str) -> str:
+    """Point a database URL at an asyncio driver (asyncpg for Postgres, aiosqlite for SQLite)"""
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    scheme, sep, rest = url.partition("://")
+    dialect = scheme.split("+")[0]
+    if dialect == "postgresql":
+        return f"postgresql+asyncpg{sep}{rest}"
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    return url
 
-# Create a SQLAlchemy engine with connection pooling
+def sync_database_url(url: str) -> str:
+    """Strip the asyncio driver from a URL, for tools such as Alembic that need a sync engine"""
+    return url.replace("+asyncpg", "").replace("+aiosqlite", "")
+
+db_url = async_database_url(settings.database_url)
+
+# Create an asyncio SQLAlchemy engine with connection pooling
 if db_url.startswith('sqlite'):
     # SQLite configuration
-    engine = create_engine(
+    engine = create_async_engine(
         db_url,
-        connect_args={"check_same_thread": False},
         echo=settings.debug
     )
 else:
     # PostgreSQL configuration
-    engine = create_engine(
+    engine = create_async_engine(
         db_url,
         pool_pre_ping=True,  # Verify connections before use
         pool_recycle=300,    # Recycle connections after 5 minutes
         echo=settings.debug   # Log SQL queries in debug mode
     )
 
-# Create a SessionLocal class to get a database session for each request
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+@event.listens_for(Engine, "connect")
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite ignores foreign keys unless asked; the history tables rely on ON DELETE CASCADE"""
+    # Both the sqlite3 driver and SQLAlchemy's aiosqlite adapter live in *sqlite* modules
+    if "sqlite" in type(dbapi_connection).__module__:
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+# Create a SessionLocal class to get a database session for each request.
+# Objects stay readable after commit since async sessions cannot lazy-load.
+SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 # Create a base class for your database models
 Base = declarative_base()
 
-def get_db():
+async def get_db():
     """Dependency function to provide a database session"""
-    db = SessionLocal()
-    try:
-        yield db
-    except SQLAlchemyError as e:
-        logger.error(f"Database error: {e}")
-        db.rollback()
-        raise
-    finally:
-        db.close()
+    async with SessionLocal() as db:
+        try:
+            yield db
+        except SQLAlchemyError as e:
+            logger.error(f"Database error: {e}")
+            await db.rollback()
+            raise
 
-def create_tables():
+def get_session_factory():
+    """Dependency providing the session factory itself.
+
+    Routes that wait on slow external services use it to open short units of
+    work before and after the call instead of holding a pooled connection for
+    the whole request.
+    """
+    return SessionLocal
+
+async def create_tables():
     """Create all database tables"""
     try:
-        Base.metadata.create_all(bind=engine)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
         logger.info("Database tables created successfully")
         return True
     except SQLAlchemyError as e:
         logger.error(f"Error creating tables: {e}")
         return False
 
-def test_database_connection():
+async def test_database_connection():
     """Test if the database connection works"""
     try:
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
         logger.info("Database connection successful")
         return True
-    except SQLAlchemyError as e:
+    except (SQLAlchemyError, OSError) as e:
         logger.error(f"Database connection failed: {e}")
-        return False
\ No newline at end of file
+        return False
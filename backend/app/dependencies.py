@@ -1,19 +1,28 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.database import get_db, get_session_factory
 from app.models import User
-from app.schemas import TokenData
+from app.schemas import TokenData, CurrentUser
+from app.auth_cache import principal_cache
 from app.security import decode_access_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), session_factory: async_sessionmaker = Depends(get_session_factory)) -> CurrentUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    # Warm path: a token we already verified, for a user we already loaded
+    username = principal_cache.get_username(token)
+    if username is not None:
+        user = principal_cache.get_user(username)
+        if user is not None:
+            return user
+
     payload = decode_access_token(token)
     username: str = payload.get("sub")
     is_admin: bool = payload.get("is_admin", False)
@@ -21,15 +30,23 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         raise credentials_exception
     token_data = TokenData(username=username, is_admin=is_admin)
 
-    user = db.query(User).filter(User.username == token_data.username).first()
+    user = principal_cache.get_user(token_data.username)
     if user is None:
-        raise credentials_exception
+        # Short unit of work so the connection is back in the pool before the route runs
+        async with session_factory() as db:
+            result = await db.execute(select(User).where(User.username == token_data.username, User.deleted_at.is_(None)))
+            db_user = result.scalars().first()
+        if db_user is None:
+            raise credentials_exception
+        user = CurrentUser.model_validate(db_user)
+        principal_cache.remember_user(user)
+    principal_cache.remember_token(token, user.username, payload.get("exp"))
     return user
 
-# def get_current_admin_user(current_user: User = Depends(get_current_user)):
-#     if not current_user.is_admin:
-#         raise HTTPException(
-#             status_code=status.HTTP_403_FORBIDDEN,
-#             detail="The user doesn't have enough privileges"
-#         )
-#     return current_user
\ No newline at end of file
+async def get_current_admin_user(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="The user doesn't have enough privileges"
+        )
+    return current_user
@@ -0,0 +1,83 @@
+import csv
+import io
+from typing import AsyncIterator, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models import ImageHistory, SearchHistory, live
+from app.raw_json import encode, splice_object
+
+# Rows fetched per round trip from the server-side cursor, and per emitted chunk
+EXPORT_BATCH_SIZE = 1000
+
+CSV_COLUMNS = ["type", "id", "timestamp", "query", "result_count", "first_title", "results", "prompt", "image_url"]
+
+
+def export_statements(user_id: int):
+    """One newest-first statement per history kind; plain columns, no ORM objects"""
+    searches = select(
+        SearchHistory.id,
+        SearchHistory.query,
+        SearchHistory.result_count,
+        SearchHistory.first_title,
+        SearchHistory.timestamp,
+        SearchHistory.full_results.label("results"),
+    ).where(SearchHistory.user_id == user_id, live(SearchHistory)).order_by(SearchHistory.timestamp.desc(), SearchHistory.id.desc())
+    images = select(
+        ImageHistory.id,
+        ImageHistory.prompt,
+        ImageHistory.image_url,
+        ImageHistory.timestamp,
+    ).where(ImageHistory.user_id == user_id, live(ImageHistory)).order_by(ImageHistory.timestamp.desc(), ImageHistory.id.desc())
+    return [("search", searches), ("image", images)]
+
+
+async def export_batches(session_factory: async_sessionmaker, user_id: int) -> AsyncIterator[Tuple[str, list]]:
+    """Every history row of the user in batches, streamed from a server-side cursor.
+
+    The session is opened here rather than taken from the request, because the
+    body is produced after the route has returned. Only one batch is held in
+    memory at a time.
+    """
+    async with session_factory() as db:
+        for kind, stmt in export_statements(user_id):
+            result = await db.stream(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+            async for batch in result.partitions():
+                yield kind, batch
+
+
+def ndjson_lines(kind: str, rows) -> str:
+    lines = []
+    for row in rows:
+        fields = row._asdict()
+        if kind == "search":
+            # Stored results are spliced in verbatim, never parsed
+            raw_results = fields.pop("results") or "null"
+            lines.append(splice_object({"type": kind, **fields}, {"results": raw_results}))
+        else:
+            lines.append(encode({"type": kind, **fields}))
+    return "\n".join(lines) + "\n"
+
+
+def csv_lines(kind: str, rows) -> str:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS)
+    for row in rows:
+        fields = row._asdict()
+        fields["timestamp"] = fields["timestamp"].isoformat() if fields["timestamp"] else None
+        writer.writerow({"type": kind, **fields})
+    return buffer.getvalue()
+
+
+async def export_ndjson(session_factory: async_sessionmaker, user_id: int) -> AsyncIterator[str]:
+    async for kind, rows in export_batches(session_factory, user_id):
+        yield ndjson_lines(kind, rows)
+
+
+async def export_csv(session_factory: async_sessionmaker, user_id: int) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    csv.DictWriter(buffer, fieldnames=CSV_COLUMNS).writeheader()
+    yield buffer.getvalue()
+    async for kind, rows in export_batches(session_factory, user_id):
+        yield csv_lines(kind, rows)
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from sqlalchemy import delete, exists, or_, select
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import ImageHistory, SearchHistory, SearchResult
+
+logger = logging.getLogger(__name__)
+
+# Stored results used this recently are never swept, even if nothing references them yet
+ORPHAN_GRACE = timedelta(minutes=10)
+
+
+def parse_hours(spec: str) -> Optional[Tuple[int, int]]:
+    """``"start-end"`` UTC hours (end exclusive, may wrap past midnight); empty means any hour"""
+    if not spec.strip():
+        return None
+    start, _, end = spec.partition("-")
+    hours = int(start), int(end)
+    if not all(0 <= hour <= 24 for hour in hours):
+        raise ValueError(f"Invalid compaction hours: {spec!r}")
+    return hours
+
+
+class HistoryCompactor:
+    """Periodically removes tombstoned history rows in small batches.
+
+    Soft deletes only set ``deleted_at``; this task does the physical deletes
+    later, oldest tombstones first, walking the partial tombstone index. It
+    then sweeps ``search_results`` blobs that no search row references any
+    more, which deletes, compaction and account purges all leave behind. Each
+    batch is a short transaction followed by a pause, and a run stops as soon
+    as the configured quiet hours end.
+    """
+
+    def __init__(
+        self,
+        interval: float = 300.0,
+        batch_size: int = 500,
+        pause: float = 0.1,
+        hours: Optional[Tuple[int, int]] = None,
+        session_factory=SessionLocal,
+    ):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pause = pause
+        self.hours = hours
+        self.session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.removed = 0
+        self.orphans_removed = 0
+        self.failed = 0
+
+    def in_window(self, now: Optional[datetime] = None) -> bool:
+        if self.hours is None:
+            return True
+        hour = (now or datetime.now(timezone.utc)).hour
+        start, end = self.hours
+        if start <= end:
+            return start <= hour < end
+        return hour >= start or hour < end
+
+    def start(self):
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self.in_window():
+                continue
+            try:
+                await self.compact()
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"History compaction failed: {e}")
+
+    async def _delete_batch(self, model) -> int:
+        batch = (
+            select(model.id)
+            .where(model.deleted_at.isnot(None))
+            .order_by(model.deleted_at)
+            .limit(self.batch_size)
+            .scalar_subquery()
+        )
+        async with self.session_factory() as db:
+            result = await db.execute(
+                delete(model).where(model.id.in_(batch), model.deleted_at.isnot(None)),
+                execution_options={"synchronize_session": False},
+            )
+            await db.commit()
+        return result.rowcount
+
+    async def _sweep_batch(self) -> int:
+        cutoff = datetime.now(timezone.utc) - ORPHAN_GRACE
+        # Repeated on the DELETE itself so a blob reused after the subquery ran is re-checked
+        orphaned = (
+            ~exists().where(SearchHistory.results_hash == SearchResult.hash),
+            or_(SearchResult.used_at.is_(None), SearchResult.used_at < cutoff),
+        )
+        batch = select(SearchResult.hash).where(*orphaned).limit(self.batch_size).scalar_subquery()
+        async with self.session_factory() as db:
+            result = await db.execute(
+                delete(SearchResult).where(SearchResult.hash.in_(batch), *orphaned),
+                execution_options={"synchronize_session": False},
+            )
+            await db.commit()
+        return result.rowcount
+
+    async def sweep_orphans(self) -> int:
+        """Remove stored results no search row references; returns the count"""
+        removed = 0
+        while self.in_window():
+            count = await self._sweep_batch()
+            removed += count
+            self.orphans_removed += count
+            if count == 0:
+                break
+            await asyncio.sleep(self.pause)
+        if removed:
+            logger.info(f"Removed {removed} unreferenced search results")
+        return removed
+
+    async def compact(self) -> int:
+        """Remove tombstoned rows until none are left or the window closes; returns the count"""
+        self.runs += 1
+        removed = 0
+        for model in (SearchHistory, ImageHistory):
+            while self.in_window():
+                count = await self._delete_batch(model)
+                removed += count
+                self.removed += count
+                if count < self.batch_size:
+                    break
+                await asyncio.sleep(self.pause)
+        if removed:
+            logger.info(f"Compacted {removed} deleted history rows")
+        await self.sweep_orphans()
+        return removed
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict:
+        return {"runs": self.runs, "removed": self.removed, "orphans_removed": self.orphans_removed, "failed": self.failed}
+
+
+history_compactor = HistoryCompactor(
+    interval=settings.history_compaction_interval_seconds,
+    batch_size=settings.history_compaction_batch_size,
+    pause=settings.history_compaction_pause_seconds,
+    hours=parse_hours(settings.history_compaction_hours),
+)
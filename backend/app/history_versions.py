@@ -0,0 +1,29 @@
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import HistoryChange
+
+
+async def latest_seq(db: AsyncSession, user_id: int) -> int:
+    """The user's newest change-log ``seq``; 0 before their first write.
+
+    Every history write appends to the change log in the same transaction, so
+    this identifies the state of their history for every worker process
+    alike. Reading it is one probe of the (user_id, seq) index.
+    """
+    return (await db.execute(
+        select(func.coalesce(func.max(HistoryChange.seq), 0)).where(HistoryChange.user_id == user_id)
+    )).scalar()
+
+
+def history_etag_value(user_id: int, seq: int) -> str:
+    """Strong ETag for everything the user's history reads return at ``seq``"""
+    return f'"h{user_id}-{seq}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """``If-None-Match`` comparison (weak, as RFC 9110 requires for this header)"""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
@@ -0,0 +1,270 @@
+import asyncio
+import logging
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import ImageHistory, SearchHistory
+from app.change_log import CHANGE_UPSERT, log_changes
+from app.recent_activity import HISTORY_KINDS, recent_activity
+from app.results_store import store_statement, results_digest
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBufferFullError(Exception):
+    """Raised when the history buffer stays full for longer than the enqueue timeout"""
+
+
+class PendingRow:
+    """A history row accepted by the writer but not yet committed"""
+
+    def __init__(self, model, values: Dict[str, Any], future: asyncio.Future, blob: Optional[tuple] = None):
+        self.model = model
+        self.values = values
+        self.future = future
+        self.blob = blob
+
+    @property
+    def user_id(self) -> int:
+        return self.values["user_id"]
+
+
+class HistoryWriter:
+    """Write-behind buffer that commits history rows in multi-row batches.
+
+    Routes hand rows to ``submit_search`` / ``submit_image`` and carry on; a
+    background task flushes them with one ``INSERT ... RETURNING`` per table
+    whenever ``batch_size`` rows are waiting or ``flush_interval`` has passed,
+    so many requests share one transaction. Each submit returns a future that
+    resolves to the new row id once it is committed.
+
+    When ``max_pending`` rows are waiting, submitters block for up to
+    ``enqueue_timeout`` seconds and are then refused. Reads stay consistent
+    through ``wait_for_user``: a user's own pending rows are flushed before
+    their history is queried.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 100,
+        flush_interval: float = 0.05,
+        max_pending: int = 10000,
+        enqueue_timeout: float = 1.0,
+        session_factory=SessionLocal,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.enqueue_timeout = enqueue_timeout
+        self.session_factory = session_factory
+        self._pending: List[PendingRow] = []
+        self._by_user: Dict[int, List[PendingRow]] = defaultdict(list)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._space: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._in_flight = 0
+        self._batches = 0
+        self._written = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def _ensure_started(self):
+        # The flusher runs on the loop that serves requests
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._task is not None and not self._task.done():
+            return
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._pending:
+                await self._flush_batch()
+
+    @property
+    def _buffered(self) -> int:
+        # Rows being written still hold memory until their batch commits
+        return len(self._pending) + self._in_flight
+
+    async def submit(self, model, values: Dict[str, Any], blob: Optional[tuple] = None) -> asyncio.Future:
+        self._ensure_started()
+        if self._buffered >= self.max_pending:
+            self._wakeup.set()
+            deadline = self._loop.time() + self.enqueue_timeout
+            while self._buffered >= self.max_pending:
+                self._space.clear()
+                try:
+                    await asyncio.wait_for(self._space.wait(), deadline - self._loop.time())
+                except asyncio.TimeoutError:
+                    self._rejected += 1
+                    raise WriteBufferFullError("History write buffer is full")
+        row = PendingRow(model, values, self._loop.create_future(), blob)
+        self._pending.append(row)
+        self._by_user[row.user_id].append(row)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        return row.future
+
+    async def submit_search(self, user_id: int, query: str, results_json: str, result_count: int, first_title: Optional[str]) -> asyncio.Future:
+        digest = results_digest(results_json)
+        values = {
+            "user_id": user_id,
+            "query": query,
+            "results_hash": digest,
+            "result_count": result_count,
+            "first_title": first_title,
+        }
+        return await self.submit(SearchHistory, values, blob=(digest, results_json))
+
+    async def submit_image(self, user_id: int, prompt: str, image_url: str) -> asyncio.Future:
+        return await self.submit(ImageHistory, {"user_id": user_id, "prompt": prompt, "image_url": image_url})
+
+    async def _flush_batch(self):
+        """Write up to ``batch_size`` of the oldest buffered rows in one transaction"""
+        async with self._flush_lock:
+            batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+            if not batch:
+                return
+            self._in_flight = len(batch)
+            try:
+                ids, errors = await self._write_isolating(batch)
+                self._batches += 1
+                for row in batch:
+                    error = errors.get(id(row))
+                    if error is not None:
+                        self._failed += 1
+                        self._resolve(row, error=error)
+                        continue
+                    self._written += 1
+                    self._resolve(row, result=ids[id(row)][0])
+            finally:
+                for row in batch:
+                    rows = self._by_user.get(row.user_id)
+                    if rows is not None:
+                        rows.remove(row)
+                        if not rows:
+                            del self._by_user[row.user_id]
+                self._in_flight = 0
+                if self._buffered < self.max_pending:
+                    self._space.set()
+
+    async def _write_isolating(self, batch: List[PendingRow]) -> Tuple[Dict[int, tuple], Dict[int, Exception]]:
+        """``_write`` the batch, splitting it in halves on failure until the bad rows stand alone.
+
+        Returns the new ids of the rows that were written and the error of each
+        row that could not be, both keyed by ``id(row)``. One bad row costs a
+        few extra transactions instead of failing everyone else's rows.
+        """
+        try:
+            return await self._write(batch), {}
+        except Exception as e:
+            if len(batch) == 1:
+                logger.error(f"History row for user {batch[0].user_id} failed: {e}")
+                return {}, {id(batch[0]): e}
+            logger.warning(f"History batch of {len(batch)} rows failed, retrying in halves: {e}")
+        middle = len(batch) // 2
+        ids, errors = await self._write_isolating(batch[:middle])
+        more_ids, more_errors = await self._write_isolating(batch[middle:])
+        return {**ids, **more_ids}, {**errors, **more_errors}
+
+    async def _write(self, batch: List[PendingRow]) -> Dict[int, tuple]:
+        """Insert one batch in a single transaction; maps ``id(row)`` to the new ``(id, timestamp)``.
+
+        The committed rows go into the recent-activity buffers straight away,
+        together with the change-log positions they moved their users to.
+        """
+        ids = {}
+        async with self.session_factory() as db:
+            async with db.begin():
+                blobs = {row.blob[0]: row.blob[1] for row in batch if row.blob is not None}
+                if blobs:
+                    rows = [{"hash": digest, "results": results} for digest, results in blobs.items()]
+                    await db.execute(store_statement(db.get_bind().dialect.name, rows))
+                for model in (SearchHistory, ImageHistory):
+                    group = [row for row in batch if row.model is model]
+                    if not group:
+                        continue
+                    result = await db.execute(
+                        insert(model).returning(model.id, model.timestamp, sort_by_parameter_order=True),
+                        [row.values for row in group],
+                    )
+                    for row, (new_id, timestamp) in zip(group, result.all()):
+                        ids[id(row)] = (new_id, timestamp)
+                seqs = await log_changes(db, [
+                    (row.user_id, HISTORY_KINDS[row.model], ids[id(row)][0], CHANGE_UPSERT) for row in batch
+                ])
+        recent_activity.advance(seqs)
+        for row in batch:
+            new_id, timestamp = ids[id(row)]
+            recent_activity.record(HISTORY_KINDS[row.model], SimpleNamespace(**row.values, id=new_id, timestamp=timestamp))
+        return ids
+
+    @staticmethod
+    def _resolve(row: PendingRow, result: Optional[int] = None, error: Optional[BaseException] = None):
+        future = row.future
+        if future.done() or future.get_loop().is_closed():
+            return
+        if error is not None:
+            future.set_exception(error)
+            # Nobody may be awaiting a write-behind row; don't warn about it
+            future.exception()
+        else:
+            future.set_result(result)
+
+    async def wait_for_user(self, user_id: int):
+        """Read-your-writes barrier: commit this user's buffered rows before they read history"""
+        if user_id not in self._by_user:
+            return
+        self._ensure_started()
+        while user_id in self._by_user:
+            if not self._pending:
+                # The rest are in the batch being written right now
+                async with self._flush_lock:
+                    return
+            await self._flush_batch()
+
+    async def close(self):
+        """Flush everything still buffered, then stop the flusher; called on shutdown"""
+        if self._pending:
+            self._ensure_started()
+            while self._pending:
+                await self._flush_batch()
+        if self._task is not None:
+            self._task.cancel()
+            if self._task.get_loop() is asyncio.get_running_loop():
+                await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "in_flight": self._in_flight,
+            "batches": self._batches,
+            "written": self._written,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "avg_batch": round(self._written / self._batches, 2) if self._batches else 0.0,
+        }
+
+
+history_writer = HistoryWriter(
+    batch_size=settings.history_batch_size,
+    flush_interval=settings.history_flush_interval_seconds,
+    max_pending=settings.history_max_pending,
+    enqueue_timeout=settings.history_enqueue_timeout_seconds,
+)
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED)
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+
+class Job:
+    """State of one queued unit of work, observable by pollers and SSE subscribers"""
+
+    def __init__(self, user_id: int, payload: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.payload = payload
+        self.status = JOB_QUEUED
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now(timezone.utc)
+        self.updated_at = self.created_at
+        self.version = 0
+        self._finished_at: Optional[float] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def _update(self, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        self.status = status
+        self.result = result
+        self.error = error
+        self.updated_at = datetime.now(timezone.utc)
+        if self.finished:
+            self._finished_at = time.monotonic()
+        self.version += 1
+        # Wake everyone waiting on this version and arm a fresh event for the next one
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait_for_change(self, seen_version: int, timeout: float) -> bool:
+        """Wait until the job moves past ``seen_version``; returns False on timeout"""
+        if self.version != seen_version:
+            return True
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class JobQueue:
+    """Bounded in-process job queue drained by a fixed pool of worker tasks.
+
+    ``submit`` returns immediately with a ``Job``; ``handler`` is awaited by a
+    worker and its return value becomes the job result. Finished jobs are kept
+    for ``retain_seconds`` so clients can still poll them, then dropped.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Job], Awaitable[Dict[str, Any]]],
+        workers: int = 8,
+        max_queue: int = 1000,
+        retain_seconds: float = 3600.0,
+    ):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.retain_seconds = retain_seconds
+        self._jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_started(self):
+        # Workers are started lazily on the loop that serves requests
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def _worker(self, index: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                job._update(JOB_RUNNING)
+                result = await self.handler(job)
+                job._update(JOB_SUCCEEDED, result=result)
+            except asyncio.CancelledError:
+                job._update(JOB_FAILED, error="Job cancelled")
+                raise
+            except Exception as e:
+                logger.error(f"Job {job.id} failed: {e}")
+                job._update(JOB_FAILED, error=getattr(e, "detail", None) or str(e))
+            finally:
+                self._queue.task_done()
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.retain_seconds
+        expired = [job_id for job_id, job in self._jobs.items() if job._finished_at is not None and job._finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def submit(self, user_id: int, payload: Dict[str, Any]) -> Job:
+        self._ensure_started()
+        self._prune()
+        job = Job(user_id, payload)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError("Job queue is full")
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str, user_id: int) -> Optional[Job]:
+        """Look up a job, hiding jobs that belong to other users"""
+        job = self._jobs.get(job_id)
+        if job is None or job.user_id != user_id:
+            return None
+        return job
+
+    async def close(self):
+        """Cancel the workers; queued jobs that never ran are marked failed"""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        if tasks and self._loop is asyncio.get_running_loop():
+            await asyncio.gather(*tasks, return_exceptions=True)
+        for job in self._jobs.values():
+            if not job.finished:
+                job._update(JOB_FAILED, error="Server shutting down")
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": sum(1 for job in self._jobs.values() if job.status == JOB_RUNNING),
+            "tracked": len(self._jobs),
+        }
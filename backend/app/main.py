@@ -1,10 +1,19 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes.image import router as image_router
+from app.routes.image import router as image_router, flux_pool, image_jobs, image_flight
 from app.routes.search import router as search_router
 from app.routes.auth import router as auth_router
 from app.routes.dashboard import router as dashboard_router
-from app.database import create_tables, test_database_connection
+from app.routes.admin import router as admin_router
+from app.database import create_tables, test_database_connection, engine
+from app.security import password_hasher
+from app.auth_cache import principal_cache
+from app.search_backend import search_backend
+from app.history_writer import history_writer
+from app.recent_activity import recent_activity
+from app.user_purge import user_purger
+from app.history_compactor import history_compactor
 from app.config import settings
 import logging
 import os
@@ -21,7 +30,9 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Search & Image API", 
     version="1.0.0",
-    debug=settings.debug
+    debug=settings.debug,
+    # Routes declare response models; orjson turns the validated data into bytes
+    default_response_class=ORJSONResponse,
 )
 
 # Add CORS middleware
@@ -39,27 +50,68 @@ async def startup_event():
     logger.info("Starting up Search & Image API...")
     
     # Test database connection
-    if not test_database_connection():
+    if not await test_database_connection():
         logger.error("Failed to connect to database")
         raise HTTPException(status_code=500, detail="Database connection failed")
     
     # Create database tables (only if they don't exist)
-    if not create_tables():
+    if not await create_tables():
         logger.error("Failed to create database tables")
         raise HTTPException(status_code=500, detail="Database initialization failed")
     
+    # Finish purging accounts deleted before the last shutdown
+    await user_purger.resume()
+    # Physically remove soft-deleted history rows in the background
+    history_compactor.start()
+    
+    # Open the first Flux MCP session so early requests skip the handshake
+    if settings.flux_api_key:
+        await flux_pool.start()
+    
     logger.info("Application startup completed successfully!")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release long-lived resources on shutdown"""
+    logger.info("Shutting down Search & Image API...")
+    await image_jobs.close()
+    # After the job workers, whose last rows may still be buffered
+    await history_writer.close()
+    await user_purger.close()
+    await history_compactor.close()
+    await flux_pool.close()
+    password_hasher.shutdown()
+    await search_backend.close()
+    await engine.dispose()
+
 # Include routers
 app.include_router(auth_router, prefix="/auth", tags=["authentication"])
 app.include_router(image_router, prefix="/images", tags=["images"])
 app.include_router(search_router, prefix="/search", tags=["search"])
 app.include_router(dashboard_router, prefix="/dashboard", tags=["dashboard"])
+app.include_router(admin_router, prefix="/admin", tags=["admin"])
 
 @app.get("/")
 def read_root():
     return {"message": "Search & Image API is running!", "version": "1.0.0"}
 
+@app.get("/metrics")
+def read_metrics():
+    """In-process pool, queue and cache statistics for this worker"""
+    return {
+        "mcp_pool": flux_pool.stats(),
+        "image_jobs": image_jobs.stats(),
+        "password_hasher": password_hasher.stats(),
+        "auth_cache": principal_cache.stats(),
+        "search_cache": search_backend.stats(),
+        "search_executor": search_backend.client.stats(),
+        "history_writer": history_writer.stats(),
+        "recent_activity": recent_activity.stats(),
+        "user_purge": user_purger.stats(),
+        "history_compaction": history_compactor.stats(),
+        "coalescing": {"search": search_backend.flight.stats(), "images": image_flight.stats()},
+    }
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))  # Render sets PORT automatically
     uvicorn.run("app.main:app", host="0.0.0.0", port=port, reload=True)
@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+import mcp
+from mcp.client.streamable_http import streamablehttp_client
+
+logger = logging.getLogger(__name__)
+
+
+class MCPConnection:
+    """A single initialized MCP session kept open by its own background task.
+
+    The streamable HTTP transport is built on anyio task groups, which must be
+    entered and exited from the same task. Each connection therefore owns a task
+    that opens the transport, runs ``initialize()`` and ``list_tools()`` once,
+    and then parks until the pool closes it. Request handlers only ever call
+    methods on ``session``, which is safe from any task.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.session: Optional[mcp.ClientSession] = None
+        self.tools: List = []
+        self.last_used = time.monotonic()
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._error: Optional[BaseException] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def open(self, timeout: float):
+        """Start the connection task and wait until the handshake has finished"""
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+            raise
+        if self._error is not None:
+            raise self._error
+
+    async def _run(self):
+        try:
+            async with streamablehttp_client(self.url) as (read_stream, write_stream, _):
+                async with mcp.ClientSession(read_stream, write_stream) as session:
+                    await session.initialize()
+                    tools_result = await session.list_tools()
+                    self.tools = list(tools_result.tools or [])
+                    self.session = session
+                    self._ready.set()
+                    await self._closing.wait()
+        except Exception as e:
+            self._error = e
+            if self._ready.is_set():
+                logger.warning(f"MCP connection to pool dropped: {e}")
+        finally:
+            self.session = None
+            self._ready.set()
+
+    async def close(self, timeout: float = 5.0):
+        self._closing.set()
+        if self._task is None or self._task.done():
+            return
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pass
+        except Exception as e:
+            logger.warning(f"Error while closing MCP connection: {e}")
+
+
+class MCPSessionPool:
+    """Bounded pool of long-lived, initialized MCP client sessions.
+
+    Requests borrow a ready session with ``async with pool.session() as conn``
+    and go straight to ``conn.session.call_tool``. Idle sessions are pinged
+    before reuse once they have been idle longer than the health check
+    interval, and any session that fails while borrowed is discarded so the
+    next borrower reconnects. The tool catalogue reported by the server is
+    cached on the pool from the most recent handshake.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        size: int = 4,
+        connect_timeout: float = 15.0,
+        health_check_interval: float = 30.0,
+    ):
+        self.url = url
+        self.size = max(1, size)
+        self.connect_timeout = connect_timeout
+        self.health_check_interval = health_check_interval
+        self.tools: List = []
+        self._idle: List[MCPConnection] = []
+        self._in_use = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._connects = 0
+        self._reconnects = 0
+
+    @property
+    def tool_names(self) -> List[str]:
+        return [tool.name for tool in self.tools]
+
+    def _bind_loop(self):
+        # Sessions and the semaphore belong to the loop that created them; if the
+        # pool is used from a new loop (reload, test client) start from scratch.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._idle = []
+            self._in_use = 0
+            self._semaphore = asyncio.Semaphore(self.size)
+
+    async def start(self, warm: int = 1):
+        """Open ``warm`` sessions up front so the first requests skip the handshake"""
+        self._bind_loop()
+        for _ in range(min(warm, self.size)):
+            try:
+                self._idle.append(await self._connect())
+            except Exception as e:
+                logger.warning(f"Could not pre-connect MCP session pool: {e}")
+                break
+
+    async def _connect(self) -> MCPConnection:
+        conn = MCPConnection(self.url)
+        await conn.open(self.connect_timeout)
+        self._connects += 1
+        self.tools = conn.tools
+        logger.info(f"Opened MCP session ({len(self.tools)} tools available)")
+        return conn
+
+    async def _is_healthy(self, conn: MCPConnection) -> bool:
+        if not conn.alive:
+            return False
+        if time.monotonic() - conn.last_used < self.health_check_interval:
+            return True
+        try:
+            await asyncio.wait_for(conn.session.send_ping(), self.connect_timeout)
+            return True
+        except Exception as e:
+            logger.warning(f"MCP session failed health check: {e}")
+            return False
+
+    async def _checkout(self) -> MCPConnection:
+        while self._idle:
+            conn = self._idle.pop()
+            if await self._is_healthy(conn):
+                return conn
+            self._reconnects += 1
+            await conn.close()
+        return await self._connect()
+
+    @asynccontextmanager
+    async def session(self):
+        """Borrow an initialized session, reconnecting if the pooled one is unusable"""
+        self._bind_loop()
+        async with self._semaphore:
+            conn = await self._checkout()
+            self._in_use += 1
+            try:
+                yield conn
+            except BaseException:
+                # The session may be half-broken; never hand it to someone else
+                self._in_use -= 1
+                await conn.close()
+                raise
+            self._in_use -= 1
+            conn.last_used = time.monotonic()
+            if conn.alive:
+                self._idle.append(conn)
+
+    async def close(self):
+        """Close every idle session; called from the application shutdown hook"""
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await conn.close()
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "in_use": self._in_use,
+            "connects": self._connects,
+            "reconnects": self._reconnects,
+            "tools": len(self.tools),
+        }
@@ -1,8 +1,39 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import BigInteger, Column, Integer, String, Boolean, DateTime, ForeignKey, Index, Text, cast, select
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.types import TypeDecorator, UserDefinedType
+from sqlalchemy.orm import column_property, relationship
 from sqlalchemy.sql import func
 from app.database import Base
 
+# History timestamps are pagination keys. SQLite's CURRENT_TIMESTAMP has whole
+# seconds, so bind them the same way or equality checks in cursors never match.
+HistoryTimestamp = DateTime(timezone=True).with_variant(sqlite.DATETIME(truncate_microseconds=True), "sqlite")
+
+class _RawJSONB(UserDefinedType):
+    """JSONB column that hands strings through untouched (no driver-side json codec)"""
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "JSONB"
+
+    def column_expression(self, column):
+        return cast(column, Text)
+
+
+class JSONText(TypeDecorator):
+    """Already-serialized JSON: JSONB on Postgres, TEXT elsewhere, always a str in Python.
+
+    Values are never parsed on the way in or out, so responses can splice the
+    stored bytes directly into the body.
+    """
+    impl = Text
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(_RawJSONB())
+        return dialect.type_descriptor(Text())
+
 # User table model
 class User(Base):
     __tablename__ = "users"
@@ -12,10 +43,31 @@ class User(Base):
     hashed_password = Column(String(255), nullable=False)
     is_admin = Column(Boolean, default=False, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Set when the account is deleted; the row itself goes once its history is purged
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
+    # Heartbeat of the worker purging a deleted account; a stale one may be taken over
+    purge_claimed_at = Column(DateTime(timezone=True), nullable=True)
     
-    # Relationship to search and image history
-    searches = relationship("SearchHistory", back_populates="owner", cascade="all, delete-orphan")
-    images = relationship("ImageHistory", back_populates="owner", cascade="all, delete-orphan")
+    # Relationship to search and image history. Deleting a user leaves the
+    # rows to the ON DELETE CASCADE foreign keys instead of loading them all
+    searches = relationship("SearchHistory", back_populates="owner", cascade="all, delete-orphan", passive_deletes=True)
+    images = relationship("ImageHistory", back_populates="owner", cascade="all, delete-orphan", passive_deletes=True)
+
+    __table_args__ = (
+        # Only deleted accounts are indexed; the purger resumes from these at startup
+        Index("ix_users_deleted", id, sqlite_where=deleted_at.isnot(None), postgresql_where=deleted_at.isnot(None)),
+    )
+
+# Serialized search results, stored once per distinct content
+class SearchResult(Base):
+    __tablename__ = "search_results"
+
+    hash = Column(String(64), primary_key=True)  # sha256 of ``results``
+    results = Column(JSONText, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Refreshed whenever a search stores this content again, so the orphan
+    # sweep never deletes a blob a new history row is about to reference
+    used_at = Column(DateTime(timezone=True), nullable=True)
 
 # Search history table model
 class SearchHistory(Base):
@@ -23,12 +75,39 @@ class SearchHistory(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     query = Column(String(1000), nullable=False)
-    results = Column(Text, nullable=False)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    # New rows reference shared content in search_results; ``results`` only
+    # holds an inline copy for rows written without going through the store
+    results_hash = Column(String(64), ForeignKey("search_results.hash"), nullable=True, index=True)
+    results = Column(Text, nullable=True)
+    # Listing summary, so dashboards never have to load ``results``
+    result_count = Column(Integer, nullable=True)
+    first_title = Column(String(1000), nullable=True)
+    timestamp = Column(HistoryTimestamp, server_default=func.now())
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # Tombstone set by soft deletes; the row is removed later by compaction
+    deleted_at = Column(HistoryTimestamp, nullable=True)
     
     owner = relationship("User", back_populates="searches")
 
+    # The results text wherever it lives; load explicitly with undefer()
+    full_results = column_property(
+        func.coalesce(
+            cast(select(SearchResult.results).where(SearchResult.hash == results_hash).scalar_subquery(), Text),
+            results,
+        ),
+        deferred=True,
+        raiseload=True,
+    )
+
+    # Matches the dashboard's keyset order over live rows; see alembic revisions 002 and 008
+    __table_args__ = (
+        Index("ix_search_history_user_timestamp", user_id, timestamp.desc(), id.desc(),
+              sqlite_where=deleted_at.is_(None), postgresql_where=deleted_at.is_(None)),
+        Index("ix_search_history_deleted", deleted_at,
+              sqlite_where=deleted_at.isnot(None), postgresql_where=deleted_at.isnot(None)),
+        Index("ix_search_history_timestamp_brin", timestamp, postgresql_using="brin").ddl_if(dialect="postgresql"),
+    )
+
 # Image history table model
 class ImageHistory(Base):
     __tablename__ = "image_history"
@@ -36,7 +115,36 @@ class ImageHistory(Base):
     id = Column(Integer, primary_key=True, index=True)
     prompt = Column(String(1000), nullable=False)
     image_url = Column(String(2000), nullable=False)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    timestamp = Column(HistoryTimestamp, server_default=func.now())
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    deleted_at = Column(HistoryTimestamp, nullable=True)
+
+    owner = relationship("User", back_populates="images")
+
+    __table_args__ = (
+        Index("ix_image_history_user_timestamp", user_id, timestamp.desc(), id.desc(),
+              sqlite_where=deleted_at.is_(None), postgresql_where=deleted_at.is_(None)),
+        Index("ix_image_history_deleted", deleted_at,
+              sqlite_where=deleted_at.isnot(None), postgresql_where=deleted_at.isnot(None)),
+        Index("ix_image_history_timestamp_brin", timestamp, postgresql_using="brin").ddl_if(dialect="postgresql"),
+    )
+
+def live(model):
+    """Rows of a history table that are not tombstoned; the predicate of its listing index"""
+    return model.deleted_at.is_(None)
+
+# Append-only log of history writes, read by /dashboard/changes
+class HistoryChange(Base):
+    __tablename__ = "history_changes"
+
+    # Monotonic per user in commit order; clients sync with ``since=<seq>``
+    seq = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String(10), nullable=False)  # "search" or "image"
+    entry_id = Column(Integer, nullable=False)
+    op = Column(String(10), nullable=False)  # "upsert" or "delete"
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    owner = relationship("User", back_populates="images")
\ No newline at end of file
+    __table_args__ = (
+        Index("ix_history_changes_user_seq", user_id, seq),
+    )
@@ -0,0 +1,64 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Change-log pages are narrow rows, so they can be larger
+DEFAULT_CHANGES_PAGE_SIZE = 200
+MAX_CHANGES_PAGE_SIZE = 1000
+
+# Timeline rows are ordered by (timestamp, kind, id), all descending
+TIMELINE_KINDS = ("search", "image")
+
+
+def encode_cursor(*key) -> str:
+    """Opaque cursor for the last row of a page; datetimes are kept as ISO strings"""
+    raw = json.dumps([part.isoformat() if isinstance(part, datetime) else part for part in key])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, arity: int) -> Tuple:
+    """Inverse of ``encode_cursor``; the first element is parsed back into a datetime"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(key, list) or len(key) != arity:
+            raise ValueError("wrong cursor shape")
+        if not isinstance(key[-1], int):
+            raise ValueError("id must be an integer")
+        return (datetime.fromisoformat(key[0]), *key[1:])
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid cursor: {e}")
+
+
+def decode_timeline_cursor(cursor: str) -> Tuple:
+    timestamp, kind, entry_id = decode_cursor(cursor, 3)
+    if kind not in TIMELINE_KINDS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return timestamp, kind, entry_id
+
+
+def after_cursor(model, timestamp: datetime, entry_id: int):
+    """Rows strictly after ``(timestamp, id)`` in newest-first order"""
+    return or_(
+        model.timestamp < timestamp,
+        and_(model.timestamp == timestamp, model.id < entry_id),
+    )
+
+
+def timeline_after_cursor(model, kind: str, cursor: Optional[Tuple]):
+    """Keyset predicate for one table of the merged timeline, or None on the first page"""
+    if cursor is None:
+        return None
+    timestamp, cursor_kind, entry_id = cursor
+    if kind == cursor_kind:
+        return after_cursor(model, timestamp, entry_id)
+    if TIMELINE_KINDS.index(kind) > TIMELINE_KINDS.index(cursor_kind):
+        # Sorts after the cursor's kind, so ties on timestamp are still to come
+        return model.timestamp <= timestamp
+    return model.timestamp < timestamp
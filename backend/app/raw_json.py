@@ -0,0 +1,25 @@
+from typing import Any, Dict
+
+import orjson
+from fastapi.responses import Response
+
+
+class RawJSONResponse(Response):
+    """Response whose body is JSON the route has already assembled"""
+    media_type = "application/json"
+
+
+def encode(value: Any) -> str:
+    """Compact JSON for plain values (datetimes become ISO strings, as in FastAPI)"""
+    return orjson.dumps(value).decode()
+
+
+def splice_object(fields: Dict[str, Any], raw_members: Dict[str, str]) -> str:
+    """A JSON object from ordinary fields plus members that are already serialized JSON.
+
+    The raw members are inserted verbatim, so stored JSON reaches the client
+    without being parsed and re-encoded.
+    """
+    members = [encode(fields)[1:-1]] if fields else []
+    members.extend(f"{encode(name)}:{raw}" for name, raw in raw_members.items())
+    return "{" + ",".join(members) + "}"
@@ -0,0 +1,180 @@
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from app.config import settings
+from app.models import ImageHistory, SearchHistory
+from app.schemas import ImageResponse, SearchSummary
+
+HISTORY_KINDS = {SearchHistory: "search", ImageHistory: "image"}
+SUMMARY_TYPES = {"search": SearchSummary, "image": ImageResponse}
+
+
+def newest_first(entry: BaseModel) -> tuple:
+    return entry.timestamp, entry.id
+
+
+class KindBuffer:
+    """Newest-first summaries of one kind, mirroring the head of the user's table.
+
+    ``complete`` means the buffer holds every row the user has of this kind;
+    otherwise it holds exactly the newest ``len(entries)`` of them. ``seq`` is
+    the user's newest change-log position the buffer reflects.
+    """
+
+    def __init__(self, entries: List[BaseModel], complete: bool, capacity: int, seq: int):
+        self.entries: Deque[BaseModel] = deque(entries[:capacity], maxlen=capacity)
+        self.complete = complete and len(entries) <= capacity
+        self.seq = seq
+
+
+class UserActivity:
+    def __init__(self):
+        self.kinds: Dict[str, KindBuffer] = {}
+        # Bumped on every write so a slower concurrent load can tell it is outdated
+        self.writes = 0
+
+
+class RecentActivity:
+    """Per-user ring buffers of the newest search and image summaries.
+
+    A user's buffers are seeded from the database on the first dashboard read
+    that misses and then kept current by the write paths (new history rows,
+    patches, deletes), so first pages are answered without history queries.
+    Every buffer carries the change-log ``seq`` it reflects and only answers
+    reads that probed that same ``seq``; a write by another worker process
+    moves the user's ``seq`` past it and the next read reloads. Users are
+    evicted least recently used past ``max_users``. Not thread-safe; it is
+    only used from the event loop.
+    """
+
+    def __init__(self, capacity: int = 50, max_users: int = 10000):
+        self.capacity = capacity
+        self.max_users = max_users
+        self._users: "OrderedDict[int, UserActivity]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def head(self, user_id: int, kind: str, count: int, seq: int) -> Optional[List[BaseModel]]:
+        """The user's newest ``count`` entries of ``kind`` (fewer if that is all) as of change-log ``seq``, or None on a miss"""
+        activity = self._users.get(user_id)
+        buffer = activity.kinds.get(kind) if activity is not None else None
+        if buffer is None or buffer.seq != seq or (len(buffer.entries) < count and not buffer.complete):
+            self.misses += 1
+            return None
+        self._users.move_to_end(user_id)
+        self.hits += 1
+        return list(buffer.entries)[:count]
+
+    def begin_load(self, user_id: int) -> tuple:
+        """Token to pass to ``seed`` once the rows for a miss have been read"""
+        activity = self._users.get(user_id)
+        if activity is None:
+            activity = self._users[user_id] = UserActivity()
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+                self.evictions += 1
+        return activity, activity.writes
+
+    def seed(self, token: tuple, kind: str, rows: list, complete: bool, seq: int):
+        """Install rows read from the database after the change log was probed at ``seq``, unless a write raced the read"""
+        activity, writes = token
+        if activity.writes != writes:
+            return
+        summary_type = SUMMARY_TYPES[kind]
+        entries = [summary_type.model_validate(row) for row in rows]
+        activity.kinds[kind] = KindBuffer(entries, complete, self.capacity, seq)
+
+    def advance(self, seqs: Dict[int, Tuple[int, int]]):
+        """This process moved users' change logs from one ``seq`` to the next (``log_changes``' result).
+
+        Call it right before applying the write with ``record``, ``update`` or
+        ``remove``, with no ``await`` in between. Buffers that reflected the
+        previous ``seq`` now reflect the new one; any other buffer also missed
+        a write made elsewhere and is dropped.
+        """
+        for user_id, (previous, latest) in seqs.items():
+            activity = self._users.get(user_id)
+            if activity is None:
+                continue
+            for kind, buffer in list(activity.kinds.items()):
+                if buffer.seq == previous:
+                    buffer.seq = latest
+                else:
+                    del activity.kinds[kind]
+
+    def _buffer(self, user_id: int, kind: str) -> Optional[KindBuffer]:
+        activity = self._users.get(user_id)
+        if activity is None:
+            return None
+        activity.writes += 1
+        return activity.kinds.get(kind)
+
+    def record(self, kind: str, row):
+        """A new history row was committed"""
+        buffer = self._buffer(row.user_id, kind)
+        if buffer is None:
+            return
+        entry = SUMMARY_TYPES[kind].model_validate(row)
+        entries = buffer.entries
+        for existing in entries:
+            if existing.id == entry.id:
+                # A load that ran after the commit already buffered this row
+                entries.remove(existing)
+                break
+        position = 0
+        while position < len(entries) and newest_first(entries[position]) > newest_first(entry):
+            position += 1
+        if position == len(entries) and (not buffer.complete or len(entries) == entries.maxlen):
+            # Older than everything buffered; it belongs to the part we don't hold
+            buffer.complete = False
+            return
+        if len(entries) == entries.maxlen:
+            entries.pop()
+            buffer.complete = False
+        entries.insert(position, entry)
+
+    def update(self, kind: str, row):
+        """An existing history row was edited"""
+        buffer = self._buffer(row.user_id, kind)
+        if buffer is None:
+            return
+        for position, entry in enumerate(buffer.entries):
+            if entry.id == row.id:
+                buffer.entries[position] = SUMMARY_TYPES[kind].model_validate(row)
+                return
+
+    def remove(self, kind: str, user_id: int, entry_id: int):
+        """A history row was deleted"""
+        buffer = self._buffer(user_id, kind)
+        if buffer is None:
+            return
+        for entry in buffer.entries:
+            if entry.id == entry_id:
+                buffer.entries.remove(entry)
+                return
+
+    def forget(self, user_id: int):
+        """Drop everything buffered for a user; the next read reloads from the database"""
+        self._users.pop(user_id, None)
+
+    def clear(self):
+        self._users.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "users": len(self._users),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+recent_activity = RecentActivity(
+    capacity=settings.recent_activity_per_user,
+    max_users=settings.recent_activity_max_users,
+)
@@ -0,0 +1,48 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import SearchResult
+
+# Reused content refreshes ``used_at`` at most this often; well under the
+# compactor's ORPHAN_GRACE, so a blob being reused is never old enough to sweep
+USED_AT_REFRESH = timedelta(minutes=1)
+
+
+def results_digest(results_json: str) -> str:
+    """Content address of a serialized result set"""
+    return hashlib.sha256(results_json.encode()).hexdigest()
+
+
+def store_statement(dialect_name: str, rows: list):
+    """``INSERT ... ON CONFLICT`` into search_results for the given dialect.
+
+    Content that is already stored only has ``used_at`` refreshed, and only
+    once it is older than ``USED_AT_REFRESH``; popular results are reused
+    without rewriting or locking their shared row on every search. A refresh
+    locks the row until the caller commits, so a concurrent orphan sweep
+    either waits and then skips the blob, or deletes it first and the insert
+    recreates it. A blob skipped because it was refreshed recently is still
+    far inside the sweep's grace period.
+    """
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    statement = dialect_insert(SearchResult).values([{**row, "used_at": func.now()} for row in rows])
+    stale = datetime.now(timezone.utc) - USED_AT_REFRESH
+    return statement.on_conflict_do_update(
+        index_elements=[SearchResult.hash],
+        set_={"used_at": func.now()},
+        where=or_(SearchResult.used_at.is_(None), SearchResult.used_at < stale),
+    )
+
+
+async def store_results(db: AsyncSession, results_json: str) -> str:
+    """Store a result set once, whoever searched for it, and return its hash.
+
+    Runs in the caller's transaction. Identical content from any number of users
+    (or concurrent requests) collapses into one row.
+    """
+    digest = results_digest(results_json)
+    statement = store_statement(db.get_bind().dialect.name, [{"hash": digest, "results": results_json}])
+    await db.execute(statement)
+    return digest
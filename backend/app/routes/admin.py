@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.dependencies import get_current_admin_user, get_db, get_session_factory
+from app.schemas import CurrentUser, ImportReport, MessageResponse
+from app.user_purge import delete_user
+from app.bulk_import import DEFAULT_IMPORT_CHUNK_SIZE, MAX_IMPORT_CHUNK_SIZE, HistoryImporter, ndjson_lines
+
+router = APIRouter(tags=["admin"])
+
+
+@router.post("/import/history", response_model=ImportReport)
+async def import_history(
+    request: Request,
+    chunk_size: int = Query(DEFAULT_IMPORT_CHUNK_SIZE, ge=1, le=MAX_IMPORT_CHUNK_SIZE),
+    admin: CurrentUser = Depends(get_current_admin_user),
+    session_factory: async_sessionmaker = Depends(get_session_factory),
+):
+    """Bulk-load search and image history from an NDJSON body, one record per line.
+
+    The body is read as it arrives and written ``chunk_size`` lines at a time,
+    so memory stays flat however large the upload is. Invalid lines and failed
+    chunks are listed in the report instead of aborting the import.
+    """
+    importer = HistoryImporter(session_factory, chunk_size=chunk_size)
+    return await importer.run(ndjson_lines(request.stream()))
+
+
+@router.delete("/users/{user_id}", status_code=status.HTTP_202_ACCEPTED, response_model=MessageResponse)
+async def delete_user_account(user_id: int, admin: CurrentUser = Depends(get_current_admin_user), db: AsyncSession = Depends(get_db)):
+    """Delete an account; it stops authenticating now and its history is purged in the background"""
+    username = await delete_user(db, user_id)
+    if username is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    return {"message": f"User {username} deleted"}
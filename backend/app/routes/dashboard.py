@@ -1,12 +1,67 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.dependencies import get_db, get_current_user
-from app.models import SearchHistory, ImageHistory, User
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import Integer, String, delete, literal_column, null, select, union_all, update
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import defer, undefer
+from app.dependencies import get_db, get_current_user, get_session_factory
+from app.models import HistoryChange, SearchHistory, ImageHistory, live
+from app.config import settings
+from app.schemas import (
+    CurrentUser, DashboardEntry, SearchPage, ImagePage, TimelineEntry, TimelinePage,
+    SearchResponse, SearchDetail, ImageResponse, MessageResponse, SearchUpdated, ImageUpdated,
+    ChangesPage, HistoryChangeEntry, HistorySelection, BulkSearchUpdate, BulkImageUpdate, BulkResult,
+)
+from app.history_writer import history_writer
+from app.history_versions import etag_matches, history_etag_value, latest_seq
+from app.change_log import CHANGE_DELETE, CHANGE_UPSERT, log_changes
+from app.recent_activity import HISTORY_KINDS, SUMMARY_TYPES, recent_activity
+from app.raw_json import RawJSONResponse, encode, splice_object
+from app.export import export_csv, export_ndjson
+from app.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, DEFAULT_CHANGES_PAGE_SIZE, MAX_CHANGES_PAGE_SIZE, TIMELINE_KINDS,
+    encode_cursor, decode_cursor, decode_timeline_cursor, after_cursor, timeline_after_cursor,
+)
 from pydantic import BaseModel
-from typing import Optional
+from datetime import datetime, timezone
+from typing import Literal, Optional
 
 router = APIRouter(tags=["dashboard"])
 
+
+async def get_settled_user(user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
+    """The current user, once any history rows they have buffered are committed"""
+    await history_writer.wait_for_user(user.id)
+    return user
+
+
+def cache_headers(etag: str) -> dict:
+    # Clients may keep the body but must revalidate it on every use
+    return {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+
+
+async def history_seq(user: CurrentUser = Depends(get_settled_user), db: AsyncSession = Depends(get_db)) -> int:
+    """The user's change-log position, probed once per request"""
+    return await latest_seq(db, user.id)
+
+
+async def history_etag(
+    request: Request,
+    response: Response,
+    user: CurrentUser = Depends(get_settled_user),
+    seq: int = Depends(history_seq),
+) -> str:
+    """Strong ETag for everything the user's history reads return.
+
+    A matching ``If-None-Match`` is answered with 304 right here, after one
+    change-log probe but before the route queries or serializes anything.
+    """
+    etag = history_etag_value(user.id, seq)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag))
+    response.headers.update(cache_headers(etag))
+    return etag
+
  
 # Schemas for PATCH (missing before) 
 class SearchUpdate(BaseModel):
@@ -17,70 +72,474 @@ class ImageUpdate(BaseModel):
 
  
 # Get full history 
-@router.get("/")
-def get_user_history(user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    searches = db.query(SearchHistory).filter(SearchHistory.user_id == user.id).all()
-    images = db.query(ImageHistory).filter(ImageHistory.user_id == user.id).all()
-    return {"searches": searches, "images": images}
+@router.get("/", response_model=DashboardEntry)
+async def get_user_history(
+    user: CurrentUser = Depends(get_settled_user),
+    etag: str = Depends(history_etag),
+    db: AsyncSession = Depends(get_db)
+):
+    """Every entry of the user, newest first. Prefer the paginated endpoints below.
+
+    The body is encoded directly from the rows; stored results are only
+    escaped into their string field, never parsed.
+    """
+    searches = (await db.execute(
+        select(SearchHistory)
+        .options(undefer(SearchHistory.full_results))
+        .where(SearchHistory.user_id == user.id, live(SearchHistory))
+        .order_by(SearchHistory.timestamp.desc(), SearchHistory.id.desc())
+    )).scalars().all()
+    images = (await db.execute(
+        select(ImageHistory)
+        .where(ImageHistory.user_id == user.id, live(ImageHistory))
+        .order_by(ImageHistory.timestamp.desc(), ImageHistory.id.desc())
+    )).scalars().all()
+    body = splice_object({}, {
+        "searches": "[" + ",".join(encode(search_fields(entry)) for entry in searches) + "]",
+        "images": "[" + ",".join(encode(image_fields(entry)) for entry in images) + "]",
+    })
+    return RawJSONResponse(body, headers=cache_headers(etag))
+
+
+def search_fields(entry: SearchHistory) -> dict:
+    """Legacy full view of a search entry; ``results`` is the stored JSON as a string"""
+    return {
+        "id": entry.id,
+        "query": entry.query,
+        "results": entry.full_results,
+        "result_count": entry.result_count,
+        "first_title": entry.first_title,
+        "timestamp": entry.timestamp,
+        "user_id": entry.user_id,
+    }
+
+
+def image_fields(entry: ImageHistory) -> dict:
+    return {
+        "id": entry.id,
+        "prompt": entry.prompt,
+        "image_url": entry.image_url,
+        "timestamp": entry.timestamp,
+        "user_id": entry.user_id,
+    }
+
+
+def search_response(entry: SearchHistory) -> SearchResponse:
+    """Full view of a search entry, with results resolved from shared storage"""
+    return SearchResponse(
+        id=entry.id,
+        query=entry.query,
+        results=entry.full_results,
+        result_count=entry.result_count,
+        first_title=entry.first_title,
+        timestamp=entry.timestamp,
+        user_id=entry.user_id,
+    )
+
+
+def page_statement(model, user_id: int, limit: int, predicate=None, columns=None):
+    """Newest-first slice of one history table, shaped to use its (user_id, timestamp, id) index"""
+    stmt = select(*columns) if columns else select(model)
+    stmt = stmt.where(model.user_id == user_id, live(model))
+    if predicate is not None:
+        stmt = stmt.where(predicate)
+    return stmt.order_by(model.timestamp.desc(), model.id.desc()).limit(limit)
+
+
+async def head_rows(db: AsyncSession, model, user_id: int, count: int, seq: int, options=()):
+    """The user's newest ``count`` rows of ``model``, from their recent-activity buffer when it can answer.
+
+    The buffer answers only if it reflects change-log position ``seq``. On a
+    miss a full buffer's worth is read (one indexed slice either way) and used
+    to seed the buffer for the next first page.
+    """
+    kind = HISTORY_KINDS[model]
+    rows = recent_activity.head(user_id, kind, count, seq)
+    if rows is not None:
+        return rows
+    token = recent_activity.begin_load(user_id)
+    fetched = max(count, recent_activity.capacity)
+    rows = (await db.execute(page_statement(model, user_id, fetched).options(*options))).scalars().all()
+    recent_activity.seed(token, kind, rows, complete=len(rows) < fetched, seq=seq)
+    return rows[:count]
+
+
+async def fetch_page(db: AsyncSession, model, user_id: int, seq: int, limit: int, cursor: Optional[str], options=()):
+    """One newest-first keyset page of ``model`` rows plus the cursor for the next one"""
+    if cursor:
+        predicate = after_cursor(model, *decode_cursor(cursor, 2))
+        stmt = page_statement(model, user_id, limit + 1, predicate).options(*options)
+        rows = (await db.execute(stmt)).scalars().all()
+    else:
+        rows = await head_rows(db, model, user_id, limit + 1, seq, options)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].timestamp, rows[-1].id)
+
+
+# Paginated search history
+@router.get("/searches", response_model=SearchPage, dependencies=[Depends(history_etag)])
+async def list_searches(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    user: CurrentUser = Depends(get_settled_user),
+    seq: int = Depends(history_seq),
+    db: AsyncSession = Depends(get_db)
+):
+    """Search summaries (hit count, first title); ``results`` is never loaded here"""
+    items, next_cursor = await fetch_page(
+        db, SearchHistory, user.id, seq, limit, cursor,
+        options=[defer(SearchHistory.results, raiseload=True)],
+    )
+    return {"items": items, "next_cursor": next_cursor}
+
+
+# Full stored results of one search, spliced into the body without re-parsing
+@router.get("/search/{entry_id}", response_model=SearchDetail)
+async def get_search_entry(
+    entry_id: int,
+    user: CurrentUser = Depends(get_settled_user),
+    etag: str = Depends(history_etag),
+    db: AsyncSession = Depends(get_db)
+):
+    result = await db.execute(
+        select(SearchHistory)
+        .options(undefer(SearchHistory.full_results))
+        .where(SearchHistory.id == entry_id, SearchHistory.user_id == user.id, live(SearchHistory))
+    )
+    entry = result.scalars().first()
+    if not entry:
+        raise HTTPException(status_code=404, detail="Search entry not found")
+    fields = search_fields(entry)
+    raw_results = fields.pop("results")
+    return RawJSONResponse(splice_object(fields, {"results": raw_results}), headers=cache_headers(etag))
+
+
+# Paginated image history
+@router.get("/images", response_model=ImagePage, dependencies=[Depends(history_etag)])
+async def list_images(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    user: CurrentUser = Depends(get_settled_user),
+    seq: int = Depends(history_seq),
+    db: AsyncSession = Depends(get_db)
+):
+    items, next_cursor = await fetch_page(db, ImageHistory, user.id, seq, limit, cursor)
+    return {"items": items, "next_cursor": next_cursor}
+
+
+# One image entry
+@router.get("/image/{entry_id}", response_model=ImageResponse, dependencies=[Depends(history_etag)])
+async def get_image_entry(entry_id: int, user: CurrentUser = Depends(get_settled_user), db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(ImageHistory).where(ImageHistory.id == entry_id, ImageHistory.user_id == user.id, live(ImageHistory)))
+    entry = result.scalars().first()
+    if not entry:
+        raise HTTPException(status_code=404, detail="Image entry not found")
+    return entry
+
+
+# Searches and images merged into one newest-first feed
+@router.get("/timeline", response_model=TimelinePage, dependencies=[Depends(history_etag)])
+async def get_timeline(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    user: CurrentUser = Depends(get_settled_user),
+    seq: int = Depends(history_seq),
+    db: AsyncSession = Depends(get_db)
+):
+    """Newest-first feed of both kinds from one UNION ALL round trip"""
+    position = decode_timeline_cursor(cursor) if cursor else None
+    entries = None if position else recent_timeline(user.id, limit + 1, seq)
+    if entries is None:
+        rows = (await db.execute(timeline_statement(user.id, limit + 1, position))).all()
+        entries = [
+            TimelineEntry(
+                type=row.type,
+                id=row.id,
+                timestamp=row.timestamp,
+                query=row.text if row.type == "search" else None,
+                prompt=row.text if row.type == "image" else None,
+                image_url=row.image_url,
+            )
+            for row in rows
+        ]
+    if len(entries) <= limit:
+        return {"items": entries, "next_cursor": None}
+    page = entries[:limit]
+    last = page[-1]
+    return {"items": page, "next_cursor": encode_cursor(last.timestamp, last.type, last.id)}
+
+
+def recent_timeline(user_id: int, count: int, seq: int) -> Optional[list]:
+    """First timeline entries merged from the recent-activity buffers, or None unless both kinds hit at ``seq``"""
+    searches = recent_activity.head(user_id, "search", count, seq)
+    images = recent_activity.head(user_id, "image", count, seq) if searches is not None else None
+    if images is None:
+        return None
+    entries = [TimelineEntry(type="search", id=e.id, timestamp=e.timestamp, query=e.query) for e in searches]
+    entries += [TimelineEntry(type="image", id=e.id, timestamp=e.timestamp, prompt=e.prompt, image_url=e.image_url) for e in images]
+    # Same order as timeline_statement: newest first, searches before images on ties, newer ids first
+    entries.sort(key=lambda e: (TIMELINE_KINDS.index(e.type), -e.id))
+    entries.sort(key=lambda e: e.timestamp, reverse=True)
+    return entries[:count]
+
+
+# Full history dump, streamed from a server-side cursor
+@router.get("/export", response_model=None)
+async def export_history(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    user: CurrentUser = Depends(get_settled_user),
+    session_factory: async_sessionmaker = Depends(get_session_factory)
+):
+    """Every search (with its stored results) and image of the user, newest first per kind.
+
+    Rows are fetched and written out in fixed-size batches, so memory use does
+    not grow with the history and the first bytes leave after the first batch.
+    """
+    if format == "csv":
+        body, media_type = export_csv(session_factory, user.id), "text/csv"
+    else:
+        body, media_type = export_ndjson(session_factory, user.id), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="history-{user.id}.{format}"'},
+    )
+
+
+# Incremental sync: what changed since the client's last cursor
+@router.get("/changes", response_model=ChangesPage, dependencies=[Depends(history_etag)])
+async def get_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_CHANGES_PAGE_SIZE, ge=1, le=MAX_CHANGES_PAGE_SIZE),
+    user: CurrentUser = Depends(get_settled_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Entries inserted, edited or deleted after change ``since``, oldest change first.
+
+    Several changes to one entry within a page collapse into its latest
+    state. Deleted entries come back as tombstones (``op="delete"``, no
+    body). Pass ``cursor`` back as ``since``; keep going while ``has_more``.
+    """
+    changes = (await db.execute(
+        select(HistoryChange.seq, HistoryChange.kind, HistoryChange.entry_id, HistoryChange.op)
+        .where(HistoryChange.user_id == user.id, HistoryChange.seq > since)
+        .order_by(HistoryChange.seq)
+        .limit(limit + 1)
+    )).all()
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    latest = {(change.kind, change.entry_id): change for change in changes}
+    bodies = {}
+    for kind, model, options in (
+        ("search", SearchHistory, [defer(SearchHistory.results, raiseload=True)]),
+        ("image", ImageHistory, []),
+    ):
+        ids = [entry_id for (k, entry_id), change in latest.items() if k == kind and change.op == CHANGE_UPSERT]
+        if ids:
+            rows = (await db.execute(
+                select(model).options(*options).where(model.id.in_(ids), model.user_id == user.id, live(model))
+            )).scalars().all()
+            bodies.update({(kind, row.id): row for row in rows})
+
+    entries = []
+    for (kind, entry_id), change in sorted(latest.items(), key=lambda item: item[1].seq):
+        body = bodies.get((kind, entry_id))
+        # An upserted row that is gone by now was deleted after this page's changes
+        entries.append(HistoryChangeEntry(
+            seq=change.seq,
+            type=kind,
+            id=entry_id,
+            op=CHANGE_UPSERT if body is not None else CHANGE_DELETE,
+            **({kind: body} if body is not None else {}),
+        ))
+    return {"changes": entries, "cursor": changes[-1].seq if changes else since, "has_more": has_more}
+
+
+def timeline_statement(user_id: int, limit: int, position=None):
+    """UNION ALL of the listing columns of both history tables, merged and limited in the database.
+
+    Each branch is itself an index-ordered ``LIMIT`` slice, so at most ``2 * limit``
+    narrow rows are merged no matter how long the history is. On equal
+    timestamps searches sort before images, then newer ids first.
+    """
+    branches = []
+    for kind, model, text_column, url_column in (
+        ("search", SearchHistory, SearchHistory.query, null().cast(String)),
+        ("image", ImageHistory, ImageHistory.prompt, ImageHistory.image_url),
+    ):
+        # Inline constants: bound parameters in a UNION select list have no type on Postgres
+        columns = [
+            literal_column(f"'{kind}'", String).label("type"),
+            literal_column(str(TIMELINE_KINDS.index(kind)), Integer).label("kind_rank"),
+            model.id.label("id"),
+            text_column.label("text"),
+            url_column.label("image_url"),
+            model.timestamp.label("timestamp"),
+        ]
+        branch = page_statement(model, user_id, limit, timeline_after_cursor(model, kind, position), columns)
+        branches.append(select(*branch.subquery().c))
+    merged = union_all(*branches).subquery()
+    return (
+        select(merged.c.type, merged.c.id, merged.c.text, merged.c.image_url, merged.c.timestamp)
+        .order_by(merged.c.timestamp.desc(), merged.c.kind_rank, merged.c.id.desc())
+        .limit(limit)
+    )
+
+
+def selection_filter(model, user_id: int, selection: HistorySelection) -> list:
+    conditions = [model.user_id == user_id, live(model)]
+    if selection.ids is not None:
+        conditions.append(model.id.in_(selection.ids))
+    if selection.since is not None:
+        conditions.append(model.timestamp >= selection.since)
+    if selection.until is not None:
+        conditions.append(model.timestamp < selection.until)
+    return conditions
+
+
+def removal_statement(model, conditions: list):
+    """Tombstone (``HISTORY_SOFT_DELETE``) or delete the matching rows, returning their ids"""
+    if settings.history_soft_delete:
+        stmt = update(model).values(deleted_at=datetime.now(timezone.utc))
+    else:
+        stmt = delete(model)
+    return stmt.where(*conditions).returning(model.id)
+
+
+async def remove_entries(db: AsyncSession, model, user_id: int, conditions: list) -> list:
+    """Remove the live entries matching ``conditions`` in one statement; returns their ids"""
+    kind = HISTORY_KINDS[model]
+    result = await db.execute(removal_statement(model, conditions), execution_options={"synchronize_session": False})
+    ids = sorted(result.scalars().all())
+    seqs = {}
+    if ids:
+        seqs = await log_changes(db, [(user_id, kind, entry_id, CHANGE_DELETE) for entry_id in ids])
+    await db.commit()
+    recent_activity.advance(seqs)
+    if len(ids) > recent_activity.capacity:
+        recent_activity.forget(user_id)
+    else:
+        for entry_id in ids:
+            recent_activity.remove(kind, user_id, entry_id)
+    return ids
+
+
+async def bulk_update(db: AsyncSession, model, user_id: int, selection: HistorySelection, values: dict) -> list:
+    """Update the selected entries in one statement; returns the ids that were changed"""
+    kind = HISTORY_KINDS[model]
+    # RETURNING the summary columns lets the recent-activity buffers be patched without a re-read
+    summary_columns = [getattr(model, field) for field in SUMMARY_TYPES[kind].model_fields]
+    result = await db.execute(
+        update(model).where(*selection_filter(model, user_id, selection)).values(**values).returning(*summary_columns),
+        execution_options={"synchronize_session": False},
+    )
+    rows = sorted(result.all(), key=lambda row: row.id)
+    seqs = {}
+    if rows:
+        seqs = await log_changes(db, [(user_id, kind, row.id, CHANGE_UPSERT) for row in rows])
+    await db.commit()
+    recent_activity.advance(seqs)
+    for row in rows:
+        recent_activity.update(kind, row)
+    return [row.id for row in rows]
+
+
+@router.post("/search/bulk-delete", response_model=BulkResult)
+async def bulk_delete_searches(selection: HistorySelection, user: CurrentUser = Depends(get_settled_user), db: AsyncSession = Depends(get_db)):
+    ids = await remove_entries(db, SearchHistory, user.id, selection_filter(SearchHistory, user.id, selection))
+    return {"message": f"{len(ids)} search entries deleted", "affected": len(ids), "ids": ids}
+
+
+@router.post("/image/bulk-delete", response_model=BulkResult)
+async def bulk_delete_images(selection: HistorySelection, user: CurrentUser = Depends(get_settled_user), db: AsyncSession = Depends(get_db)):
+    ids = await remove_entries(db, ImageHistory, user.id, selection_filter(ImageHistory, user.id, selection))
+    return {"message": f"{len(ids)} image entries deleted", "affected": len(ids), "ids": ids}
+
+
+@router.post("/search/bulk-update", response_model=BulkResult)
+async def bulk_update_searches(update_data: BulkSearchUpdate, user: CurrentUser = Depends(get_settled_user), db: AsyncSession = Depends(get_db)):
+    ids = await bulk_update(db, SearchHistory, user.id, update_data, {"query": update_data.query})
+    return {"message": f"{len(ids)} search entries updated", "affected": len(ids), "ids": ids}
+
+
+@router.post("/image/bulk-update", response_model=BulkResult)
+async def bulk_update_images(update_data: BulkImageUpdate, user: CurrentUser = Depends(get_settled_user), db: AsyncSession = Depends(get_db)):
+    ids = await bulk_update(db, ImageHistory, user.id, update_data, {"prompt": update_data.prompt})
+    return {"message": f"{len(ids)} image entries updated", "affected": len(ids), "ids": ids}
 
  
 # Delete search entry 
-@router.delete("/search/{entry_id}")
-def delete_search_entry(entry_id: int, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    entry = db.query(SearchHistory).filter(SearchHistory.id == entry_id, SearchHistory.user_id == user.id).first()
-    if not entry:
+@router.delete("/search/{entry_id}", response_model=MessageResponse)
+async def delete_search_entry(entry_id: int, user: CurrentUser = Depends(get_settled_user), db: AsyncSession = Depends(get_db)):
+    conditions = [SearchHistory.id == entry_id, SearchHistory.user_id == user.id, live(SearchHistory)]
+    if not await remove_entries(db, SearchHistory, user.id, conditions):
         raise HTTPException(status_code=404, detail="Entry not found")
-    db.delete(entry)
-    db.commit()
     return {"message": "Search entry deleted successfully"}
 
  
 # Delete image entry 
-@router.delete("/image/{entry_id}")
-def delete_image_entry(entry_id: int, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    entry = db.query(ImageHistory).filter(ImageHistory.id == entry_id, ImageHistory.user_id == user.id).first()
-    if not entry:
+@router.delete("/image/{entry_id}", response_model=MessageResponse)
+async def delete_image_entry(entry_id: int, user: CurrentUser = Depends(get_settled_user), db: AsyncSession = Depends(get_db)):
+    conditions = [ImageHistory.id == entry_id, ImageHistory.user_id == user.id, live(ImageHistory)]
+    if not await remove_entries(db, ImageHistory, user.id, conditions):
         raise HTTPException(status_code=404, detail="Image entry not found")
-    db.delete(entry)
-    db.commit()
     return {"message": "Image entry deleted successfully"}
 
  
 #   PATCH search entry 
-@router.patch("/search/{entry_id}")
-def update_search_entry(
+@router.patch("/search/{entry_id}", response_model=SearchUpdated)
+async def update_search_entry(
     entry_id: int,
     update_data: SearchUpdate,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: CurrentUser = Depends(get_settled_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    entry = db.query(SearchHistory).filter(SearchHistory.id == entry_id, SearchHistory.user_id == user.id).first()
+    result = await db.execute(
+        select(SearchHistory)
+        .options(undefer(SearchHistory.full_results))
+        .where(SearchHistory.id == entry_id, SearchHistory.user_id == user.id, live(SearchHistory))
+    )
+    entry = result.scalars().first()
     if not entry:
         raise HTTPException(status_code=404, detail="Search entry not found")
 
-    if update_data.query is not None:
-        entry.query = update_data.query
+    # Nothing sent: no change row, so the ETag and sync cursors stay put
+    if update_data.query is None:
+        return {"message": "Search entry updated successfully", "entry": search_response(entry)}
 
-    db.commit()
-    db.refresh(entry)
-    return {"message": "Search entry updated successfully", "entry": entry}
+    entry.query = update_data.query
+    seqs = await log_changes(db, [(user.id, "search", entry.id, CHANGE_UPSERT)])
+    await db.commit()
+    await db.refresh(entry)
+    recent_activity.advance(seqs)
+    recent_activity.update("search", entry)
+    return {"message": "Search entry updated successfully", "entry": search_response(entry)}
 
  
 #   PATCH image entry 
-@router.patch("/image/{entry_id}")
-def update_image_entry(
+@router.patch("/image/{entry_id}", response_model=ImageUpdated)
+async def update_image_entry(
     entry_id: int,
     update_data: ImageUpdate,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: CurrentUser = Depends(get_settled_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    entry = db.query(ImageHistory).filter(ImageHistory.id == entry_id, ImageHistory.user_id == user.id).first()
+    result = await db.execute(select(ImageHistory).where(ImageHistory.id == entry_id, ImageHistory.user_id == user.id, live(ImageHistory)))
+    entry = result.scalars().first()
     if not entry:
         raise HTTPException(status_code=404, detail="Image entry not found")
 
-    if update_data.prompt is not None:
-        entry.prompt = update_data.prompt
+    # Nothing sent: no change row, so the ETag and sync cursors stay put
+    if update_data.prompt is None:
+        return {"message": "Image entry updated successfully", "entry": entry}
 
-    db.commit()
-    db.refresh(entry)
+    entry.prompt = update_data.prompt
+    seqs = await log_changes(db, [(user.id, "image", entry.id, CHANGE_UPSERT)])
+    await db.commit()
+    await db.refresh(entry)
+    recent_activity.advance(seqs)
+    recent_activity.update("image", entry)
     return {"message": "Image entry updated successfully", "entry": entry}
\ No newline at end of file
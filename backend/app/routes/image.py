@@ -1,10 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.schemas import ImageRequest
-from app.dependencies import get_current_user, get_db
-from app.models import ImageHistory, User
-import mcp
-from mcp.client.streamable_http import streamablehttp_client
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.schemas import ImageRequest, ImageGenerateResponse, ImageJobAccepted, ImageJobResponse, CurrentUser
+from app.dependencies import get_current_user, get_session_factory
+from app.database import SessionLocal
+from app.models import ImageHistory
+from app.config import settings
+from app.mcp_pool import MCPSessionPool
+from app.jobs import Job, JobQueue, QueueFullError
+from app.singleflight import SingleFlight
+from app.history_writer import history_writer, WriteBufferFullError
+from app.recent_activity import recent_activity
+from app.change_log import CHANGE_UPSERT, log_changes
+from typing import Literal, Union
 import os
 import logging
 from dotenv import load_dotenv
@@ -20,96 +28,215 @@ router = APIRouter()
 FLUX_API_URL = "https://server.smithery.ai/@falahgs/flux-imagegen-mcp-server/mcp?api_key=83d2480b-51ee-442b-82bd-a7f9b9fc198c&profile=considerable-sheep-UHo8NT"
 API_KEY = os.getenv("FLUX_API_KEY")
 
+# Long-lived Flux MCP sessions, opened and closed by the app startup/shutdown hooks
+flux_pool = MCPSessionPool(
+    f"{FLUX_API_URL}?api_key={API_KEY}",
+    size=settings.mcp_pool_size,
+    connect_timeout=settings.mcp_connect_timeout,
+    health_check_interval=settings.mcp_health_check_interval,
+)
+
 async def generate_image(prompt: str):
     if not API_KEY:
         raise HTTPException(status_code=500, detail="FLUX_API_KEY not found in .env")
 
-    url = f"{FLUX_API_URL}?api_key={API_KEY}"
-    logger.info(f"Connecting to Flux MCP at {url}")
+    tool_name = "generateImageUrl"
 
     try:
-        async with streamablehttp_client(url) as (read_stream, write_stream, _):
-            async with mcp.ClientSession(read_stream, write_stream) as session:
-                await session.initialize()
-                tools_result = await session.list_tools()
-
-                if not tools_result.tools:
-                    raise HTTPException(status_code=500, detail="No tools available from Flux MCP")
-
-                tool_name = "generateImageUrl"
-                result = await session.call_tool(
-                    name=tool_name,
-                    arguments={"prompt": prompt}
-                )
+        async with flux_pool.session() as conn:
+            if not conn.tools:
+                raise HTTPException(status_code=500, detail="No tools available from Flux MCP")
+
+            result = await conn.session.call_tool(
+                name=tool_name,
+                arguments={"prompt": prompt}
+            )
 
-                if not result or result.isError:
-                    raise HTTPException(status_code=500, detail=f"No valid response from {tool_name}")
+        if not result or result.isError:
+            raise HTTPException(status_code=500, detail=f"No valid response from {tool_name}")
 
-                if result.content and len(result.content) > 0 and hasattr(result.content[0], 'text'):
-                    data = json.loads(result.content[0].text)
-                    image_url = data.get("imageUrl")
-                    if not image_url:
-                        raise HTTPException(status_code=500, detail="No imageUrl in response")
-                    return image_url
-                else:
-                    raise HTTPException(status_code=500, detail=f"No valid content from {tool_name}")
+        if result.content and len(result.content) > 0 and hasattr(result.content[0], 'text'):
+            data = json.loads(result.content[0].text)
+            image_url = data.get("imageUrl")
+            if not image_url:
+                raise HTTPException(status_code=500, detail="No imageUrl in response")
+            return image_url
+        else:
+            raise HTTPException(status_code=500, detail=f"No valid content from {tool_name}")
 
     except Exception as e:
         logger.exception("Exception in generate_image")
         raise HTTPException(status_code=500, detail=f"Image generation failed: {str(e)}")
 
-@router.post("/generate", status_code=status.HTTP_201_CREATED)
+# Identical prompts that are being generated at the same time share one Flux call
+image_flight = SingleFlight()
+
+async def generate_image_coalesced(prompt: str):
+    """``generate_image``, joined with any in-flight generation of the same prompt"""
+    return await image_flight.do(" ".join(prompt.split()), lambda: generate_image(prompt))
+
+async def save_image_history(session_factory: async_sessionmaker, user_id: int, prompt: str, image_url: str) -> int:
+    """Persist a generated image in its own short transaction and return the row id"""
+    async with session_factory() as db:
+        new_entry = ImageHistory(prompt=prompt, image_url=image_url, user_id=user_id)
+        db.add(new_entry)
+        try:
+            await db.flush()
+            seqs = await log_changes(db, [(user_id, "image", new_entry.id, CHANGE_UPSERT)])
+            await db.commit()
+            await db.refresh(new_entry)
+        except Exception:
+            await db.rollback()
+            raise
+        recent_activity.advance(seqs)
+        recent_activity.record("image", new_entry)
+        return new_entry.id
+
+async def run_image_job(job: Job) -> dict:
+    """Worker body for queued generations: call Flux, then record the history row"""
+    prompt = job.payload["prompt"]
+    image_url = await generate_image_coalesced(prompt)
+    if settings.history_write_behind:
+        # The job is already asynchronous, so wait for the batch to get the id
+        history_id = await (await history_writer.submit_image(job.user_id, prompt, image_url))
+    else:
+        history_id = await save_image_history(SessionLocal, job.user_id, prompt, image_url)
+    logger.info(f"Image job {job.id} saved as history entry {history_id}")
+    return {"image_url": image_url, "history_id": history_id}
+
+image_jobs = JobQueue(
+    run_image_job,
+    workers=settings.image_job_workers,
+    max_queue=settings.image_job_queue_size,
+    retain_seconds=settings.image_job_retention_seconds,
+)
+
+def job_to_response(job: Job) -> ImageJobResponse:
+    result = job.result or {}
+    return ImageJobResponse(
+        job_id=job.id,
+        status=job.status,
+        prompt=job.payload["prompt"],
+        image_url=result.get("image_url"),
+        history_id=result.get("history_id"),
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+    )
+
+@router.post("/generate", status_code=status.HTTP_201_CREATED, response_model=Union[ImageGenerateResponse, ImageJobAccepted])
 async def generate_image_endpoint(
     request: ImageRequest,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    response: Response,
+    mode: Literal["sync", "job"] = "sync",
+    user: CurrentUser = Depends(get_current_user),
+    session_factory: async_sessionmaker = Depends(get_session_factory)
 ):
     """
     API endpoint to generate an image using Flux MCP and save the history for the authenticated user.
+
+    No database connection is held while Flux is working; the history row is
+    written in its own short transaction once the image URL is known (or,
+    with ``HISTORY_WRITE_BEHIND``, buffered and committed in a batch, in which
+    case ``history_id`` is null).
+
+    With ``mode=job`` the generation is queued and a job id is returned right away;
+    progress is available from ``/images/jobs/{job_id}`` and its ``/events`` stream.
     """
     logger.info(f"Image generation request from user {user.username} (ID: {user.id}) for prompt: '{request.prompt}'")
 
+    if mode == "job":
+        try:
+            job = image_jobs.submit(user.id, {"prompt": request.prompt})
+        except QueueFullError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Image generation queue is full, try again later"
+            )
+        logger.info(f"Queued image job {job.id} for user {user.id}")
+        response.status_code = status.HTTP_202_ACCEPTED
+        return ImageJobAccepted(
+            message="Image generation queued",
+            job_id=job.id,
+            status=job.status,
+            status_url=f"/images/jobs/{job.id}",
+            events_url=f"/images/jobs/{job.id}/events",
+        )
+
     try:
         # Generate the image using your working Flux MCP code
-        image_url = await generate_image(request.prompt)
+        image_url = await generate_image_coalesced(request.prompt)
         logger.info(f"Image generated successfully: {image_url}")
 
+        if settings.history_write_behind:
+            # Buffered and committed with other requests' rows; no id until then
+            try:
+                await history_writer.submit_image(user.id, request.prompt, image_url)
+            except WriteBufferFullError:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="History writes are backed up, please retry shortly",
+                    headers={"Retry-After": "1"},
+                )
+            return ImageGenerateResponse(message="Image generated successfully", image_url=image_url)
+
         # Save the history to the database
-        new_entry = ImageHistory(
-            prompt=request.prompt,
-            image_url=image_url,
-            user_id=user.id
-        )
-        
         logger.info(f"Creating image history entry for user {user.id}")
-        db.add(new_entry)
-        
         try:
-            db.commit()
-            db.refresh(new_entry)
-            logger.info(f"Image history saved successfully with ID: {new_entry.id}")
+            history_id = await save_image_history(session_factory, user.id, request.prompt, image_url)
+            logger.info(f"Image history saved successfully with ID: {history_id}")
         except Exception as commit_error:
             logger.error(f"Database commit failed: {commit_error}")
-            db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to save image history"
             )
 
-        return {
-            "message": "Image generated and saved successfully", 
-            "image_url": image_url,
-            "history_id": new_entry.id
-        }
+        return ImageGenerateResponse(
+            message="Image generated and saved successfully",
+            image_url=image_url,
+            history_id=history_id,
+        )
         
     except HTTPException:
         # Re-raise HTTPExceptions as-is (from generate_image function)
-        db.rollback()
         raise
     except Exception as e:
         logger.error(f"Unexpected error in image generation endpoint: {e}")
-        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Image generation failed: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.get("/jobs/{job_id}", response_model=ImageJobResponse)
+async def get_image_job(job_id: str, user: CurrentUser = Depends(get_current_user)):
+    """Poll the status of a queued image generation"""
+    job = image_jobs.get(job_id, user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Image job not found")
+    return job_to_response(job)
+
+@router.get("/jobs/{job_id}/events")
+async def stream_image_job(job_id: str, user: CurrentUser = Depends(get_current_user)):
+    """Server-Sent Events stream of status changes until the job finishes"""
+    job = image_jobs.get(job_id, user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Image job not found")
+
+    async def event_stream():
+        seen_version = -1
+        while True:
+            if job.version != seen_version:
+                seen_version = job.version
+                yield f"event: status\ndata: {job_to_response(job).model_dump_json()}\n\n"
+                if job.finished:
+                    return
+            elif not await job.wait_for_change(seen_version, timeout=15.0):
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
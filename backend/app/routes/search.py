@@ -1,10 +1,17 @@
 
 # Updated routes/search.py with debugging
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.dependencies import get_current_user, get_db
-from app.models import SearchHistory, User
-from duckduckgo_search import DDGS
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.dependencies import get_current_user, get_session_factory
+from app.models import SearchHistory
+from app.schemas import CurrentUser, SearchRunResponse
+from app.search_backend import search_backend, summarize_results
+from app.results_store import store_results
+from app.history_writer import history_writer, WriteBufferFullError
+from app.config import settings
+from app.recent_activity import recent_activity
+from app.change_log import CHANGE_UPSERT, log_changes
+import asyncio
 import json
 import logging
 
@@ -12,52 +19,104 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["search"])
 
-@router.get("/")
+# nginx's "client closed request"; nobody reads it, but it keeps logs honest
+CLIENT_CLOSED_REQUEST = 499
+
+class ClientDisconnected(Exception):
+    pass
+
+async def cancel_on_disconnect(request: Request, awaitable, poll_interval: float = 0.25):
+    """Await ``awaitable``, cancelling it if the client hangs up first"""
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+
+@router.get("/", response_model=SearchRunResponse)
 async def search(
     query: str,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    user: CurrentUser = Depends(get_current_user),
+    session_factory: async_sessionmaker = Depends(get_session_factory)
 ):
     """
     Performs a web search using DuckDuckGo, returns the results,
     and saves the search history for the authenticated user.
+
+    No database connection is held while DuckDuckGo is being queried; the
+    history row is written in its own short transaction afterwards. Results
+    come from the shared search cache when the normalized query was seen
+    recently, but every call still records its own history row. If the client
+    disconnects while DuckDuckGo is still working, the search is abandoned.
+
+    With ``HISTORY_WRITE_BEHIND`` the row is buffered and committed in a batch
+    with other requests' rows, and ``history_id`` is null.
     """
     logger.info(f"Search request from user {user.username} (ID: {user.id}) for query: '{query}'")
     
     try:
-        ddgs = DDGS()
-        # Get a maximum of 5 search results
-        results = list(ddgs.text(query, max_results=5))
-        logger.info(f"DuckDuckGo search returned {len(results)} results")
+        # Get a maximum of 5 search results, from the cache when possible
+        results = await cancel_on_disconnect(request, search_backend.search(query))
+        logger.info(f"Search returned {len(results)} results")
         
         # Convert the list of results to a JSON string for database storage
         results_json = json.dumps(results)
+        result_count, first_title = summarize_results(results)
+
+        if settings.history_write_behind:
+            # Buffered and committed with other requests' rows; no id until then
+            await history_writer.submit_search(user.id, query, results_json, result_count, first_title)
+            return {"query": query, "results": results, "history_id": None}
 
         # Save the search history to the database
         new_entry = SearchHistory(
             query=query,
-            results=results_json,
+            result_count=result_count,
+            first_title=first_title,
             user_id=user.id
         )
         
         logger.info(f"Creating search history entry for user {user.id}")
-        db.add(new_entry)
-        
-        try:
-            db.commit()
-            db.refresh(new_entry)
-            logger.info(f"Search history saved successfully with ID: {new_entry.id}")
-        except Exception as commit_error:
-            logger.error(f"Database commit failed: {commit_error}")
-            db.rollback()
-            raise
+        async with session_factory() as db:
+            try:
+                # Results are shared by content hash; the history row only references them
+                new_entry.results_hash = await store_results(db, results_json)
+                db.add(new_entry)
+                await db.flush()
+                seqs = await log_changes(db, [(user.id, "search", new_entry.id, CHANGE_UPSERT)])
+                await db.commit()
+                await db.refresh(new_entry)
+                logger.info(f"Search history saved successfully with ID: {new_entry.id}")
+                recent_activity.advance(seqs)
+                recent_activity.record("search", new_entry)
+            except Exception as commit_error:
+                logger.error(f"Database commit failed: {commit_error}")
+                await db.rollback()
+                raise
 
         return {"query": query, "results": results, "history_id": new_entry.id}
-        
+
+    except ClientDisconnected:
+        logger.info(f"Client disconnected during search for '{query}', abandoning it")
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    except WriteBufferFullError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="History writes are backed up, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    except HTTPException:
+        # Busy (503) and timeout (504) from the search backend pass through as-is
+        raise
     except Exception as e:
-        # Rollback the session in case of an error to prevent inconsistent state
         logger.error(f"Search operation failed: {e}")
-        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An error occurred during search: {e}"
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, List, Literal, Optional
 
 # User schemas
 class UserCreate(BaseModel):
@@ -16,6 +16,20 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class RegisterResponse(BaseModel):
+    message: str
+    user_id: int
+
+class CurrentUser(BaseModel):
+    """Authenticated principal handed to routes; immutable so it can be cached"""
+    id: int
+    username: str
+    is_admin: bool
+
+    class Config:
+        from_attributes = True
+        frozen = True
+
 # Token schemas
 class Token(BaseModel):
     access_token: str
@@ -39,22 +53,177 @@ class ImageResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class ImageGenerateResponse(BaseModel):
+    message: str
+    image_url: str
+    history_id: Optional[int] = None  # null while a write-behind row is buffered
+
+class ImageJobAccepted(BaseModel):
+    message: str
+    job_id: str
+    status: str
+    status_url: str
+    events_url: str
+
+class ImageJobResponse(BaseModel):
+    job_id: str
+    status: str
+    prompt: str
+    image_url: Optional[str] = None
+    history_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
 # Search schemas
+class SearchRunResponse(BaseModel):
+    query: str
+    results: List[Any]
+    history_id: Optional[int] = None  # null while a write-behind row is buffered
+
 class SearchResponse(BaseModel):
     id: int
     query: str
     results: str  # JSON string
+    result_count: Optional[int] = None
+    first_title: Optional[str] = None
     timestamp: datetime
     user_id: int
     
     class Config:
         from_attributes = True
 
+class SearchSummary(BaseModel):
+    """Listing view of a search; the full results come from /dashboard/search/{id}"""
+    id: int
+    query: str
+    result_count: Optional[int] = None
+    first_title: Optional[str] = None
+    timestamp: datetime
+    user_id: int
+
+    class Config:
+        from_attributes = True
+
+class SearchDetail(BaseModel):
+    """A search with its stored results embedded as JSON (not as a string)"""
+    id: int
+    query: str
+    result_count: Optional[int] = None
+    first_title: Optional[str] = None
+    timestamp: datetime
+    user_id: int
+    results: List[Any]
+
 # Dashboard schemas
 class DashboardEntry(BaseModel):
     searches: List[SearchResponse]
     images: List[ImageResponse]
 
+class MessageResponse(BaseModel):
+    message: str
+
+class SearchUpdated(BaseModel):
+    message: str
+    entry: SearchResponse
+
+class ImageUpdated(BaseModel):
+    message: str
+    entry: ImageResponse
+
+# Bulk dashboard operations
+MAX_BULK_IDS = 1000
+
+class HistorySelection(BaseModel):
+    """Entries of the current user matching every given criterion"""
+    ids: Optional[List[int]] = Field(None, min_length=1, max_length=MAX_BULK_IDS)
+    since: Optional[datetime] = None  # inclusive
+    until: Optional[datetime] = None  # exclusive
+
+    @model_validator(mode="after")
+    def require_criterion(self):
+        if self.ids is None and self.since is None and self.until is None:
+            raise ValueError("select entries with ids, since or until")
+        return self
+
+class BulkSearchUpdate(HistorySelection):
+    query: str = Field(max_length=1000)
+
+class BulkImageUpdate(HistorySelection):
+    prompt: str = Field(max_length=1000)
+
+class BulkResult(BaseModel):
+    message: str
+    affected: int
+    ids: List[int]
+
+class SearchPage(BaseModel):
+    items: List[SearchSummary]
+    next_cursor: Optional[str] = None
+
+class ImagePage(BaseModel):
+    items: List[ImageResponse]
+    next_cursor: Optional[str] = None
+
+class TimelineEntry(BaseModel):
+    type: str  # "search" or "image"
+    id: int
+    timestamp: datetime
+    query: Optional[str] = None
+    prompt: Optional[str] = None
+    image_url: Optional[str] = None
+
+class TimelinePage(BaseModel):
+    items: List[TimelineEntry]
+    next_cursor: Optional[str] = None
+
+class HistoryChangeEntry(BaseModel):
+    """Latest state of one entry; ``delete`` entries are tombstones without a body"""
+    seq: int
+    type: str  # "search" or "image"
+    id: int
+    op: str  # "upsert" or "delete"
+    search: Optional[SearchSummary] = None
+    image: Optional[ImageResponse] = None
+
+class ChangesPage(BaseModel):
+    changes: List[HistoryChangeEntry]
+    cursor: int  # pass back as ``since``
+    has_more: bool
+
+# Bulk import schemas (one NDJSON line each)
+class SearchImportRecord(BaseModel):
+    type: Literal["search"]
+    user_id: int
+    query: str = Field(max_length=1000)
+    results: List[Any] = []
+    timestamp: Optional[datetime] = None
+
+class ImageImportRecord(BaseModel):
+    type: Literal["image"]
+    user_id: int
+    prompt: str = Field(max_length=1000)
+    image_url: str = Field(max_length=2000)
+    timestamp: Optional[datetime] = None
+
+class ImportLineError(BaseModel):
+    chunk: int
+    line: Optional[int] = None  # None when the whole chunk failed
+    error: str
+
+class ImportReport(BaseModel):
+    method: str  # "copy" on Postgres, "insert" elsewhere
+    lines: int
+    imported: int
+    searches: int
+    images: int
+    failed: int
+    chunks: int
+    elapsed_seconds: float
+    rows_per_second: float
+    errors: List[ImportLineError]
+    errors_truncated: bool = False
+
 class HistoryBase(BaseModel):
     type: str
     query: str
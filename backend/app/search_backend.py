@@ -0,0 +1,212 @@
+import asyncio
+import json
+import logging
+import math
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Set, Tuple
+
+from duckduckgo_search import DDGS
+from fastapi import HTTPException, status
+
+from app.cache import ResultCache
+from app.config import settings
+from app.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+MAX_RESULTS = 5
+
+
+def normalize_query(query: str) -> str:
+    """Cache key for a query: NFKC-normalized, case-folded, whitespace collapsed"""
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+def summarize_results(results: List[dict]) -> Tuple[int, Optional[str]]:
+    """Hit count and first title stored alongside a history row for listings"""
+    first_title = results[0].get("title") if results else None
+    return len(results), first_title[:1000] if first_title else None
+
+
+def ddg_text_search(query: str) -> List[dict]:
+    """Run a DuckDuckGo text search (blocking)"""
+    ddgs = DDGS(timeout=math.ceil(settings.search_timeout_seconds))
+    return list(ddgs.text(query, max_results=MAX_RESULTS))
+
+
+class ThreadedSearchClient:
+    """Async adapter that runs a blocking search function on its own thread pool.
+
+    The pool is dedicated to search so slow DuckDuckGo calls cannot starve the
+    default executor used elsewhere. Every call has a deadline (504 when it
+    passes) and calls beyond ``workers + queue_limit`` outstanding searches are
+    rejected with 503. Cancelling the awaiting task drops a search that is
+    still queued; one already running is abandoned and still counts towards
+    the bound until its thread finishes, which the HTTP client timeout caps.
+    """
+
+    def __init__(self, fetch: Callable[[str], List[dict]], workers: int = 8, queue_limit: int = 32, timeout: float = 10.0):
+        self.fetch = fetch
+        self.workers = max(1, workers)
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._outstanding = 0
+        self._timeouts = 0
+        self._cancelled = 0
+        self._rejected = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="search")
+        return self._executor
+
+    def _finished(self, _):
+        with self._lock:
+            self._outstanding -= 1
+
+    async def __call__(self, query: str) -> List[dict]:
+        with self._lock:
+            if self._outstanding >= self.workers + self.queue_limit:
+                self._rejected += 1
+                busy = True
+            else:
+                self._outstanding += 1
+                busy = False
+        if busy:
+            logger.warning("Search executor saturated, rejecting request")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Search service is busy, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        future = self._get_executor().submit(self.fetch, query)
+        future.add_done_callback(self._finished)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            logger.warning(f"Search for '{query}' exceeded {self.timeout}s")
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Search timed out",
+            )
+        except asyncio.CancelledError:
+            self._cancelled += 1
+            raise
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        outstanding = self._outstanding
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "running": min(outstanding, self.workers),
+            "queued": max(0, outstanding - self.workers),
+            "timeouts": self._timeouts,
+            "cancelled": self._cancelled,
+            "rejected": self._rejected,
+        }
+
+
+class SearchBackend:
+    """DuckDuckGo search behind a shared, process-wide result cache.
+
+    Results are shared by every user: two queries that normalize to the same
+    key are answered from one upstream call. Fresh hits return straight from
+    memory; stale hits are returned as well while a single background task
+    fetches a replacement. Only misses wait on DuckDuckGo, and concurrent
+    misses for the same key share a single upstream call.
+    """
+
+    def __init__(self, client: ThreadedSearchClient, cache: ResultCache):
+        self.client = client
+        self.cache = cache
+        self.flight = SingleFlight()
+        self._refreshing: Set[str] = set()
+        # Strong references: the loop only keeps weak ones to running tasks
+        self._tasks: Set[asyncio.Task] = set()
+        self._refreshes = 0
+        self._refresh_failures = 0
+
+    async def search(self, query: str) -> List[dict]:
+        key = normalize_query(query)
+        cached = self.cache.lookup(key)
+        if cached is not None:
+            results, stale = cached
+            if stale:
+                self._schedule_refresh(key, query)
+            return results
+
+        return await self.flight.do(key, lambda: self._fetch_and_store(key, query))
+
+    async def _fetch_and_store(self, key: str, query: str) -> List[dict]:
+        results = await self.client(query)
+        self._store(key, results)
+        return results
+
+    def _store(self, key: str, results: List[dict]):
+        size = len(key) + len(json.dumps(results).encode())
+        self.cache.store(key, results, size)
+
+    def _schedule_refresh(self, key: str, query: str):
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        task = asyncio.get_running_loop().create_task(self._refresh(key, query))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, key: str, query: str):
+        try:
+            results = await self.client(query)
+            self._store(key, results)
+            self._refreshes += 1
+        except Exception as e:
+            # Keep serving the stale entry until it ages out completely
+            self._refresh_failures += 1
+            logger.warning(f"Background refresh for search '{key}' failed: {e}")
+        finally:
+            self._refreshing.discard(key)
+
+    def clear(self):
+        self.cache.clear()
+
+    async def close(self):
+        """Cancel background refreshes still running and stop the search threads"""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.client.shutdown()
+
+    def stats(self) -> dict:
+        return {
+            **self.cache.stats(),
+            "refreshing": len(self._refreshing),
+            "refreshes": self._refreshes,
+            "refresh_failures": self._refresh_failures,
+        }
+
+
+search_backend = SearchBackend(
+    client=ThreadedSearchClient(
+        ddg_text_search,
+        workers=settings.search_workers,
+        queue_limit=settings.search_queue_limit,
+        timeout=settings.search_timeout_seconds,
+    ),
+    cache=ResultCache(
+        max_bytes=settings.search_cache_max_bytes,
+        ttl=settings.search_cache_ttl_seconds,
+        stale_ttl=settings.search_cache_stale_seconds,
+    ),
+)
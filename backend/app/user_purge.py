@@ -0,0 +1,179 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import delete, or_, select, true, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth_cache import principal_cache
+from app.config import settings
+from app.database import SessionLocal
+from app.models import HistoryChange, ImageHistory, SearchHistory, User, live
+from app.recent_activity import recent_activity
+
+logger = logging.getLogger(__name__)
+
+# Everything keyed by users.id: the column each batch is picked by, and one
+# pass per partial index (live history rows, then tombstones)
+USER_TABLES = [
+    (SearchHistory, SearchHistory.id, live(SearchHistory)),
+    (SearchHistory, SearchHistory.id, SearchHistory.deleted_at.isnot(None)),
+    (ImageHistory, ImageHistory.id, live(ImageHistory)),
+    (ImageHistory, ImageHistory.id, ImageHistory.deleted_at.isnot(None)),
+    (HistoryChange, HistoryChange.seq, true()),
+]
+
+
+class UserPurger:
+    """Removes deleted accounts' history in the background, a batch at a time.
+
+    Each batch is its own short ``DELETE ... WHERE id IN (SELECT ... LIMIT n)``
+    transaction, followed by a pause, so a user with millions of rows never
+    holds long locks or loads their history into memory. The user row goes
+    last; its ``ON DELETE CASCADE`` keys catch anything written meanwhile.
+
+    Only one worker purges an account at a time: it claims the user row
+    first and renews the claim with every batch. The others wait, and take
+    over only if the claim goes ``claim_timeout`` seconds without renewal.
+    Purges interrupted by a restart are picked up again by ``resume``. Shared
+    ``search_results`` blobs are left to the compactor's orphan sweep.
+    """
+
+    def __init__(self, batch_size: int = 1000, pause: float = 0.05, claim_timeout: float = 300.0, session_factory=SessionLocal):
+        self.batch_size = batch_size
+        self.pause = pause
+        self.claim_timeout = claim_timeout
+        self.session_factory = session_factory
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self.users_purged = 0
+        self.rows_purged = 0
+        self.failed = 0
+
+    def schedule(self, user_id: int) -> asyncio.Task:
+        task = self._tasks.get(user_id)
+        if task is None or task.done():
+            task = self._tasks[user_id] = asyncio.create_task(self.purge(user_id))
+            task.add_done_callback(lambda _: self._tasks.pop(user_id, None))
+        return task
+
+    async def resume(self) -> int:
+        """Schedule every account that was deleted but not yet purged; ones claimed elsewhere wait on the claim"""
+        async with self.session_factory() as db:
+            result = await db.execute(select(User.id).where(User.deleted_at.isnot(None)))
+            user_ids = result.scalars().all()
+        for user_id in user_ids:
+            self.schedule(user_id)
+        if user_ids:
+            logger.info(f"Resuming purge of {len(user_ids)} deleted users")
+        return len(user_ids)
+
+    async def _claim(self, user_id: int) -> bool:
+        """Claim a deleted account unless another worker holds a live claim on it"""
+        now = datetime.now(timezone.utc)
+        async with self.session_factory() as db:
+            result = await db.execute(
+                update(User)
+                .where(
+                    User.id == user_id,
+                    User.deleted_at.isnot(None),
+                    or_(User.purge_claimed_at.is_(None), User.purge_claimed_at < now - timedelta(seconds=self.claim_timeout)),
+                )
+                .values(purge_claimed_at=now)
+                .returning(User.id),
+                execution_options={"synchronize_session": False},
+            )
+            claimed = result.scalar() is not None
+            await db.commit()
+        return claimed
+
+    async def _pending(self, user_id: int) -> bool:
+        async with self.session_factory() as db:
+            result = await db.execute(select(User.id).where(User.id == user_id, User.deleted_at.isnot(None)))
+            return result.scalar() is not None
+
+    async def _delete_batch(self, model, key, predicate, user_id: int) -> int:
+        batch = select(key).where(model.user_id == user_id, predicate).limit(self.batch_size).scalar_subquery()
+        async with self.session_factory() as db:
+            result = await db.execute(delete(model).where(key.in_(batch)), execution_options={"synchronize_session": False})
+            await db.execute(
+                update(User).where(User.id == user_id).values(purge_claimed_at=datetime.now(timezone.utc)),
+                execution_options={"synchronize_session": False},
+            )
+            await db.commit()
+        return result.rowcount
+
+    async def purge(self, user_id: int):
+        try:
+            while not await self._claim(user_id):
+                # Another worker is purging it; take over only if that worker dies
+                if not await self._pending(user_id):
+                    return
+                await asyncio.sleep(self.claim_timeout)
+            removed = 0
+            for model, key, predicate in USER_TABLES:
+                while True:
+                    count = await self._delete_batch(model, key, predicate, user_id)
+                    removed += count
+                    self.rows_purged += count
+                    if count == 0:
+                        break
+                    await asyncio.sleep(self.pause)
+            async with self.session_factory() as db:
+                await db.execute(
+                    delete(User).where(User.id == user_id, User.deleted_at.isnot(None)),
+                    execution_options={"synchronize_session": False},
+                )
+                await db.commit()
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Purge of user {user_id} failed; it is retried on the next startup: {e}")
+            return
+        self.users_purged += 1
+        logger.info(f"Purged user {user_id} and {removed} history rows")
+
+    async def close(self):
+        """Stop running purges; they resume from where they were on the next startup"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "active": len(self._tasks),
+            "users_purged": self.users_purged,
+            "rows_purged": self.rows_purged,
+            "failed": self.failed,
+        }
+
+
+async def delete_user(db: AsyncSession, user_id: int) -> Optional[str]:
+    """Mark an account deleted and queue its purge; returns the username, or None if there was no such user.
+
+    The account stops authenticating on this worker at once. Other workers
+    keep a cached principal for at most ``AUTH_CACHE_TTL_SECONDS``.
+    """
+    result = await db.execute(
+        update(User)
+        .where(User.id == user_id, User.deleted_at.is_(None))
+        .values(deleted_at=datetime.now(timezone.utc))
+        .returning(User.username),
+        execution_options={"synchronize_session": False},
+    )
+    username = result.scalar()
+    if username is None:
+        return None
+    await db.commit()
+    principal_cache.invalidate_user(username=username, user_id=user_id)
+    recent_activity.forget(user_id)
+    user_purger.schedule(user_id)
+    logger.info(f"User {username} deleted; history purge scheduled")
+    return username
+
+
+user_purger = UserPurger(
+    batch_size=settings.user_purge_batch_size,
+    pause=settings.user_purge_pause_seconds,
+    claim_timeout=settings.user_purge_claim_timeout_seconds,
+)
@@ -0,0 +1,84 @@
+"""Compare dashboard serialization paths on a 1000-row history.
+
+    cd backend && python -m benchmarks.bench_history_serialization [rows]
+
+"orm + jsonable_encoder" is how FastAPI serializes ORM rows returned from a
+route. "parse + re-encode" is what embedding results as JSON costs when the
+stored text is loaded back into Python objects first. "raw splice" is the
+path the dashboard uses now: stored JSON is escaped or spliced verbatim.
+"""
+import json
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.models import SearchHistory
+from app.raw_json import encode, splice_object
+from app.routes.dashboard import search_fields
+
+
+def make_rows(count: int):
+    results = json.dumps([
+        {"title": f"Result {i}", "href": f"https://example.com/{i}", "body": "Lorem ipsum dolor sit amet " * 8}
+        for i in range(5)
+    ])
+    base = datetime(2024, 1, 1)
+    rows = []
+    for i in range(count):
+        row = SearchHistory(
+            id=i, query=f"query {i}", results=results, result_count=5,
+            first_title="Result 0", timestamp=base + timedelta(seconds=i), user_id=1,
+        )
+        # What undefer(full_results) would have loaded
+        row.__dict__["full_results"] = results
+        rows.append(row)
+    return rows
+
+
+def orm_jsonable(rows):
+    return JSONResponse(jsonable_encoder({"searches": rows, "images": []})).body
+
+
+def parse_and_reencode(rows):
+    items = []
+    for row in rows:
+        fields = search_fields(row)
+        fields["results"] = json.loads(fields["results"])
+        items.append(fields)
+    return JSONResponse(jsonable_encoder({"searches": items})).body
+
+
+def raw_string(rows):
+    return splice_object({}, {"searches": "[" + ",".join(encode(search_fields(r)) for r in rows) + "]", "images": "[]"}).encode()
+
+
+def raw_splice(rows):
+    parts = []
+    for row in rows:
+        fields = search_fields(row)
+        raw_results = fields.pop("results")
+        parts.append(splice_object(fields, {"results": raw_results}))
+    return ("{\"searches\":[" + ",".join(parts) + "]}").encode()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rows = make_rows(count)
+    cases = [
+        ("orm + jsonable_encoder (results as string)", orm_jsonable),
+        ("raw encode (results as string)", raw_string),
+        ("parse + re-encode (results as JSON)", parse_and_reencode),
+        ("raw splice (results as JSON)", raw_splice),
+    ]
+    print(f"{count} search rows, {len(raw_splice(rows)) / 1024:.0f} KiB body")
+    for name, fn in cases:
+        runs = 20
+        seconds = min(timeit.repeat(lambda: fn(rows), number=runs, repeat=3)) / runs
+        print(f"{name:45s} {seconds * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Encode time and allocations for a large dashboard page, before and after typed responses.
+
+    cd backend && python -m benchmarks.bench_response_encoding [rows]
+
+"before" is what routes used to do: return ORM rows in a plain dict and let
+FastAPI walk them with ``jsonable_encoder`` into a stdlib ``JSONResponse``.
+"after" is the current path: the declared response model validates and
+serializes the rows in pydantic-core and ``ORJSONResponse`` renders the bytes.
+"""
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.models import ImageHistory, SearchHistory
+from app.schemas import ImagePage, SearchPage
+
+
+def make_rows(count: int):
+    base = datetime(2024, 1, 1)
+    searches = [
+        SearchHistory(
+            id=i, query=f"query {i}", result_count=5, first_title=f"Result title {i}",
+            timestamp=base + timedelta(seconds=i), user_id=1,
+        )
+        for i in range(count)
+    ]
+    images = [
+        ImageHistory(
+            id=i, prompt=f"a prompt describing image {i}", image_url=f"https://example.com/images/{i}.png",
+            timestamp=base + timedelta(seconds=i), user_id=1,
+        )
+        for i in range(count)
+    ]
+    return searches, images
+
+
+def before(searches, images):
+    return JSONResponse(jsonable_encoder({"searches": searches, "images": images})).body
+
+
+def after(searches, images):
+    content = {
+        "searches": SearchPage.model_validate({"items": searches}).model_dump(mode="json"),
+        "images": ImagePage.model_validate({"items": images}).model_dump(mode="json"),
+    }
+    return ORJSONResponse(content).body
+
+
+def peak_allocations(fn, *args) -> int:
+    tracemalloc.start()
+    try:
+        fn(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    searches, images = make_rows(count)
+    print(f"{count} searches + {count} images")
+    for name, fn in (("before: dict + jsonable_encoder + JSONResponse", before), ("after: response model + ORJSONResponse", after)):
+        runs = 10
+        seconds = min(timeit.repeat(lambda: fn(searches, images), number=runs, repeat=3)) / runs
+        peak = peak_allocations(fn, searches, images)
+        print(f"{name:50s} {seconds * 1000:8.2f} ms  {peak / 1024:8.0f} KiB peak")
+
+
+if __name__ == "__main__":
+    main()
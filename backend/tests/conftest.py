@@ -1,12 +1,17 @@
 import pytest
 import asyncio
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from fastapi.testclient import TestClient
-from app.database import Base, get_db
+from app.database import Base, get_db, get_session_factory
 from app.main import app
 from app.models import User
 from app.security import get_password_hash
+from app.auth_cache import principal_cache
+from app.search_backend import search_backend
+from app.recent_activity import recent_activity
 import os
 import tempfile
 
@@ -23,6 +28,18 @@ def test_engine():
     if os.path.exists("./test.db"):
         os.remove("./test.db")
 
+@pytest.fixture(scope="session")
+def async_test_engine(test_engine):
+    """Async engine the application uses against the same test database."""
+    # NullPool: the test client runs each request on a fresh event loop, so
+    # aiosqlite connections must not be reused across requests
+    return create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+
+@pytest.fixture
+def session_factory(async_test_engine):
+    """Async session factory handed to the application under test."""
+    return async_sessionmaker(bind=async_test_engine, autoflush=False, expire_on_commit=False)
+
 @pytest.fixture
 def db_session(test_engine):
     """Create database session for testing."""
@@ -31,8 +48,24 @@ def db_session(test_engine):
     try:
         yield session
     finally:
+        # Leave the shared test database empty for the next test
+        session.rollback()
+        for table in reversed(Base.metadata.sorted_tables):
+            session.execute(table.delete())
+        session.commit()
         session.close()
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Tables are emptied between tests, so cached principals must go too."""
+    principal_cache.clear()
+    search_backend.clear()
+    recent_activity.clear()
+    yield
+    principal_cache.clear()
+    search_backend.clear()
+    recent_activity.clear()
+
 @pytest.fixture
 def test_user(db_session):
     """Create a test user."""
@@ -59,19 +92,19 @@ def test_admin_user(db_session):
     return user
 
 @pytest.fixture
-def client(db_session):
+def client(db_session, session_factory):
     """Create FastAPI test client."""
     # Override database dependency for testing
-    def override_get_db():
-        try:
-            yield db_session
-        except Exception:
-            db_session.rollback()
-            raise
-        finally:
-            pass  # Don't close session in tests
+    async def override_get_db():
+        async with session_factory() as session:
+            try:
+                yield session
+            except Exception:
+                await session.rollback()
+                raise
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
     return TestClient(app)
 
 @pytest.fixture
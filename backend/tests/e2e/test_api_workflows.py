@@ -56,8 +56,8 @@ class TestCompleteUserWorkflow:
         
         # 6. Generate Image (with mocked MCP)
         from unittest.mock import AsyncMock, patch
-        with patch('app.routes.image.streamablehttp_client'), \
-             patch('app.routes.image.mcp.ClientSession'):
+        with patch('app.mcp_pool.streamablehttp_client'), \
+             patch('app.mcp_pool.mcp.ClientSession'):
             
             # Mock successful image generation
             mock_session_instance = AsyncMock()
@@ -70,8 +70,9 @@ class TestCompleteUserWorkflow:
             mock_session_instance.call_tool = AsyncMock(return_value=mock_response)
             
             # Mock the session context manager
-            import app.routes.image as image_module
-            image_module.mcp.ClientSession.return_value.__aenter__.return_value = mock_session_instance
+            import app.mcp_pool as mcp_pool_module
+            mcp_pool_module.mcp.ClientSession.return_value.__aenter__.return_value = mock_session_instance
+            mcp_pool_module.streamablehttp_client.return_value.__aenter__.return_value = (AsyncMock(), AsyncMock(), None)
             
             image_data = {"prompt": "A test image"}
             image_response = client.post("/images/generate", json=image_data, headers=headers)
@@ -194,8 +195,8 @@ class TestImageGenerationWorkflow:
         
         generated_images = []
         for prompt in image_prompts:
-            with patch('app.routes.image.streamablehttp_client'), \
-                 patch('app.routes.image.mcp.ClientSession'):
+            with patch('app.mcp_pool.streamablehttp_client'), \
+                 patch('app.mcp_pool.mcp.ClientSession'):
                 
                 # Mock successful image generation
                 mock_session_instance = AsyncMock()
@@ -208,8 +209,9 @@ class TestImageGenerationWorkflow:
                 mock_session_instance.call_tool = AsyncMock(return_value=mock_response)
                 
                 # Mock the session context manager
-                import app.routes.image as image_module
-                image_module.mcp.ClientSession.return_value.__aenter__.return_value = mock_session_instance
+                import app.mcp_pool as mcp_pool_module
+                mcp_pool_module.mcp.ClientSession.return_value.__aenter__.return_value = mock_session_instance
+                mcp_pool_module.streamablehttp_client.return_value.__aenter__.return_value = (AsyncMock(), AsyncMock(), None)
                 
                 image_data = {"prompt": prompt}
                 response = client.post("/images/generate", json=image_data, headers=auth_headers)
@@ -259,8 +261,8 @@ class TestDashboardWorkflow:
         assert search_response.status_code == 200
         
         # Add image history
-        with patch('app.routes.image.streamablehttp_client'), \
-             patch('app.routes.image.mcp.ClientSession'):
+        with patch('app.mcp_pool.streamablehttp_client'), \
+             patch('app.mcp_pool.mcp.ClientSession'):
             
             mock_session_instance = AsyncMock()
             mock_session_instance.initialize = AsyncMock()
@@ -271,8 +273,9 @@ class TestDashboardWorkflow:
             )
             mock_session_instance.call_tool = AsyncMock(return_value=mock_response)
             
-            import app.routes.image as image_module
-            image_module.mcp.ClientSession.return_value.__aenter__.return_value = mock_session_instance
+            import app.mcp_pool as mcp_pool_module
+            mcp_pool_module.mcp.ClientSession.return_value.__aenter__.return_value = mock_session_instance
+            mcp_pool_module.streamablehttp_client.return_value.__aenter__.return_value = (AsyncMock(), AsyncMock(), None)
             
             image_data = {"prompt": "Dashboard test image"}
             image_response = client.post("/images/generate", json=image_data, headers=auth_headers)
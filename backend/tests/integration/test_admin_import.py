@@ -0,0 +1,168 @@
+import json
+import pytest
+from datetime import datetime, timezone
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.bulk_import import MAX_IMPORT_LINE_BYTES, HistoryImporter, ndjson_lines
+from app.models import HistoryChange, ImageHistory, SearchHistory, SearchResult
+
+RESULTS = [{"title": "Python", "href": "https://python.org", "body": ""}]
+
+
+def ndjson(*records) -> bytes:
+    return b"".join((record if isinstance(record, str) else json.dumps(record)).encode() + b"\n" for record in records)
+
+
+def import_history(client: TestClient, headers: dict, body: bytes, **params):
+    return client.post("/admin/import/history", content=body, params=params,
+                       headers={**headers, "Content-Type": "application/x-ndjson"})
+
+
+class TestAdminImport:
+    """Integration tests for the bulk history import endpoint."""
+
+    def test_records_are_imported(self, client: TestClient, admin_headers: dict, test_user, db_session: Session):
+        """Test that search and image records are written and counted."""
+        body = ndjson(
+            {"type": "search", "user_id": test_user.id, "query": "python", "results": RESULTS, "timestamp": "2024-01-01T12:00:00"},
+            {"type": "search", "user_id": test_user.id, "query": "python again", "results": RESULTS},
+            {"type": "image", "user_id": test_user.id, "prompt": "a cat", "image_url": "https://example.com/cat.png"},
+        )
+        response = import_history(client, admin_headers, body, chunk_size=2)
+
+        assert response.status_code == 200
+        report = response.json()
+        assert report["method"] == "insert"
+        assert (report["lines"], report["imported"], report["searches"], report["images"]) == (3, 3, 2, 1)
+        assert report["failed"] == 0
+        assert report["chunks"] == 2
+        assert report["errors"] == []
+
+        searches = db_session.query(SearchHistory).order_by(SearchHistory.timestamp).all()
+        assert [s.query for s in searches] == ["python", "python again"]
+        assert searches[0].first_title == "Python"
+        assert searches[0].result_count == 1
+        assert db_session.query(SearchResult).count() == 1
+        assert db_session.query(ImageHistory).one().prompt == "a cat"
+
+    def test_invalid_lines_are_reported_and_skipped(self, client: TestClient, admin_headers: dict, test_user, db_session: Session):
+        """Test that malformed lines fail individually without aborting their chunk."""
+        body = ndjson(
+            {"type": "image", "user_id": test_user.id, "prompt": "kept", "image_url": "https://example.com/x.png"},
+            "{not json",
+            {"type": "video", "user_id": test_user.id},
+            {"type": "search", "user_id": test_user.id},
+        ) + b"\n"
+        report = import_history(client, admin_headers, body).json()
+
+        assert report["imported"] == 1
+        assert report["failed"] == 3
+        assert [error["line"] for error in report["errors"]] == [2, 3, 4]
+        assert "query" in report["errors"][2]["error"]
+        assert db_session.query(ImageHistory).count() == 1
+
+    def test_unknown_users_are_rejected(self, client: TestClient, admin_headers: dict, test_user, db_session: Session):
+        """Test that records for users that do not exist are reported, not written."""
+        body = ndjson({"type": "image", "user_id": test_user.id + 1000, "prompt": "orphan", "image_url": "https://example.com/o.png"})
+        report = import_history(client, admin_headers, body).json()
+
+        assert report["imported"] == 0
+        assert report["failed"] == 1
+        assert "unknown user" in report["errors"][0]["error"]
+        assert db_session.query(ImageHistory).count() == 0
+
+    def test_deleted_users_are_rejected(self, client: TestClient, admin_headers: dict, test_user, db_session: Session):
+        """Test that records for accounts awaiting purge are not written."""
+        test_user.deleted_at = datetime.now(timezone.utc)
+        db_session.commit()
+        body = ndjson({"type": "image", "user_id": test_user.id, "prompt": "late", "image_url": "https://example.com/l.png"})
+        report = import_history(client, admin_headers, body).json()
+
+        assert (report["imported"], report["failed"]) == (0, 1)
+        assert "unknown user" in report["errors"][0]["error"]
+        assert db_session.query(ImageHistory).count() == 0
+
+    def test_overlong_lines_are_reported_and_skipped(self, client: TestClient, admin_headers: dict, test_user, db_session: Session):
+        """Test that a line over the size limit fails on its own."""
+        body = ndjson(
+            {"type": "image", "user_id": test_user.id, "prompt": "x" * MAX_IMPORT_LINE_BYTES, "image_url": "https://example.com/x.png"},
+            {"type": "image", "user_id": test_user.id, "prompt": "kept", "image_url": "https://example.com/k.png"},
+        )
+        report = import_history(client, admin_headers, body).json()
+
+        assert (report["lines"], report["imported"], report["failed"]) == (2, 1, 1)
+        assert report["errors"][0]["line"] == 1
+        assert "exceeds" in report["errors"][0]["error"]
+        assert db_session.query(ImageHistory).one().prompt == "kept"
+
+    def test_requires_admin(self, client: TestClient, auth_headers: dict, test_user):
+        """Test that regular users cannot import history."""
+        body = ndjson({"type": "image", "user_id": test_user.id, "prompt": "x", "image_url": "https://example.com/x.png"})
+        assert import_history(client, auth_headers, body).status_code == 403
+
+    def test_chunk_size_is_bounded(self, client: TestClient, admin_headers: dict):
+        """Test that out-of-range chunk sizes are rejected."""
+        assert import_history(client, admin_headers, b"", chunk_size=0).status_code == 422
+        assert import_history(client, admin_headers, b"", chunk_size=100000).status_code == 422
+
+    def test_imported_rows_reach_the_change_log(self, client: TestClient, admin_headers: dict, auth_headers: dict, test_user, db_session: Session):
+        """Test that imported rows are synced to clients like any other write."""
+        body = ndjson({"type": "search", "user_id": test_user.id, "query": "imported", "results": RESULTS})
+        import_history(client, admin_headers, body)
+
+        assert db_session.query(HistoryChange).count() == 1
+        page = client.get("/dashboard/changes", params={"since": 0}, headers=auth_headers).json()
+        assert [(c["type"], c["op"], c["search"]["query"]) for c in page["changes"]] == [("search", "upsert", "imported")]
+
+    @pytest.mark.asyncio
+    async def test_failed_chunk_is_rolled_back(self, session_factory, test_user, db_session: Session):
+        """Test that a database error fails its chunk and the import moves on."""
+        importer = HistoryImporter(session_factory, chunk_size=1)
+        write = importer._write
+
+        async def failing_first(db, records):
+            if importer.chunks == 1:
+                raise RuntimeError("boom")
+            return await write(db, records)
+
+        importer._write = failing_first
+
+        async def lines():
+            for number in (1, 2):
+                yield number, json.dumps({"type": "image", "user_id": test_user.id, "prompt": f"p{number}", "image_url": "https://example.com/p.png"}).encode()
+
+        report = await importer.run(lines())
+
+        assert (report.imported, report.failed, report.chunks) == (1, 1, 2)
+        assert report.errors[0].line is None
+        assert "boom" in report.errors[0].error
+        assert [image.prompt for image in db_session.query(ImageHistory).all()] == ["p2"]
+
+    @pytest.mark.asyncio
+    async def test_rolled_back_chunk_counts_each_line_once(self, session_factory, test_user):
+        """Test that an unknown-user line in a failed chunk is not counted twice."""
+        importer = HistoryImporter(session_factory)
+
+        async def failing(db, records):
+            raise RuntimeError("boom")
+
+        importer._write = failing
+
+        async def lines():
+            for number, user_id in ((1, test_user.id), (2, test_user.id + 1000)):
+                yield number, json.dumps({"type": "image", "user_id": user_id, "prompt": "p", "image_url": "https://example.com/p.png"}).encode()
+
+        report = await importer.run(lines())
+
+        assert (report.lines, report.failed) == (2, 2)
+
+    @pytest.mark.asyncio
+    async def test_line_splitting_across_chunks(self):
+        """Test that lines are rejoined across reads and long ones dropped until their newline."""
+        async def stream():
+            for data in (b'{"a"', b':1}\n0123', b"456789abc", b"def\n\n", b"{}\nxyz"):
+                yield data
+
+        lines = [line async for line in ndjson_lines(stream(), max_line_bytes=10)]
+
+        assert lines == [(1, b'{"a":1}'), (2, None), (4, b"{}"), (5, b"xyz")]
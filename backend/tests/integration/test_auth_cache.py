@@ -0,0 +1,66 @@
+import pytest
+from sqlalchemy import event
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.auth_cache import principal_cache
+from app.models import User
+
+
+@pytest.fixture
+def user_queries(async_test_engine):
+    """Record SQL statements that read the users table through the app engine."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if "FROM users" in statement:
+            statements.append(statement)
+
+    event.listen(async_test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(async_test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+class TestPrincipalCaching:
+    """Integration tests for cached authentication."""
+
+    def test_warm_cache_needs_no_user_queries(self, client: TestClient, auth_headers: dict, user_queries):
+        """Test that repeated authenticated GETs skip the users lookup."""
+        response = client.get("/dashboard/", headers=auth_headers)
+        assert response.status_code == 200
+        assert len(user_queries) == 1
+
+        for _ in range(5):
+            response = client.get("/dashboard/", headers=auth_headers)
+            assert response.status_code == 200
+
+        assert len(user_queries) == 1
+        assert principal_cache.stats()["users"]["hits"] >= 5
+
+    def test_deleted_user_is_rejected(self, client: TestClient, auth_headers: dict, db_session: Session, test_user: User):
+        """Test that deleting a user invalidates their cached principal."""
+        assert client.get("/dashboard/", headers=auth_headers).status_code == 200
+
+        db_session.delete(test_user)
+        db_session.commit()
+
+        assert client.get("/dashboard/", headers=auth_headers).status_code == 401
+
+    def test_updated_user_is_reloaded(self, client: TestClient, auth_headers: dict, db_session: Session, test_user: User, user_queries):
+        """Test that modifying a user forces the next request to reload it."""
+        client.get("/dashboard/", headers=auth_headers)
+        test_user.is_admin = True
+        db_session.commit()
+
+        client.get("/dashboard/", headers=auth_headers)
+
+        assert len(user_queries) == 2
+        assert principal_cache.get_user("testuser").is_admin is True
+
+    def test_metrics_report_cache_counters(self, client: TestClient, auth_headers: dict):
+        """Test that the metrics endpoint exposes hit/miss counters."""
+        client.get("/dashboard/", headers=auth_headers)
+        client.get("/dashboard/", headers=auth_headers)
+
+        metrics = client.get("/metrics").json()
+        assert metrics["auth_cache"]["users"]["hits"] >= 1
+        assert metrics["auth_cache"]["tokens"]["misses"] >= 1
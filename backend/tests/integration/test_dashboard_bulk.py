@@ -0,0 +1,86 @@
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.models import User, SearchHistory, ImageHistory, HistoryChange
+
+BASE = datetime(2024, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def history(db_session: Session, test_user: User, test_admin_user: User):
+    for i in range(5):
+        db_session.add(SearchHistory(query=f"search {i}", results="[]", user_id=test_user.id, timestamp=BASE + timedelta(days=i)))
+        db_session.add(ImageHistory(prompt=f"image {i}", image_url=f"https://example.com/{i}.jpg", user_id=test_user.id, timestamp=BASE + timedelta(days=i)))
+    db_session.add(ImageHistory(prompt="not mine", image_url="https://example.com/x.jpg", user_id=test_admin_user.id, timestamp=BASE))
+    db_session.commit()
+    searches = [s.id for s in db_session.query(SearchHistory).order_by(SearchHistory.timestamp)]
+    images = [i.id for i in db_session.query(ImageHistory).filter_by(user_id=test_user.id).order_by(ImageHistory.timestamp)]
+    return searches, images
+
+
+class TestDashboardBulk:
+    """Integration tests for set-based bulk delete and update."""
+
+    def test_bulk_delete_by_ids(self, client: TestClient, auth_headers: dict, history, db_session: Session):
+        """Test that the listed entries are deleted and reported."""
+        searches, _ = history
+        response = client.post("/dashboard/search/bulk-delete", json={"ids": searches[:3] + [999999]}, headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.json()["affected"] == 3
+        assert response.json()["ids"] == searches[:3]
+        assert [s.id for s in db_session.query(SearchHistory)] == searches[3:]
+
+    def test_bulk_delete_by_date_range(self, client: TestClient, auth_headers: dict, history, db_session: Session):
+        """Test that since is inclusive and until exclusive."""
+        _, images = history
+        body = {"since": (BASE + timedelta(days=1)).isoformat(), "until": (BASE + timedelta(days=3)).isoformat()}
+        response = client.post("/dashboard/image/bulk-delete", json=body, headers=auth_headers)
+
+        assert response.json()["ids"] == images[1:3]
+        assert db_session.query(ImageHistory).count() == 4
+
+    def test_other_users_entries_are_untouched(self, client: TestClient, auth_headers: dict, history, test_admin_user: User, db_session: Session):
+        """Test that a selection never reaches another user's history."""
+        other = db_session.query(ImageHistory).filter_by(user_id=test_admin_user.id).one().id
+        response = client.post("/dashboard/image/bulk-delete", json={"ids": [other]}, headers=auth_headers)
+
+        assert response.json()["affected"] == 0
+        assert db_session.get(ImageHistory, other) is not None
+
+    def test_empty_selection_is_rejected(self, client: TestClient, auth_headers: dict, history):
+        """Test that a request must select entries explicitly."""
+        assert client.post("/dashboard/search/bulk-delete", json={}, headers=auth_headers).status_code == 422
+        assert client.post("/dashboard/search/bulk-delete", json={"ids": []}, headers=auth_headers).status_code == 422
+
+    def test_bulk_update(self, client: TestClient, auth_headers: dict, history, db_session: Session):
+        """Test that the selected entries are renamed in one request."""
+        searches, images = history
+        response = client.post("/dashboard/search/bulk-update", json={"ids": searches[:2], "query": "renamed"}, headers=auth_headers)
+        assert response.json()["ids"] == searches[:2]
+        response = client.post("/dashboard/image/bulk-update", json={"until": (BASE + timedelta(days=1)).isoformat(), "prompt": "first"}, headers=auth_headers)
+        assert response.json()["ids"] == images[:1]
+
+        assert sorted(s.query for s in db_session.query(SearchHistory)) == ["renamed", "renamed", "search 2", "search 3", "search 4"]
+        assert db_session.get(ImageHistory, images[0]).prompt == "first"
+
+    def test_dashboard_reflects_bulk_changes(self, client: TestClient, auth_headers: dict, history):
+        """Test that buffered first pages and ETags see bulk writes."""
+        searches, _ = history
+        first = client.get("/dashboard/searches", headers=auth_headers)
+        client.post("/dashboard/search/bulk-update", json={"ids": [searches[4]], "query": "newest"}, headers=auth_headers)
+        client.post("/dashboard/search/bulk-delete", json={"ids": [searches[3]]}, headers=auth_headers)
+
+        assert client.get("/dashboard/searches", headers={**auth_headers, "If-None-Match": first.headers["ETag"]}).status_code == 200
+        page = client.get("/dashboard/searches", headers=auth_headers).json()
+        assert [item["query"] for item in page["items"]] == ["newest", "search 2", "search 1", "search 0"]
+
+    def test_bulk_changes_are_logged(self, client: TestClient, auth_headers: dict, history, db_session: Session):
+        """Test that every affected entry gets a change-log row."""
+        searches, _ = history
+        client.post("/dashboard/search/bulk-delete", json={"ids": searches[:2]}, headers=auth_headers)
+        client.post("/dashboard/search/bulk-update", json={"ids": searches, "query": "x"}, headers=auth_headers)
+
+        logged = [(c.entry_id, c.op) for c in db_session.query(HistoryChange).order_by(HistoryChange.seq)]
+        assert logged == [(i, "delete") for i in searches[:2]] + [(i, "upsert") for i in searches[2:]]
@@ -0,0 +1,71 @@
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.models import HistoryChange
+
+RESULTS = [{"title": "Python", "href": "https://python.org", "body": ""}]
+
+
+def generate(client: TestClient, headers: dict, prompt: str) -> int:
+    with patch('app.routes.image.generate_image', return_value=f"https://example.com/{prompt}.jpg"):
+        return client.post("/images/generate", json={"prompt": prompt}, headers=headers).json()["history_id"]
+
+
+def changes(client: TestClient, headers: dict, since: int = 0, **params) -> dict:
+    response = client.get("/dashboard/changes", params={"since": since, **params}, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+class TestDashboardChanges:
+    """Integration tests for incremental history sync."""
+
+    def test_writes_are_reported_after_the_cursor(self, client: TestClient, auth_headers: dict, db_session: Session):
+        """Test that inserts, edits and deletes each show up once, after the cursor only."""
+        with patch('app.search_backend.DDGS') as mock_ddgs:
+            mock_ddgs.return_value.text.return_value = RESULTS
+            search_id = client.get("/search/?query=python", headers=auth_headers).json()["history_id"]
+        image_id = generate(client, auth_headers, "cat")
+
+        first = changes(client, auth_headers)
+        assert [(c["type"], c["id"], c["op"]) for c in first["changes"]] == [("search", search_id, "upsert"), ("image", image_id, "upsert")]
+        assert first["changes"][0]["search"]["first_title"] == "Python"
+        assert first["changes"][1]["image"]["prompt"] == "cat"
+        assert first["has_more"] is False
+        assert changes(client, auth_headers, first["cursor"])["changes"] == []
+
+        client.patch(f"/dashboard/image/{image_id}", json={"prompt": "renamed"}, headers=auth_headers)
+        client.delete(f"/dashboard/search/{search_id}", headers=auth_headers)
+        later = changes(client, auth_headers, first["cursor"])
+        assert [(c["type"], c["id"], c["op"]) for c in later["changes"]] == [("image", image_id, "upsert"), ("search", search_id, "delete")]
+        assert later["changes"][0]["image"]["prompt"] == "renamed"
+        assert later["changes"][1]["search"] is None
+        assert later["cursor"] > first["cursor"]
+        assert db_session.query(HistoryChange).count() == 4
+
+    def test_repeated_changes_collapse_to_the_latest(self, client: TestClient, auth_headers: dict):
+        """Test that an entry created and deleted within one page is a single tombstone."""
+        image_id = generate(client, auth_headers, "short-lived")
+        client.delete(f"/dashboard/image/{image_id}", headers=auth_headers)
+
+        result = changes(client, auth_headers)
+        assert [(c["id"], c["op"]) for c in result["changes"]] == [(image_id, "delete")]
+
+    def test_pages_follow_the_cursor(self, client: TestClient, auth_headers: dict):
+        """Test that a limited page reports has_more and the next page continues from it."""
+        ids = [generate(client, auth_headers, f"img{i}") for i in range(5)]
+
+        seen, since = [], 0
+        while True:
+            page = changes(client, auth_headers, since, limit=2)
+            seen.extend(c["id"] for c in page["changes"])
+            since = page["cursor"]
+            if not page["has_more"]:
+                break
+        assert seen == ids
+
+    def test_changes_are_scoped_to_the_user(self, client: TestClient, auth_headers: dict, admin_headers: dict):
+        """Test that another user's writes never appear."""
+        generate(client, auth_headers, "mine")
+        assert changes(client, admin_headers)["changes"] == []
@@ -0,0 +1,86 @@
+import pytest
+from unittest.mock import patch
+from sqlalchemy import event
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.models import User, SearchHistory, ImageHistory, HistoryChange
+
+
+@pytest.fixture
+def history(db_session: Session, test_user: User):
+    db_session.add(SearchHistory(query="cached", results="[]", user_id=test_user.id))
+    db_session.add(ImageHistory(prompt="cached", image_url="https://example.com/c.jpg", user_id=test_user.id))
+    db_session.commit()
+
+
+class TestDashboardETags:
+    """Integration tests for conditional dashboard reads."""
+
+    @pytest.mark.parametrize("url", ["/dashboard/", "/dashboard/searches", "/dashboard/images", "/dashboard/timeline"])
+    def test_unchanged_history_is_not_modified(self, client: TestClient, auth_headers: dict, history, async_test_engine, url):
+        """Test that a matching If-None-Match is answered with an empty 304 and no history query."""
+        first = client.get(url, headers=auth_headers)
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+        assert first.headers["cache-control"] == "private, no-cache"
+
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if "_history" in statement:
+                statements.append(statement)
+
+        event.listen(async_test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            second = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+        finally:
+            event.remove(async_test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["etag"] == etag
+        assert statements == []
+
+    def test_writes_change_the_etag(self, client: TestClient, auth_headers: dict, history):
+        """Test that inserts, patches and deletes each invalidate the previous ETag."""
+        etags = [client.get("/dashboard/", headers=auth_headers).headers["etag"]]
+        entry_id = client.get("/dashboard/images", headers=auth_headers).json()["items"][0]["id"]
+
+        with patch('app.routes.image.generate_image', return_value="https://example.com/new.jpg"):
+            client.post("/images/generate", json={"prompt": "new"}, headers=auth_headers)
+        etags.append(client.get("/dashboard/", headers=auth_headers).headers["etag"])
+        client.patch(f"/dashboard/image/{entry_id}", json={"prompt": "renamed"}, headers=auth_headers)
+        etags.append(client.get("/dashboard/", headers=auth_headers).headers["etag"])
+        client.delete(f"/dashboard/image/{entry_id}", headers=auth_headers)
+
+        response = client.get("/dashboard/", headers={**auth_headers, "If-None-Match": etags[-1]})
+        assert response.status_code == 200
+        assert len(set(etags + [response.headers["etag"]])) == 4
+
+    def test_etag_is_per_user(self, client: TestClient, auth_headers: dict, admin_headers: dict, history):
+        """Test that one user's ETag never validates another user's history."""
+        etag = client.get("/dashboard/", headers=auth_headers).headers["etag"]
+        response = client.get("/dashboard/", headers={**admin_headers, "If-None-Match": etag})
+        assert response.status_code == 200
+
+    def test_write_by_another_worker_changes_the_etag(self, client: TestClient, auth_headers: dict, db_session: Session, test_user: User, history):
+        """Test that a change logged outside this process invalidates the ETag."""
+        etag = client.get("/dashboard/", headers=auth_headers).headers["etag"]
+        db_session.add(HistoryChange(user_id=test_user.id, kind="image", entry_id=1, op="upsert"))
+        db_session.commit()
+
+        response = client.get("/dashboard/", headers={**auth_headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+    @pytest.mark.parametrize("kind, listing, field", [("search", "searches", "query"), ("image", "images", "prompt")])
+    def test_empty_patch_keeps_the_etag(self, client: TestClient, auth_headers: dict, db_session: Session, history, kind, listing, field):
+        """Test that a PATCH without fields logs no change and leaves the ETag valid."""
+        etag = client.get("/dashboard/", headers=auth_headers).headers["etag"]
+        entry = client.get(f"/dashboard/{listing}", headers=auth_headers).json()["items"][0]
+
+        response = client.patch(f"/dashboard/{kind}/{entry['id']}", json={}, headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["entry"][field] == "cached"
+        assert db_session.query(HistoryChange).count() == 0
+        assert client.get("/dashboard/", headers={**auth_headers, "If-None-Match": etag}).status_code == 304
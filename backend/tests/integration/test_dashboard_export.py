@@ -0,0 +1,67 @@
+import csv
+import io
+import json
+import pytest
+from unittest.mock import patch
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.models import User, SearchHistory, ImageHistory
+from app.export import export_ndjson
+
+BASE = datetime(2024, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def history(db_session: Session, test_user: User):
+    for i in range(5):
+        db_session.add(SearchHistory(query=f"search {i}", results=json.dumps([{"title": f"t{i}"}]), result_count=1, first_title=f"t{i}", user_id=test_user.id, timestamp=BASE + timedelta(seconds=i)))
+    for i in range(3):
+        db_session.add(ImageHistory(prompt=f"image {i}", image_url=f"https://example.com/{i}.jpg", user_id=test_user.id, timestamp=BASE + timedelta(seconds=i)))
+    db_session.commit()
+
+
+class TestDashboardExport:
+    """Integration tests for streamed history exports."""
+
+    def test_ndjson_export(self, client: TestClient, auth_headers: dict, history):
+        """Test that every entry is one JSON line with its results embedded."""
+        response = client.get("/dashboard/export", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert "attachment" in response.headers["content-disposition"]
+
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [(l["type"], l.get("query") or l.get("prompt")) for l in lines] == (
+            [("search", f"search {i}") for i in reversed(range(5))] + [("image", f"image {i}") for i in reversed(range(3))]
+        )
+        assert lines[0]["results"] == [{"title": "t4"}]
+
+    def test_csv_export(self, client: TestClient, auth_headers: dict, history):
+        """Test the CSV variant has a header and one record per entry."""
+        response = client.get("/dashboard/export", params={"format": "csv"}, headers=auth_headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+
+        records = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(records) == 8
+        assert records[0]["type"] == "search"
+        assert json.loads(records[0]["results"]) == [{"title": "t4"}]
+        assert records[-1]["image_url"] == "https://example.com/0.jpg"
+
+    @pytest.mark.asyncio
+    async def test_export_is_streamed_in_batches(self, session_factory, test_user: User, history):
+        """Test that rows are emitted one fixed-size batch at a time."""
+        with patch('app.export.EXPORT_BATCH_SIZE', 2):
+            chunks = [chunk async for chunk in export_ndjson(session_factory, test_user.id)]
+        assert [len(chunk.splitlines()) for chunk in chunks] == [2, 2, 1, 2, 1]
+
+    def test_empty_and_scoped(self, client: TestClient, admin_headers: dict, history):
+        """Test that another user's export is empty."""
+        response = client.get("/dashboard/export", headers=admin_headers)
+        assert response.status_code == 200
+        assert response.text == ""
+
+    def test_unknown_format_is_rejected(self, client: TestClient, auth_headers: dict):
+        """Test that only ndjson and csv are accepted."""
+        assert client.get("/dashboard/export", params={"format": "xml"}, headers=auth_headers).status_code == 422
@@ -0,0 +1,150 @@
+import pytest
+import re
+from sqlalchemy import event
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.models import User, SearchHistory, ImageHistory
+
+
+@pytest.fixture
+def history(db_session: Session, test_user: User):
+    """Searches and images with deliberately colliding timestamps."""
+    base = datetime(2024, 1, 1, 12, 0, 0)
+    for i in range(25):
+        # Three rows per second, so pages have to break ties on id
+        db_session.add(SearchHistory(query=f"search {i}", results="[]", user_id=test_user.id, timestamp=base + timedelta(seconds=i // 3)))
+    for i in range(10):
+        db_session.add(ImageHistory(prompt=f"image {i}", image_url=f"https://example.com/{i}.jpg", user_id=test_user.id, timestamp=base + timedelta(seconds=i)))
+    db_session.commit()
+
+
+def walk(client: TestClient, url: str, headers: dict, limit: int):
+    items, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(url, params=params, headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["items"]) <= limit
+        items.extend(data["items"])
+        pages += 1
+        cursor = data["next_cursor"]
+        if cursor is None:
+            return items, pages
+
+
+class TestKeysetPagination:
+    """Integration tests for cursor-paginated dashboard listings."""
+
+    def test_search_pages_cover_history_exactly_once(self, client: TestClient, auth_headers: dict, history):
+        """Test that walking every page returns each search once, newest first."""
+        items, pages = walk(client, "/dashboard/searches", auth_headers, limit=7)
+        assert pages == 4
+        assert len(items) == 25
+        assert len({item["id"] for item in items}) == 25
+        keys = [(item["timestamp"], item["id"]) for item in items]
+        assert keys == sorted(keys, reverse=True)
+
+    def test_image_pages(self, client: TestClient, auth_headers: dict, history):
+        """Test that image history paginates the same way."""
+        items, pages = walk(client, "/dashboard/images", auth_headers, limit=4)
+        assert pages == 3
+        assert [item["prompt"] for item in items] == [f"image {i}" for i in reversed(range(10))]
+
+    def test_timeline_merges_both_kinds(self, client: TestClient, auth_headers: dict, history):
+        """Test that the timeline interleaves searches and images without gaps or repeats."""
+        items, _ = walk(client, "/dashboard/timeline", auth_headers, limit=6)
+        assert len(items) == 35
+        assert len({(item["type"], item["id"]) for item in items}) == 35
+        timestamps = [item["timestamp"] for item in items]
+        assert timestamps == sorted(timestamps, reverse=True)
+
+        first = client.get("/dashboard/timeline", params={"limit": 35}, headers=auth_headers).json()
+        assert [(i["type"], i["id"]) for i in first["items"]] == [(i["type"], i["id"]) for i in items]
+
+    def test_timeline_is_one_round_trip(self, client: TestClient, auth_headers: dict, history, async_test_engine):
+        """Test that a timeline page reads both tables in a single statement."""
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if "_history" in statement:
+                statements.append(statement)
+
+        event.listen(async_test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            response = client.get("/dashboard/timeline", params={"limit": 5}, headers=auth_headers)
+        finally:
+            event.remove(async_test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+        assert response.status_code == 200
+        assert len(statements) == 1
+        assert "UNION ALL" in statements[0]
+        assert "results" not in statements[0]
+
+    def test_pages_are_scoped_to_the_user(self, client: TestClient, admin_headers: dict, history):
+        """Test that another user sees none of these entries."""
+        response = client.get("/dashboard/searches", headers=admin_headers)
+        assert response.json() == {"items": [], "next_cursor": None}
+
+    def test_invalid_cursor_is_rejected(self, client: TestClient, auth_headers: dict):
+        """Test that a tampered cursor gives 400 rather than a server error."""
+        for cursor in ["not-a-cursor", "W10", "WyJ4IiwgMV0"]:
+            response = client.get("/dashboard/searches", params={"cursor": cursor}, headers=auth_headers)
+            assert response.status_code == 400
+
+    def test_limit_is_bounded(self, client: TestClient, auth_headers: dict):
+        """Test that page size is validated."""
+        assert client.get("/dashboard/searches", params={"limit": 0}, headers=auth_headers).status_code == 422
+        assert client.get("/dashboard/searches", params={"limit": 1000}, headers=auth_headers).status_code == 422
+
+
+class TestSearchSummaries:
+    """Integration tests for summary listings and on-demand results."""
+
+    def test_listing_omits_results(self, client: TestClient, auth_headers: dict, db_session: Session, test_user: User, async_test_engine):
+        """Test that search pages carry the summary and never read the results column."""
+        db_session.add(SearchHistory(
+            query="python", results='[{"title": "Python.org"}, {"title": "Docs"}]',
+            result_count=2, first_title="Python.org", user_id=test_user.id,
+        ))
+        db_session.commit()
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if "FROM search_history" in statement:
+                statements.append(statement)
+
+        event.listen(async_test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            response = client.get("/dashboard/searches", headers=auth_headers)
+        finally:
+            event.remove(async_test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+        item = response.json()["items"][0]
+        assert item["result_count"] == 2
+        assert item["first_title"] == "Python.org"
+        assert "results" not in item
+        assert not re.search(r"search_history\.results\b", statements[0])
+
+    def test_detail_returns_full_results(self, client: TestClient, auth_headers: dict, db_session: Session, test_user: User):
+        """Test that the detail endpoint serves the stored results."""
+        entry = SearchHistory(query="python", results='[{"title": "Python.org"}]', user_id=test_user.id)
+        db_session.add(entry)
+        db_session.commit()
+
+        response = client.get(f"/dashboard/search/{entry.id}", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        assert response.json()["results"] == [{"title": "Python.org"}]
+        assert response.json()["query"] == "python"
+
+    def test_detail_is_scoped_to_the_owner(self, client: TestClient, admin_headers: dict, db_session: Session, test_user: User):
+        """Test that another user's entry is reported as missing."""
+        entry = SearchHistory(query="private", results="[]", user_id=test_user.id)
+        db_session.add(entry)
+        db_session.commit()
+
+        assert client.get(f"/dashboard/search/{entry.id}", headers=admin_headers).status_code == 404
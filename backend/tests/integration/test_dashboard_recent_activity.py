@@ -0,0 +1,92 @@
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from sqlalchemy import event
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.models import User, SearchHistory, ImageHistory, HistoryChange
+from app.recent_activity import recent_activity
+
+BASE = datetime(2024, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def history(db_session: Session, test_user: User):
+    for i in range(30):
+        db_session.add(SearchHistory(query=f"search {i}", results="[]", user_id=test_user.id, timestamp=BASE + timedelta(seconds=i)))
+    for i in range(3):
+        db_session.add(ImageHistory(prompt=f"image {i}", image_url=f"https://example.com/{i}.jpg", user_id=test_user.id, timestamp=BASE + timedelta(seconds=i)))
+    db_session.commit()
+
+
+@pytest.fixture
+def statements(async_test_engine):
+    """Every SQL statement the app runs while the test does."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(async_test_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+class TestRecentActivityDashboard:
+    """Integration tests for first dashboard pages served from memory."""
+
+    def test_first_page_costs_only_the_change_log_probe(self, client: TestClient, auth_headers: dict, history, statements):
+        """Test that the second first-page load of each kind and the timeline run one change-log probe and nothing else."""
+        searches = client.get("/dashboard/searches", headers=auth_headers).json()
+        images = client.get("/dashboard/images", headers=auth_headers).json()
+        statements.clear()
+
+        assert client.get("/dashboard/searches", headers=auth_headers).json() == searches
+        assert client.get("/dashboard/images", headers=auth_headers).json() == images
+        timeline = client.get("/dashboard/timeline", params={"limit": 5}, headers=auth_headers).json()
+        assert len(statements) == 3
+        assert all("FROM history_changes" in statement for statement in statements)
+
+        assert [e["query"] for e in searches["items"]] == [f"search {i}" for i in range(29, 9, -1)]
+        assert [(e["type"], e["id"]) for e in timeline["items"]] == [("search", e["id"]) for e in searches["items"][:5]]
+        assert timeline["next_cursor"] is not None
+
+    def test_cursor_pages_still_use_the_database(self, client: TestClient, auth_headers: dict, history, statements):
+        """Test that only the first page comes from memory."""
+        first = client.get("/dashboard/searches", headers=auth_headers).json()
+        statements.clear()
+        second = client.get("/dashboard/searches", params={"cursor": first["next_cursor"]}, headers=auth_headers).json()
+
+        assert len([statement for statement in statements if "FROM search_history" in statement]) == 1
+        assert [e["query"] for e in second["items"]] == [f"search {i}" for i in range(9, -1, -1)]
+
+    def test_writes_keep_the_buffer_current(self, client: TestClient, auth_headers: dict, history):
+        """Test that new, patched and deleted entries show up on the memory-served page."""
+        first = client.get("/dashboard/images", headers=auth_headers).json()["items"]
+
+        with patch('app.routes.image.generate_image', return_value="https://example.com/new.jpg"):
+            created = client.post("/images/generate", json={"prompt": "fresh"}, headers=auth_headers).json()
+        client.patch(f"/dashboard/image/{first[0]['id']}", json={"prompt": "renamed"}, headers=auth_headers)
+        client.delete(f"/dashboard/image/{first[1]['id']}", headers=auth_headers)
+
+        items = client.get("/dashboard/images", headers=auth_headers).json()["items"]
+        assert [e["id"] for e in items] == [created["history_id"], first[0]["id"], first[2]["id"]]
+        assert items[1]["prompt"] == "renamed"
+        assert recent_activity.stats()["hits"] >= 1
+
+    @pytest.mark.parametrize("url", ["/dashboard/searches", "/dashboard/timeline"])
+    def test_write_by_another_worker_is_not_hidden(self, client: TestClient, auth_headers: dict, test_user: User, db_session: Session, url):
+        """Test that a buffered first page is reloaded once another process logs a change."""
+        first = client.get(url, headers=auth_headers)
+        assert first.json()["items"] == []
+
+        entry = SearchHistory(query="elsewhere", results="[]", user_id=test_user.id)
+        db_session.add(entry)
+        db_session.flush()
+        db_session.add(HistoryChange(user_id=test_user.id, kind="search", entry_id=entry.id, op="upsert"))
+        db_session.commit()
+
+        second = client.get(url, headers=auth_headers)
+        assert second.headers["etag"] != first.headers["etag"]
+        assert [e["query"] for e in second.json()["items"]] == ["elsewhere"]
+        assert client.get(url, headers={**auth_headers, "If-None-Match": second.headers["etag"]}).status_code == 304
@@ -0,0 +1,117 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.history_compactor import HistoryCompactor, parse_hours
+from app.models import User, SearchHistory, ImageHistory
+
+BASE = datetime(2024, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def history(db_session: Session, test_user: User):
+    for i in range(3):
+        db_session.add(SearchHistory(query=f"search {i}", results="[]", user_id=test_user.id, timestamp=BASE + timedelta(seconds=i)))
+        db_session.add(ImageHistory(prompt=f"image {i}", image_url=f"https://example.com/{i}.jpg", user_id=test_user.id, timestamp=BASE + timedelta(seconds=i)))
+    db_session.commit()
+    searches = [s.id for s in db_session.query(SearchHistory).order_by(SearchHistory.timestamp)]
+    images = [i.id for i in db_session.query(ImageHistory).order_by(ImageHistory.timestamp)]
+    return searches, images
+
+
+@pytest.fixture
+def soft_delete():
+    with patch.object(settings, "history_soft_delete", True):
+        yield
+
+
+class TestSoftDelete:
+    """Integration tests for tombstoned history deletes."""
+
+    def test_delete_sets_tombstone(self, client: TestClient, auth_headers: dict, history, soft_delete, db_session: Session):
+        """Test that a soft delete keeps the row but marks it deleted, and is idempotent."""
+        searches, _ = history
+        assert client.delete(f"/dashboard/search/{searches[0]}", headers=auth_headers).status_code == 200
+        assert client.delete(f"/dashboard/search/{searches[0]}", headers=auth_headers).status_code == 404
+
+        entry = db_session.get(SearchHistory, searches[0])
+        assert entry is not None
+        assert entry.deleted_at is not None
+
+    def test_tombstoned_entries_are_hidden(self, client: TestClient, auth_headers: dict, history, soft_delete):
+        """Test that listings, lookups, edits and exports skip tombstoned rows."""
+        searches, images = history
+        client.delete(f"/dashboard/search/{searches[2]}", headers=auth_headers)
+        client.post("/dashboard/image/bulk-delete", json={"ids": images[:2]}, headers=auth_headers)
+
+        assert [item["id"] for item in client.get("/dashboard/searches", headers=auth_headers).json()["items"]] == searches[1::-1]
+        assert [item["id"] for item in client.get("/dashboard/images", headers=auth_headers).json()["items"]] == images[2:]
+        assert len(client.get("/dashboard/timeline", headers=auth_headers).json()["items"]) == 3
+        assert len(client.get("/dashboard/", headers=auth_headers).json()["searches"]) == 2
+        assert client.get(f"/dashboard/search/{searches[2]}", headers=auth_headers).status_code == 404
+        assert client.get(f"/dashboard/image/{images[0]}", headers=auth_headers).status_code == 404
+        assert client.patch(f"/dashboard/image/{images[0]}", json={"prompt": "x"}, headers=auth_headers).status_code == 404
+        assert client.post("/dashboard/image/bulk-update", json={"ids": images, "prompt": "x"}, headers=auth_headers).json()["ids"] == images[2:]
+        export = client.get("/dashboard/export", headers=auth_headers).text
+        assert export.count("\n") == 3
+
+    def test_soft_delete_is_a_change(self, client: TestClient, auth_headers: dict, history, soft_delete):
+        """Test that sync clients see a tombstoned entry as deleted."""
+        searches, _ = history
+        client.patch(f"/dashboard/search/{searches[0]}", json={"query": "edited"}, headers=auth_headers)
+        client.delete(f"/dashboard/search/{searches[0]}", headers=auth_headers)
+
+        changes = client.get("/dashboard/changes", params={"since": 0}, headers=auth_headers).json()["changes"]
+        assert [(c["id"], c["op"]) for c in changes] == [(searches[0], "delete")]
+
+    def test_hard_delete_by_default(self, client: TestClient, auth_headers: dict, history, db_session: Session):
+        """Test that without the option rows are removed at once."""
+        searches, _ = history
+        client.delete(f"/dashboard/search/{searches[0]}", headers=auth_headers)
+        assert db_session.get(SearchHistory, searches[0]) is None
+
+
+class TestHistoryCompactor:
+    """Integration tests for the physical removal of tombstoned rows."""
+
+    @pytest.mark.asyncio
+    async def test_compaction_removes_only_tombstones(self, session_factory, history, db_session: Session):
+        """Test that tombstoned rows are deleted in batches and live rows are kept."""
+        searches, images = history
+        now = datetime.now(timezone.utc)
+        db_session.query(SearchHistory).filter(SearchHistory.id.in_(searches[:2])).update({"deleted_at": now}, synchronize_session=False)
+        db_session.query(ImageHistory).filter(ImageHistory.id == images[0]).update({"deleted_at": now}, synchronize_session=False)
+        db_session.commit()
+
+        compactor = HistoryCompactor(batch_size=1, pause=0, session_factory=session_factory)
+        assert await compactor.compact() == 3
+        assert await compactor.compact() == 0
+
+        db_session.expire_all()
+        assert [s.id for s in db_session.query(SearchHistory)] == searches[2:]
+        assert [i.id for i in db_session.query(ImageHistory)] == images[1:]
+        assert compactor.stats()["removed"] == 3
+
+    @pytest.mark.asyncio
+    async def test_compaction_waits_for_its_window(self, session_factory, history, db_session: Session):
+        """Test that nothing is removed outside the configured hours."""
+        searches, _ = history
+        db_session.query(SearchHistory).update({"deleted_at": datetime.now(timezone.utc)}, synchronize_session=False)
+        db_session.commit()
+        hour = datetime.now(timezone.utc).hour
+        closed = HistoryCompactor(hours=((hour + 1) % 24, (hour + 2) % 24), session_factory=session_factory)
+
+        assert await closed.compact() == 0
+        assert db_session.query(SearchHistory).count() == 3
+
+    def test_window_parsing(self):
+        """Test hour ranges, including ones that wrap past midnight."""
+        assert parse_hours("") is None
+        overnight = HistoryCompactor(hours=parse_hours("22-4"))
+        assert overnight.in_window(datetime(2024, 1, 1, 23))
+        assert overnight.in_window(datetime(2024, 1, 1, 3))
+        assert not overnight.in_window(datetime(2024, 1, 1, 12))
+        with pytest.raises(ValueError):
+            parse_hours("2-30")
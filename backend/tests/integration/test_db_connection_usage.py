@@ -0,0 +1,69 @@
+import pytest
+import asyncio
+import httpx
+from unittest.mock import patch
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from fastapi.testclient import TestClient
+from app.database import get_session_factory
+from app.main import app
+
+
+class TestConnectionUsage:
+    """Verify that slow upstream calls do not pin pooled database connections."""
+
+    @pytest.mark.asyncio
+    async def test_no_connections_held_during_slow_generations(self, client: TestClient, auth_headers: dict):
+        """Test that many in-flight generations run on a two-connection pool without holding it."""
+        engine = create_async_engine(
+            "sqlite+aiosqlite:///./test.db",
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=2,
+            max_overflow=0,
+            pool_timeout=5,
+        )
+        usage = {"checked_out": 0, "peak": 0}
+
+        @event.listens_for(engine.sync_engine, "checkout")
+        def on_checkout(*args):
+            usage["checked_out"] += 1
+            usage["peak"] = max(usage["peak"], usage["checked_out"])
+
+        @event.listens_for(engine.sync_engine, "checkin")
+        def on_checkin(*args):
+            usage["checked_out"] -= 1
+
+        app.dependency_overrides[get_session_factory] = lambda: async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+        concurrent_requests = 20
+        in_flight = {"count": 0}
+        all_waiting = asyncio.Event()
+        held_while_waiting = []
+
+        async def slow_generate(prompt):
+            in_flight["count"] += 1
+            if in_flight["count"] == concurrent_requests:
+                all_waiting.set()
+            await asyncio.wait_for(all_waiting.wait(), timeout=10)
+            held_while_waiting.append(usage["checked_out"])
+            await asyncio.sleep(0.05)
+            return f"https://example.com/{prompt}.jpg"
+
+        try:
+            with patch('app.routes.image.generate_image', side_effect=slow_generate):
+                async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as async_client:
+                    responses = await asyncio.gather(*(
+                        async_client.post("/images/generate", json={"prompt": f"slow-{i}"}, headers=auth_headers)
+                        for i in range(concurrent_requests)
+                    ))
+        finally:
+            await engine.dispose()
+
+        assert [r.status_code for r in responses] == [201] * concurrent_requests
+        # Every request was waiting on the upstream at the same time, ten times the pool size...
+        assert len(held_while_waiting) == concurrent_requests
+        # ...while none of them kept a connection checked out
+        assert max(held_while_waiting) == 0
+        assert usage["peak"] <= 2
+        assert usage["checked_out"] == 0
@@ -0,0 +1,133 @@
+import pytest
+import asyncio
+import httpx
+from unittest.mock import patch
+from sqlalchemy.orm import Session
+from app.main import app
+from app.config import settings
+from app.history_writer import HistoryWriter, WriteBufferFullError, history_writer
+from app.models import ImageHistory, SearchHistory, SearchResult
+
+RESULTS_JSON = '[{"title": "Python"}]'
+
+
+class TestHistoryWriter:
+    """Integration tests for write-behind history batching."""
+
+    @pytest.mark.asyncio
+    async def test_full_batch_is_written_in_one_transaction(self, session_factory, test_user, db_session: Session):
+        """Test that reaching the batch size flushes every row in a single batch."""
+        writer = HistoryWriter(batch_size=3, flush_interval=10, session_factory=session_factory)
+        futures = [
+            await writer.submit_search(test_user.id, "python", RESULTS_JSON, 1, "Python"),
+            await writer.submit_search(test_user.id, "python again", RESULTS_JSON, 1, "Python"),
+            await writer.submit_image(test_user.id, "a cat", "https://example.com/cat.png"),
+        ]
+        ids = await asyncio.wait_for(asyncio.gather(*futures), 5)
+        await writer.close()
+
+        assert ids[0] != ids[1]
+        assert writer.stats()["batches"] == 1
+        assert writer.stats()["written"] == 3
+        assert db_session.query(SearchHistory).count() == 2
+        assert db_session.query(ImageHistory).count() == 1
+        assert db_session.query(SearchResult).count() == 1
+        assert db_session.get(ImageHistory, ids[2]).prompt == "a cat"
+
+    @pytest.mark.asyncio
+    async def test_partial_batch_is_written_after_the_interval(self, session_factory, test_user, db_session: Session):
+        """Test that a lone row is flushed by the timer."""
+        writer = HistoryWriter(batch_size=100, flush_interval=0.01, session_factory=session_factory)
+        future = await writer.submit_image(test_user.id, "a dog", "https://example.com/dog.png")
+        entry_id = await asyncio.wait_for(future, 5)
+        await writer.close()
+
+        assert db_session.get(ImageHistory, entry_id) is not None
+
+    @pytest.mark.asyncio
+    async def test_full_buffer_applies_backpressure(self, session_factory, test_user, db_session: Session):
+        """Test that submitters are refused once the buffer stays full past the timeout."""
+        writer = HistoryWriter(batch_size=100, flush_interval=10, max_pending=1, enqueue_timeout=0.05, session_factory=session_factory)
+        writer._write = lambda batch: asyncio.sleep(10)
+        await writer.submit_image(test_user.id, "first", "https://example.com/1.png")
+        with pytest.raises(WriteBufferFullError):
+            await writer.submit_image(test_user.id, "second", "https://example.com/2.png")
+        assert writer.stats()["rejected"] == 1
+        writer._task.cancel()
+
+    @pytest.mark.asyncio
+    async def test_wait_for_user_commits_pending_rows(self, session_factory, test_user, db_session: Session):
+        """Test the read-your-writes barrier flushes the user's buffered rows."""
+        writer = HistoryWriter(batch_size=100, flush_interval=10, session_factory=session_factory)
+        future = await writer.submit_image(test_user.id, "a bird", "https://example.com/bird.png")
+        await writer.wait_for_user(test_user.id + 1)
+        assert db_session.query(ImageHistory).count() == 0
+
+        await writer.wait_for_user(test_user.id)
+        assert future.done()
+        assert db_session.query(ImageHistory).count() == 1
+        await writer.close()
+
+    @pytest.mark.asyncio
+    async def test_close_flushes_everything(self, session_factory, test_user, db_session: Session):
+        """Test that shutdown writes rows that are still buffered."""
+        writer = HistoryWriter(batch_size=2, flush_interval=10, session_factory=session_factory)
+        for i in range(5):
+            await writer.submit_image(test_user.id, f"prompt {i}", "https://example.com/x.png")
+        await writer.close()
+
+        assert writer.stats()["pending"] == 0
+        assert db_session.query(ImageHistory).count() == 5
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_fails_its_futures(self, session_factory, test_user):
+        """Test that a database error is reported to every row of the batch."""
+        writer = HistoryWriter(batch_size=100, flush_interval=10, session_factory=session_factory)
+        future = await writer.submit(ImageHistory, {"user_id": test_user.id, "prompt": None, "image_url": None})
+        await writer.close()
+
+        assert isinstance(future.exception(), Exception)
+        assert writer.stats()["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_bad_row_does_not_sink_its_batch(self, session_factory, test_user, db_session: Session):
+        """Test that a failing batch is split so only the bad rows fail."""
+        writer = HistoryWriter(batch_size=100, flush_interval=10, session_factory=session_factory)
+        good = [await writer.submit_image(test_user.id, f"prompt {i}", "https://example.com/x.png") for i in range(2)]
+        # Purged account: the user_id no longer satisfies the foreign key
+        orphan = await writer.submit_image(test_user.id + 1000, "orphan", "https://example.com/o.png")
+        good += [await writer.submit_search(test_user.id, f"query {i}", RESULTS_JSON, 1, "Python") for i in range(3)]
+        invalid = await writer.submit(ImageHistory, {"user_id": test_user.id, "prompt": None, "image_url": None})
+        await writer.close()
+
+        assert all(isinstance(future.result(), int) for future in good)
+        assert isinstance(orphan.exception(), Exception)
+        assert isinstance(invalid.exception(), Exception)
+        assert writer.stats()["written"] == 5
+        assert writer.stats()["failed"] == 2
+        assert db_session.query(ImageHistory).count() == 2
+        assert db_session.query(SearchHistory).count() == 3
+
+
+class TestWriteBehindRoutes:
+    """Integration tests for the routes with write-behind enabled."""
+
+    @pytest.mark.asyncio
+    async def test_dashboard_sees_buffered_search(self, client, session_factory, auth_headers: dict):
+        """Test that a search answered before its row is written still shows on the dashboard."""
+        with patch.object(settings, "history_write_behind", True), \
+                patch.object(history_writer, "session_factory", session_factory), \
+                patch.object(history_writer, "flush_interval", 10), \
+                patch('app.search_backend.DDGS') as mock_ddgs:
+            mock_ddgs.return_value.text.return_value = [{"title": "Python", "href": "https://python.org", "body": ""}]
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as async_client:
+                response = await async_client.get("/search/?query=python", headers=auth_headers)
+                assert response.status_code == 200
+                assert response.json()["history_id"] is None
+                assert history_writer.stats()["pending"] == 1
+
+                page = (await async_client.get("/dashboard/searches", headers=auth_headers)).json()
+            await history_writer.close()
+
+        assert [item["query"] for item in page["items"]] == ["python"]
+        assert page["items"][0]["first_title"] == "Python"
@@ -0,0 +1,131 @@
+import pytest
+import asyncio
+import json
+import httpx
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.main import app
+from app.models import ImageHistory
+
+
+@pytest.fixture
+def async_client(client: TestClient):
+    """Async client sharing the test loop with the job workers (overrides come from `client`)."""
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.fixture
+def job_sessions(session_factory):
+    """Point the job workers' history writes at the test database."""
+    with patch('app.routes.image.SessionLocal', session_factory):
+        yield
+
+
+async def wait_for_job(async_client, job_id, headers):
+    for _ in range(100):
+        response = await async_client.get(f"/images/jobs/{job_id}", headers=headers)
+        if response.json()["status"] in ("succeeded", "failed"):
+            return response
+        await asyncio.sleep(0.01)
+    pytest.fail("Job did not finish")
+
+
+class TestImageJobs:
+    """Integration tests for queued image generation."""
+
+    @pytest.mark.asyncio
+    @patch('app.routes.image.generate_image', new_callable=AsyncMock)
+    async def test_job_mode_returns_immediately_and_completes(self, mock_generate, async_client, auth_headers: dict, job_sessions, db_session: Session):
+        """Test that job mode answers 202 with a job id and later records the history row."""
+        mock_generate.return_value = "https://example.com/job-image.jpg"
+
+        async with async_client:
+            response = await async_client.post("/images/generate?mode=job", json={"prompt": "Queued prompt"}, headers=auth_headers)
+            assert response.status_code == 202
+            job_id = response.json()["job_id"]
+
+            status_response = await wait_for_job(async_client, job_id, auth_headers)
+
+        job = status_response.json()
+        assert job["status"] == "succeeded"
+        assert job["image_url"] == "https://example.com/job-image.jpg"
+        entry = db_session.query(ImageHistory).filter_by(id=job["history_id"]).first()
+        assert entry is not None
+        assert entry.prompt == "Queued prompt"
+
+    @pytest.mark.asyncio
+    @patch('app.routes.image.generate_image', new_callable=AsyncMock)
+    async def test_failed_job_reports_error(self, mock_generate, async_client, auth_headers: dict, job_sessions, db_session: Session):
+        """Test that generation failures end the job as failed without a history row."""
+        mock_generate.side_effect = Exception("Flux unavailable")
+
+        async with async_client:
+            response = await async_client.post("/images/generate?mode=job", json={"prompt": "Broken prompt"}, headers=auth_headers)
+            status_response = await wait_for_job(async_client, response.json()["job_id"], auth_headers)
+
+        job = status_response.json()
+        assert job["status"] == "failed"
+        assert "Flux unavailable" in job["error"]
+        assert db_session.query(ImageHistory).count() == 0
+
+    @pytest.mark.asyncio
+    @patch('app.routes.image.generate_image', new_callable=AsyncMock)
+    async def test_event_stream_ends_with_final_status(self, mock_generate, async_client, auth_headers: dict, job_sessions):
+        """Test that the SSE stream emits status events until the job finishes."""
+        async def slow_generate(prompt):
+            await asyncio.sleep(0.05)
+            return "https://example.com/streamed.jpg"
+        mock_generate.side_effect = slow_generate
+
+        async with async_client:
+            response = await async_client.post("/images/generate?mode=job", json={"prompt": "Streamed prompt"}, headers=auth_headers)
+            job_id = response.json()["job_id"]
+
+            events = []
+            async with async_client.stream("GET", f"/images/jobs/{job_id}/events", headers=auth_headers) as stream:
+                assert stream.headers["content-type"].startswith("text/event-stream")
+                async for line in stream.aiter_lines():
+                    if line.startswith("data: "):
+                        events.append(json.loads(line[len("data: "):]))
+
+        assert events[-1]["status"] == "succeeded"
+        assert events[-1]["image_url"] == "https://example.com/streamed.jpg"
+
+    def test_unknown_job_returns_404(self, client: TestClient, auth_headers: dict):
+        """Test that unknown job ids return 404."""
+        response = client.get("/images/jobs/does-not-exist", headers=auth_headers)
+        assert response.status_code == 404
+
+
+class TestImageCoalescing:
+    """Integration tests for coalescing identical concurrent generations."""
+
+    @pytest.mark.asyncio
+    async def test_identical_prompts_share_one_generation(self, async_client, auth_headers: dict, db_session: Session):
+        """Test that simultaneous identical prompts call Flux once but each get a history row."""
+        calls = []
+        release = asyncio.Event()
+
+        async def slow_generate(prompt):
+            calls.append(prompt)
+            await release.wait()
+            return "https://example.com/shared.jpg"
+
+        with patch('app.routes.image.generate_image', side_effect=slow_generate):
+            async with async_client:
+                requests = [
+                    asyncio.create_task(async_client.post("/images/generate", json={"prompt": "A trending  prompt"}, headers=auth_headers))
+                    for _ in range(5)
+                ]
+                while not calls:
+                    await asyncio.sleep(0.01)
+                await asyncio.sleep(0.05)
+                release.set()
+                responses = await asyncio.gather(*requests)
+
+        assert len(calls) == 1
+        assert [r.status_code for r in responses] == [201] * 5
+        assert {r.json()["image_url"] for r in responses} == {"https://example.com/shared.jpg"}
+        assert len({r.json()["history_id"] for r in responses}) == 5
+        assert db_session.query(ImageHistory).count() == 5
@@ -10,8 +10,8 @@ class TestMCPIntegration:
     """Integration tests for MCP (Model Context Protocol) interactions."""
     
     @pytest.mark.asyncio
-    @patch('app.routes.image.streamablehttp_client')
-    @patch('app.routes.image.mcp.ClientSession')
+    @patch('app.mcp_pool.streamablehttp_client')
+    @patch('app.mcp_pool.mcp.ClientSession')
     async def test_successful_image_generation_flow(self, mock_session, mock_client, client: TestClient, auth_headers: dict, db_session: Session):
         """Test complete successful image generation flow through MCP."""
         # Mock MCP client session
@@ -28,6 +28,8 @@ class TestMCPIntegration:
         
         mock_session.return_value.__aenter__.return_value = mock_session_instance
         
+        mock_client.return_value.__aenter__.return_value = (AsyncMock(), AsyncMock(), None)
+        
         # Test image generation endpoint
         image_data = {"prompt": "A beautiful sunset over mountains"}
         response = client.post("/images/generate", json=image_data, headers=auth_headers)
@@ -56,8 +58,8 @@ class TestMCPIntegration:
         assert image_history.image_url == "https://example.com/generated-image.jpg"
 
     @pytest.mark.asyncio
-    @patch('app.routes.image.streamablehttp_client')
-    @patch('app.routes.image.mcp.ClientSession')
+    @patch('app.mcp_pool.streamablehttp_client')
+    @patch('app.mcp_pool.mcp.ClientSession')
     async def test_mcp_connection_failure(self, mock_session, mock_client, client: TestClient, auth_headers: dict):
         """Test handling of MCP connection failures."""
         # Mock connection failure
@@ -72,8 +74,8 @@ class TestMCPIntegration:
         assert "Image generation failed" in response_data["detail"]
 
     @pytest.mark.asyncio
-    @patch('app.routes.image.streamablehttp_client')
-    @patch('app.routes.image.mcp.ClientSession')
+    @patch('app.mcp_pool.streamablehttp_client')
+    @patch('app.mcp_pool.mcp.ClientSession')
     async def test_mcp_no_tools_available(self, mock_session, mock_client, client: TestClient, auth_headers: dict):
         """Test handling when MCP server has no tools available."""
         # Mock MCP session with no tools
@@ -83,6 +85,8 @@ class TestMCPIntegration:
         
         mock_session.return_value.__aenter__.return_value = mock_session_instance
         
+        mock_client.return_value.__aenter__.return_value = (AsyncMock(), AsyncMock(), None)
+        
         image_data = {"prompt": "Test prompt"}
         response = client.post("/images/generate", json=image_data, headers=auth_headers)
         
@@ -92,8 +96,8 @@ class TestMCPIntegration:
         assert "No tools available from Flux MCP" in response_data["detail"]
 
     @pytest.mark.asyncio
-    @patch('app.routes.image.streamablehttp_client')
-    @patch('app.routes.image.mcp.ClientSession')
+    @patch('app.mcp_pool.streamablehttp_client')
+    @patch('app.mcp_pool.mcp.ClientSession')
     async def test_mcp_tool_execution_error(self, mock_session, mock_client, client: TestClient, auth_headers: dict):
         """Test handling of MCP tool execution errors."""
         # Mock MCP session with tool execution error
@@ -110,6 +114,8 @@ class TestMCPIntegration:
         
         mock_session.return_value.__aenter__.return_value = mock_session_instance
         
+        mock_client.return_value.__aenter__.return_value = (AsyncMock(), AsyncMock(), None)
+        
         image_data = {"prompt": "Test prompt"}
         response = client.post("/images/generate", json=image_data, headers=auth_headers)
         
@@ -119,8 +125,8 @@ class TestMCPIntegration:
         assert "No valid response from generateImageUrl" in response_data["detail"]
 
     @pytest.mark.asyncio
-    @patch('app.routes.image.streamablehttp_client')
-    @patch('app.routes.image.mcp.ClientSession')
+    @patch('app.mcp_pool.streamablehttp_client')
+    @patch('app.mcp_pool.mcp.ClientSession')
     async def test_mcp_invalid_response_format(self, mock_session, mock_client, client: TestClient, auth_headers: dict):
         """Test handling of invalid response format from MCP."""
         # Mock MCP session with invalid response format
@@ -137,6 +143,8 @@ class TestMCPIntegration:
         
         mock_session.return_value.__aenter__.return_value = mock_session_instance
         
+        mock_client.return_value.__aenter__.return_value = (AsyncMock(), AsyncMock(), None)
+        
         image_data = {"prompt": "Test prompt"}
         response = client.post("/images/generate", json=image_data, headers=auth_headers)
         
@@ -146,8 +154,8 @@ class TestMCPIntegration:
         assert "Image generation failed" in response_data["detail"]
 
     @pytest.mark.asyncio
-    @patch('app.routes.image.streamablehttp_client')
-    @patch('app.routes.image.mcp.ClientSession')
+    @patch('app.mcp_pool.streamablehttp_client')
+    @patch('app.mcp_pool.mcp.ClientSession')
     async def test_mcp_missing_image_url(self, mock_session, mock_client, client: TestClient, auth_headers: dict):
         """Test handling when MCP response is missing imageUrl."""
         # Mock MCP session with response missing imageUrl
@@ -164,6 +172,8 @@ class TestMCPIntegration:
         
         mock_session.return_value.__aenter__.return_value = mock_session_instance
         
+        mock_client.return_value.__aenter__.return_value = (AsyncMock(), AsyncMock(), None)
+        
         image_data = {"prompt": "Test prompt"}
         response = client.post("/images/generate", json=image_data, headers=auth_headers)
         
@@ -173,8 +183,8 @@ class TestMCPIntegration:
         assert "No imageUrl in response" in response_data["detail"]
 
     @pytest.mark.asyncio
-    @patch('app.routes.image.streamablehttp_client')
-    @patch('app.routes.image.mcp.ClientSession')
+    @patch('app.mcp_pool.streamablehttp_client')
+    @patch('app.mcp_pool.mcp.ClientSession')
     async def test_mcp_session_initialization_failure(self, mock_session, mock_client, client: TestClient, auth_headers: dict):
         """Test handling of MCP session initialization failures."""
         # Mock MCP session initialization failure
@@ -183,6 +193,8 @@ class TestMCPIntegration:
         
         mock_session.return_value.__aenter__.return_value = mock_session_instance
         
+        mock_client.return_value.__aenter__.return_value = (AsyncMock(), AsyncMock(), None)
+        
         image_data = {"prompt": "Test prompt"}
         response = client.post("/images/generate", json=image_data, headers=auth_headers)
         
@@ -192,8 +204,8 @@ class TestMCPIntegration:
         assert "Image generation failed" in response_data["detail"]
 
     @pytest.mark.asyncio
-    @patch('app.routes.image.streamablehttp_client')
-    @patch('app.routes.image.mcp.ClientSession')
+    @patch('app.mcp_pool.streamablehttp_client')
+    @patch('app.mcp_pool.mcp.ClientSession')
     async def test_mcp_empty_content_response(self, mock_session, mock_client, client: TestClient, auth_headers: dict):
         """Test handling of MCP response with empty content."""
         # Mock MCP session with empty content
@@ -210,6 +222,8 @@ class TestMCPIntegration:
         
         mock_session.return_value.__aenter__.return_value = mock_session_instance
         
+        mock_client.return_value.__aenter__.return_value = (AsyncMock(), AsyncMock(), None)
+        
         image_data = {"prompt": "Test prompt"}
         response = client.post("/images/generate", json=image_data, headers=auth_headers)
         
@@ -222,8 +236,8 @@ class TestMCPErrorHandling:
     """Test error handling in MCP integration."""
     
     @pytest.mark.asyncio
-    @patch('app.routes.image.streamablehttp_client')
-    @patch('app.routes.image.mcp.ClientSession')
+    @patch('app.mcp_pool.streamablehttp_client')
+    @patch('app.mcp_pool.mcp.ClientSession')
     async def test_mcp_network_timeout(self, mock_session, mock_client, client: TestClient, auth_headers: dict):
         """Test handling of network timeouts."""
         # Mock network timeout
@@ -238,8 +252,8 @@ class TestMCPErrorHandling:
         assert "Image generation failed" in response_data["detail"]
 
     @pytest.mark.asyncio
-    @patch('app.routes.image.streamablehttp_client')
-    @patch('app.routes.image.mcp.ClientSession')
+    @patch('app.mcp_pool.streamablehttp_client')
+    @patch('app.mcp_pool.mcp.ClientSession')
     async def test_mcp_authentication_failure(self, mock_session, mock_client, client: TestClient, auth_headers: dict):
         """Test handling of MCP authentication failures."""
         # Mock authentication failure
@@ -257,8 +271,8 @@ class TestMCPDataPersistence:
     """Test data persistence during MCP interactions."""
     
     @pytest.mark.asyncio
-    @patch('app.routes.image.streamablehttp_client')
-    @patch('app.routes.image.mcp.ClientSession')
+    @patch('app.mcp_pool.streamablehttp_client')
+    @patch('app.mcp_pool.mcp.ClientSession')
     async def test_image_history_persistence_on_success(self, mock_session, mock_client, client: TestClient, auth_headers: dict, db_session: Session):
         """Test that image history is properly persisted on successful generation."""
         # Mock successful MCP response
@@ -274,6 +288,8 @@ class TestMCPDataPersistence:
         
         mock_session.return_value.__aenter__.return_value = mock_session_instance
         
+        mock_client.return_value.__aenter__.return_value = (AsyncMock(), AsyncMock(), None)
+        
         # Generate image
         image_data = {"prompt": "Persistent test prompt"}
         response = client.post("/images/generate", json=image_data, headers=auth_headers)
@@ -290,8 +306,8 @@ class TestMCPDataPersistence:
         assert image_history.user_id is not None
 
     @pytest.mark.asyncio
-    @patch('app.routes.image.streamablehttp_client')
-    @patch('app.routes.image.mcp.ClientSession')
+    @patch('app.mcp_pool.streamablehttp_client')
+    @patch('app.mcp_pool.mcp.ClientSession')
     async def test_database_rollback_on_mcp_failure(self, mock_session, mock_client, client: TestClient, auth_headers: dict, db_session: Session):
         """Test that database changes are rolled back on MCP failures."""
         # Mock MCP failure after successful database operations
@@ -308,6 +324,8 @@ class TestMCPDataPersistence:
         
         mock_session.return_value.__aenter__.return_value = mock_session_instance
         
+        mock_client.return_value.__aenter__.return_value = (AsyncMock(), AsyncMock(), None)
+        
         # Count initial records
         initial_count = db_session.query(ImageHistory).count()
         
@@ -0,0 +1,60 @@
+import pytest
+from datetime import datetime
+from sqlalchemy import select
+from app.models import SearchHistory, ImageHistory
+from app.pagination import after_cursor, timeline_after_cursor
+from app.routes.dashboard import page_statement, timeline_statement
+
+CURSOR_TIME = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def query_plan(engine, stmt) -> str:
+    sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    return "\n".join(row[-1] for row in rows)
+
+
+@pytest.mark.parametrize("model", [SearchHistory, ImageHistory])
+class TestDashboardQueryPlans:
+    """Fail if dashboard queries stop being served by the per-user history indexes."""
+
+    def assert_uses_listing_index(self, plan: str, model):
+        assert f"USING INDEX ix_{model.__tablename__}_user_timestamp" in plan
+        # The index already yields rows in page order
+        assert "TEMP B-TREE" not in plan
+
+    def test_first_page(self, test_engine, model):
+        """Test that the first page is an index range scan with no sort."""
+        plan = query_plan(test_engine, page_statement(model, 1, 21))
+        self.assert_uses_listing_index(plan, model)
+
+    def test_cursor_page(self, test_engine, model):
+        """Test that a deep page seeks into the index instead of scanning past earlier rows."""
+        plan = query_plan(test_engine, page_statement(model, 1, 21, after_cursor(model, CURSOR_TIME, 500)))
+        self.assert_uses_listing_index(plan, model)
+        assert "timestamp<" in plan
+
+    def test_timeline_page(self, test_engine, model):
+        """Test the per-table timeline predicates."""
+        for kind in ("search", "image"):
+            predicate = timeline_after_cursor(model, kind, (CURSOR_TIME, "search", 500))
+            self.assert_uses_listing_index(query_plan(test_engine, page_statement(model, 1, 21, predicate)), model)
+
+    def test_single_entry_lookup(self, test_engine, model):
+        """Test that delete/patch lookups go through the primary key."""
+        stmt = select(model).where(model.id == 5, model.user_id == 1)
+        assert "INTEGER PRIMARY KEY" in query_plan(test_engine, stmt)
+
+
+class TestTimelineQueryPlan:
+    """The merged timeline must stay a pair of index range scans."""
+
+    @pytest.mark.parametrize("position", [None, (CURSOR_TIME, "search", 500), (CURSOR_TIME, "image", 500)])
+    def test_each_branch_uses_its_index(self, test_engine, position):
+        """Test that neither branch of the UNION ALL scans its table."""
+        plan = query_plan(test_engine, timeline_statement(1, 21, position))
+        assert "USING INDEX ix_search_history_user_timestamp" in plan
+        assert "USING INDEX ix_image_history_user_timestamp" in plan
+        assert "SCAN search_history" not in plan
+        assert "SCAN image_history" not in plan
@@ -0,0 +1,162 @@
+import pytest
+import asyncio
+import json
+import time
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.models import SearchHistory, SearchResult
+from datetime import datetime, timedelta, timezone
+from app.cache import ResultCache
+from app.history_compactor import HistoryCompactor
+from app.results_store import store_results
+from app.search_backend import SearchBackend, ThreadedSearchClient, normalize_query, search_backend
+
+RESULTS = [{"title": "Python", "href": "https://python.org", "body": "Python language"}]
+
+
+class TestNormalizeQuery:
+    """Test cases for search cache keys."""
+
+    def test_case_whitespace_and_unicode_are_normalized(self):
+        """Test that cosmetic differences map to one key."""
+        assert normalize_query("  Python   Tutorial ") == "python tutorial"
+        assert normalize_query("ＰＹＴＨＯＮ\ttutorial") == "python tutorial"
+        assert normalize_query("Straße") == normalize_query("STRASSE")
+
+
+class TestSearchCache:
+    """Integration tests for the shared search result cache."""
+
+    def test_repeated_queries_share_one_upstream_call(self, client: TestClient, auth_headers: dict, db_session: Session):
+        """Test that equivalent queries hit DuckDuckGo once but each writes history."""
+        before = client.get("/metrics").json()["search_cache"]
+        with patch('app.search_backend.DDGS') as mock_ddgs:
+            mock_ddgs.return_value.text.return_value = RESULTS
+            for query in ["Python tutorial", "python  tutorial", "PYTHON TUTORIAL"]:
+                response = client.get(f"/search/?query={query}", headers=auth_headers)
+                assert response.status_code == 200
+                assert response.json()["results"] == RESULTS
+
+        assert mock_ddgs.return_value.text.call_count == 1
+        assert db_session.query(SearchHistory).count() == 3
+        assert {(e.result_count, e.first_title) for e in db_session.query(SearchHistory)} == {(1, "Python")}
+        stats = client.get("/metrics").json()["search_cache"]
+        assert stats["hits"] - before["hits"] == 2
+        assert stats["misses"] - before["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_is_served_while_refreshed(self):
+        """Test stale-while-revalidate: the stale value is returned and replaced in the background."""
+        with patch('app.search_backend.DDGS') as mock_ddgs:
+            mock_ddgs.return_value.text.return_value = RESULTS
+            await search_backend.search("python")
+
+            fresh = [{"title": "New", "href": "https://example.com", "body": ""}]
+            mock_ddgs.return_value.text.return_value = fresh
+            with patch.object(search_backend.cache, "ttl", 0):
+                assert await search_backend.search("python") == RESULTS
+                for _ in range(50):
+                    if not search_backend.stats()["refreshing"]:
+                        break
+                    await asyncio.sleep(0.01)
+
+            assert await search_backend.search("python") == fresh
+        assert mock_ddgs.return_value.text.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_close_cancels_running_refreshes(self):
+        """Test that background refreshes are tracked until done and cancelled on close."""
+        def slow_fetch(query):
+            time.sleep(0.2)
+            return RESULTS
+
+        backend = SearchBackend(ThreadedSearchClient(slow_fetch, workers=1), ResultCache(max_bytes=10000, ttl=0, stale_ttl=60))
+        backend._store("python", RESULTS)
+        assert await backend.search("python") == RESULTS
+        assert len(backend._tasks) == 1
+        task = next(iter(backend._tasks))
+
+        await backend.close()
+        assert task.cancelled()
+        assert not backend._tasks
+
+
+class TestSearchFailures:
+    """Integration tests for search backend failures."""
+
+    def test_timeout_returns_504_without_history(self, client: TestClient, auth_headers: dict, db_session: Session):
+        """Test that a search past its deadline answers 504 and writes nothing."""
+        def slow_search(*args, **kwargs):
+            time.sleep(0.3)
+            return RESULTS
+
+        with patch('app.search_backend.DDGS') as mock_ddgs, patch.object(search_backend.client, "timeout", 0.05):
+            mock_ddgs.return_value.text.side_effect = slow_search
+            response = client.get("/search/?query=slow", headers=auth_headers)
+
+        assert response.status_code == 504
+        assert db_session.query(SearchHistory).count() == 0
+
+
+class TestSharedResultStorage:
+    """Integration tests for content-addressed search result rows."""
+
+    def test_identical_results_are_stored_once(self, client: TestClient, auth_headers: dict, admin_headers: dict, db_session: Session):
+        """Test that many users' identical results share one search_results row."""
+        with patch('app.search_backend.DDGS') as mock_ddgs:
+            mock_ddgs.return_value.text.return_value = RESULTS
+            history_ids = [
+                client.get("/search/?query=shared", headers=headers).json()["history_id"]
+                for headers in (auth_headers, admin_headers, auth_headers)
+            ]
+
+        assert db_session.query(SearchResult).count() == 1
+        entries = db_session.query(SearchHistory).all()
+        assert len({entry.results_hash for entry in entries}) == 1
+        assert all(entry.results is None for entry in entries)
+
+        detail = client.get(f"/dashboard/search/{history_ids[0]}", headers=auth_headers).json()
+        assert detail["results"] == RESULTS
+        legacy = client.get("/dashboard/", headers=admin_headers).json()
+        assert json.loads(legacy["searches"][0]["results"]) == RESULTS
+
+    @pytest.mark.asyncio
+    async def test_sweep_removes_only_unreferenced_results(self, session_factory, test_user, db_session: Session):
+        """Test that orphaned blobs are swept while referenced and recently used ones stay."""
+        old = datetime.now(timezone.utc) - timedelta(days=1)
+        db_session.add_all([
+            SearchResult(hash="referenced", results="[]", used_at=old),
+            SearchResult(hash="orphan", results="[]", used_at=old),
+            SearchResult(hash="legacy-orphan", results="[]"),
+            SearchResult(hash="just-stored", results="[]", used_at=datetime.now(timezone.utc)),
+        ])
+        db_session.commit()
+        db_session.add(SearchHistory(query="kept", results_hash="referenced", user_id=test_user.id))
+        db_session.commit()
+
+        compactor = HistoryCompactor(batch_size=1, pause=0, session_factory=session_factory)
+        assert await compactor.sweep_orphans() == 2
+
+        db_session.expire_all()
+        assert sorted(r.hash for r in db_session.query(SearchResult)) == ["just-stored", "referenced"]
+
+    @pytest.mark.asyncio
+    async def test_reuse_refreshes_used_at_only_when_stale(self, session_factory, db_session: Session):
+        """Test that storing known content leaves a recent used_at alone and renews an old one."""
+        async def store():
+            async with session_factory() as db:
+                digest = await store_results(db, "[]")
+                await db.commit()
+            db_session.expire_all()
+            return db_session.get(SearchResult, digest)
+
+        stored = await store()
+        recent = datetime.now(timezone.utc) - timedelta(seconds=30)
+        stored.used_at = recent
+        db_session.commit()
+        assert (await store()).used_at.replace(tzinfo=None) == recent.replace(tzinfo=None)
+
+        stored.used_at = datetime.now(timezone.utc) - timedelta(days=1)
+        db_session.commit()
+        assert (await store()).used_at.replace(tzinfo=None) > recent.replace(tzinfo=None)
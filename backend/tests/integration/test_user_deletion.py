@@ -0,0 +1,140 @@
+import pytest
+import asyncio
+import httpx
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.main import app
+from app.models import User, SearchHistory, ImageHistory, HistoryChange
+from app.user_purge import UserPurger, user_purger
+
+
+@pytest.fixture
+def history(db_session: Session, test_user: User):
+    for i in range(7):
+        db_session.add(SearchHistory(query=f"search {i}", results="[]", user_id=test_user.id))
+        db_session.add(ImageHistory(prompt=f"image {i}", image_url=f"https://example.com/{i}.jpg", user_id=test_user.id))
+        db_session.add(HistoryChange(user_id=test_user.id, kind="image", entry_id=i, op="upsert"))
+    db_session.commit()
+
+
+async def settle():
+    await asyncio.gather(*list(user_purger._tasks.values()))
+
+
+class TestUserDeletion:
+    """Integration tests for account deletion and the background history purge."""
+
+    @pytest.mark.asyncio
+    async def test_delete_account_revokes_access_and_purges(self, client, session_factory, auth_headers: dict, test_user: User, history, db_session: Session):
+        """Test that a deleted account stops authenticating and its history is removed."""
+        user_id = test_user.id
+        with patch.object(user_purger, "session_factory", session_factory):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as async_client:
+                assert (await async_client.get("/dashboard/searches", headers=auth_headers)).status_code == 200
+                response = await async_client.delete("/auth/me", headers=auth_headers)
+                assert response.status_code == 202
+                assert (await async_client.get("/dashboard/searches", headers=auth_headers)).status_code == 401
+                login = await async_client.post("/auth/token", data={"username": "testuser", "password": "testpass123"})
+                assert login.status_code == 401
+                await settle()
+
+        db_session.expire_all()
+        assert db_session.get(User, user_id) is None
+        assert db_session.query(SearchHistory).count() == 0
+        assert db_session.query(ImageHistory).count() == 0
+        assert db_session.query(HistoryChange).count() == 0
+
+    def test_admin_can_delete_users(self, client: TestClient, admin_headers: dict, auth_headers: dict, test_user: User, db_session: Session):
+        """Test that an admin deletion marks the account and a second one is a 404."""
+        with patch.object(user_purger, "schedule") as schedule:
+            response = client.delete(f"/admin/users/{test_user.id}", headers=admin_headers)
+            assert response.status_code == 202
+            schedule.assert_called_once_with(test_user.id)
+            assert client.delete(f"/admin/users/{test_user.id}", headers=admin_headers).status_code == 404
+
+        db_session.refresh(test_user)
+        assert test_user.deleted_at is not None
+        assert client.get("/dashboard/searches", headers=auth_headers).status_code == 401
+
+    def test_only_admins_delete_other_users(self, client: TestClient, auth_headers: dict, test_admin_user: User):
+        """Test that regular users cannot delete other accounts."""
+        assert client.delete(f"/admin/users/{test_admin_user.id}", headers=auth_headers).status_code == 403
+
+    @pytest.mark.asyncio
+    async def test_purge_runs_in_batches(self, session_factory, test_user: User, history, db_session: Session):
+        """Test that the purge removes rows a batch at a time."""
+        user_id = test_user.id
+        purger = UserPurger(batch_size=3, pause=0, session_factory=session_factory)
+        batches = []
+        delete_batch = purger._delete_batch
+
+        async def counting(model, key, predicate, user_id):
+            count = await delete_batch(model, key, predicate, user_id)
+            batches.append((model.__tablename__, count))
+            return count
+
+        purger._delete_batch = counting
+        db_session.query(User).filter_by(id=user_id).update({"deleted_at": datetime.now(timezone.utc)})
+        db_session.commit()
+        await purger.purge(user_id)
+
+        assert batches[:3] == [("search_history", 3), ("search_history", 3), ("search_history", 1)]
+        assert purger.stats()["rows_purged"] == 21
+        assert purger.stats()["users_purged"] == 1
+        db_session.expire_all()
+        assert db_session.query(User).filter_by(id=user_id).count() == 0
+
+    @pytest.mark.asyncio
+    async def test_resume_picks_up_deleted_users(self, session_factory, test_user: User, test_admin_user: User, db_session: Session):
+        """Test that accounts marked deleted before a restart are purged on startup."""
+        admin_id = test_admin_user.id
+        db_session.query(User).filter_by(id=test_user.id).update({"deleted_at": datetime.now(timezone.utc)})
+        db_session.commit()
+        purger = UserPurger(pause=0, session_factory=session_factory)
+
+        assert await purger.resume() == 1
+        await asyncio.gather(*list(purger._tasks.values()))
+
+        db_session.expire_all()
+        assert [user.id for user in db_session.query(User)] == [admin_id]
+
+    @pytest.mark.asyncio
+    async def test_claimed_user_is_purged_once(self, session_factory, test_user: User, history, db_session: Session):
+        """Test that a second purger waits on the first one's claim instead of purging too."""
+        user_id = test_user.id
+        db_session.query(User).filter_by(id=user_id).update({"deleted_at": datetime.now(timezone.utc)})
+        db_session.commit()
+        first = UserPurger(batch_size=3, pause=0, session_factory=session_factory)
+        second = UserPurger(batch_size=3, pause=0, session_factory=session_factory)
+
+        claims = []
+        delete_batch = first._delete_batch
+
+        async def contending(model, key, predicate, user_id):
+            claims.append(await second._claim(user_id))
+            return await delete_batch(model, key, predicate, user_id)
+
+        first._delete_batch = contending
+        await first.purge(user_id)
+        # Once the account is gone a late purge returns without waiting on the claim
+        await asyncio.wait_for(second.purge(user_id), timeout=1)
+
+        assert claims and not any(claims)
+        assert (first.stats()["users_purged"], first.stats()["rows_purged"]) == (1, 21)
+        assert (second.stats()["users_purged"], second.stats()["rows_purged"]) == (0, 0)
+
+    @pytest.mark.asyncio
+    async def test_stale_claim_is_taken_over(self, session_factory, test_user: User, db_session: Session):
+        """Test that a claim left by a dead worker can be taken once it times out."""
+        user_id = test_user.id
+        now = datetime.now(timezone.utc)
+        db_session.query(User).filter_by(id=user_id).update({"deleted_at": now, "purge_claimed_at": now})
+        db_session.commit()
+        purger = UserPurger(claim_timeout=60, session_factory=session_factory)
+
+        assert not await purger._claim(user_id)
+        db_session.query(User).filter_by(id=user_id).update({"purge_claimed_at": now - timedelta(minutes=2)})
+        db_session.commit()
+        assert await purger._claim(user_id)
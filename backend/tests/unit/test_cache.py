@@ -0,0 +1,96 @@
+import pytest
+import time
+from app.cache import TTLCache, ResultCache
+from app.auth_cache import PrincipalCache
+from app.schemas import CurrentUser
+
+class TestTTLCache:
+    """Test cases for the in-process TTL/LRU cache."""
+
+    def test_get_and_set(self):
+        """Test basic storage with hit and miss accounting."""
+        cache = TTLCache(maxsize=4, ttl=60)
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_entries_expire(self):
+        """Test that entries past their TTL are treated as misses."""
+        cache = TTLCache(maxsize=4, ttl=60)
+        cache.set("a", 1, ttl=-1)
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_least_recently_used_is_evicted(self):
+        """Test LRU eviction once maxsize is exceeded."""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert "a" in cache
+        assert "b" not in cache
+        assert cache.stats()["evictions"] == 1
+
+class TestResultCache:
+    """Test cases for the byte-bounded stale-while-revalidate cache."""
+
+    def test_fresh_then_stale_then_gone(self):
+        """Test that entries move from fresh to stale to expired."""
+        cache = ResultCache(max_bytes=100, ttl=60, stale_ttl=60)
+        cache.store("a", [1], size=10)
+        assert cache.lookup("a") == ([1], False)
+
+        cache.ttl = 0
+        assert cache.lookup("a") == ([1], True)
+
+        cache.stale_ttl = 0
+        assert cache.lookup("a") is None
+        assert cache.stats()["bytes"] == 0
+
+    def test_evicts_by_total_size(self):
+        """Test that least recently used entries are evicted to stay under max_bytes."""
+        cache = ResultCache(max_bytes=100, ttl=60, stale_ttl=60)
+        cache.store("a", "x", size=40)
+        cache.store("b", "y", size=40)
+        cache.lookup("a")
+        cache.store("c", "z", size=40)
+        assert cache.lookup("b") is None
+        assert cache.lookup("a") is not None
+        assert cache.stats()["bytes"] == 80
+        assert cache.stats()["evictions"] == 1
+
+    def test_oversized_value_is_not_stored(self):
+        """Test that a value larger than the whole cache is skipped."""
+        cache = ResultCache(max_bytes=10, ttl=60, stale_ttl=60)
+        cache.store("a", "x", size=11)
+        assert len(cache) == 0
+
+class TestPrincipalCache:
+    """Test cases for the authenticated-principal cache."""
+
+    def test_token_and_user_round_trip(self):
+        """Test that a remembered token resolves to the remembered user."""
+        cache = PrincipalCache(maxsize=10, ttl=60)
+        user = CurrentUser(id=1, username="alice", is_admin=False)
+        cache.remember_user(user)
+        cache.remember_token("token-1", "alice", time.time() + 300)
+        assert cache.get_username("token-1") == "alice"
+        assert cache.get_user("alice") == user
+
+    def test_expired_token_is_not_served(self):
+        """Test that tokens are never cached past their own expiry."""
+        cache = PrincipalCache(maxsize=10, ttl=60)
+        cache.remember_token("token-1", "alice", time.time() - 1)
+        assert cache.get_username("token-1") is None
+
+    def test_invalidate_user_by_id(self):
+        """Test that invalidating a user drops the principal and its tokens."""
+        cache = PrincipalCache(maxsize=10, ttl=60)
+        cache.remember_user(CurrentUser(id=7, username="bob", is_admin=False))
+        cache.remember_token("token-1", "bob", None)
+        cache.invalidate_user(user_id=7)
+        assert cache.get_user("bob") is None
+        assert cache.get_username("token-1") is None
@@ -0,0 +1,21 @@
+import pytest
+from app.database import async_database_url, sync_database_url
+
+class TestDatabaseURLs:
+    """Test driver selection for the async engine."""
+
+    @pytest.mark.parametrize("url,expected", [
+        ("postgresql://u:p@host/db", "postgresql+asyncpg://u:p@host/db"),
+        ("postgres://u:p@host/db", "postgresql+asyncpg://u:p@host/db"),
+        ("postgresql+psycopg2://u:p@host/db", "postgresql+asyncpg://u:p@host/db"),
+        ("postgresql+asyncpg://u:p@host/db", "postgresql+asyncpg://u:p@host/db"),
+        ("sqlite:///./test.db", "sqlite+aiosqlite:///./test.db"),
+    ])
+    def test_async_database_url(self, url, expected):
+        """Test that URLs are pointed at asyncio drivers."""
+        assert async_database_url(url) == expected
+
+    def test_sync_database_url(self):
+        """Test that migrations get a sync driver back."""
+        assert sync_database_url("postgresql+asyncpg://u:p@host/db") == "postgresql://u:p@host/db"
+        assert sync_database_url("sqlite+aiosqlite:///./test.db") == "sqlite:///./test.db"
@@ -0,0 +1,12 @@
+from app.history_versions import etag_matches
+
+
+class TestETagMatching:
+    """Test cases for If-None-Match comparison."""
+
+    def test_if_none_match_parsing(self):
+        """Test lists, weak validators and the wildcard."""
+        assert etag_matches('"a-1"', '"a-1"')
+        assert etag_matches('"b-2", W/"a-1"', '"a-1"')
+        assert etag_matches("*", '"a-1"')
+        assert not etag_matches('"a-2"', '"a-1"')
@@ -0,0 +1,114 @@
+import pytest
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.mcp_pool import MCPSessionPool
+
+
+def make_mcp_mocks(mock_session, mock_client, tools=None):
+    """Wire the patched transport and ClientSession to hand out fresh mock sessions."""
+    sessions = []
+
+    def new_session(*args, **kwargs):
+        session = AsyncMock()
+        session.list_tools = AsyncMock(return_value=MagicMock(tools=tools if tools is not None else [MagicMock()]))
+        sessions.append(session)
+        context = MagicMock()
+        context.__aenter__ = AsyncMock(return_value=session)
+        context.__aexit__ = AsyncMock(return_value=False)
+        return context
+
+    mock_session.side_effect = new_session
+    mock_client.return_value.__aenter__.return_value = (AsyncMock(), AsyncMock(), None)
+    return sessions
+
+
+class TestMCPSessionPool:
+    """Unit tests for the pooled MCP sessions."""
+
+    @pytest.mark.asyncio
+    @patch('app.mcp_pool.streamablehttp_client')
+    @patch('app.mcp_pool.mcp.ClientSession')
+    async def test_session_reused_between_calls(self, mock_session, mock_client):
+        """Test that the handshake runs once and later borrowers reuse the session."""
+        sessions = make_mcp_mocks(mock_session, mock_client)
+        pool = MCPSessionPool("http://mcp.test", size=2)
+
+        for _ in range(3):
+            async with pool.session() as conn:
+                await conn.session.call_tool(name="generateImageUrl", arguments={"prompt": "x"})
+
+        assert len(sessions) == 1
+        sessions[0].initialize.assert_called_once()
+        sessions[0].list_tools.assert_called_once()
+        assert sessions[0].call_tool.call_count == 3
+        assert pool.stats()["idle"] == 1
+        await pool.close()
+
+    @pytest.mark.asyncio
+    @patch('app.mcp_pool.streamablehttp_client')
+    @patch('app.mcp_pool.mcp.ClientSession')
+    async def test_failed_session_is_replaced(self, mock_session, mock_client):
+        """Test that a session that errors while borrowed is discarded and reconnected."""
+        sessions = make_mcp_mocks(mock_session, mock_client)
+        pool = MCPSessionPool("http://mcp.test", size=1)
+
+        with pytest.raises(RuntimeError):
+            async with pool.session() as conn:
+                raise RuntimeError("transport closed")
+
+        async with pool.session() as conn:
+            assert conn.session is sessions[1]
+
+        assert len(sessions) == 2
+        await pool.close()
+
+    @pytest.mark.asyncio
+    @patch('app.mcp_pool.streamablehttp_client')
+    @patch('app.mcp_pool.mcp.ClientSession')
+    async def test_stale_session_is_health_checked(self, mock_session, mock_client):
+        """Test that idle sessions past the health check interval are pinged and replaced on failure."""
+        sessions = make_mcp_mocks(mock_session, mock_client)
+        pool = MCPSessionPool("http://mcp.test", size=1, health_check_interval=0)
+
+        async with pool.session():
+            pass
+        sessions[0].send_ping = AsyncMock(side_effect=Exception("ping failed"))
+
+        async with pool.session() as conn:
+            assert conn.session is sessions[1]
+
+        assert pool.stats()["reconnects"] == 1
+        await pool.close()
+
+    @pytest.mark.asyncio
+    @patch('app.mcp_pool.streamablehttp_client')
+    @patch('app.mcp_pool.mcp.ClientSession')
+    async def test_pool_size_is_bounded(self, mock_session, mock_client):
+        """Test that concurrent borrowers never open more sessions than the pool size."""
+        sessions = make_mcp_mocks(mock_session, mock_client)
+        pool = MCPSessionPool("http://mcp.test", size=2)
+
+        async def borrow():
+            async with pool.session():
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(borrow() for _ in range(10)))
+
+        assert len(sessions) == 2
+        await pool.close()
+
+    @pytest.mark.asyncio
+    @patch('app.mcp_pool.streamablehttp_client')
+    @patch('app.mcp_pool.mcp.ClientSession')
+    async def test_tool_catalogue_is_cached(self, mock_session, mock_client):
+        """Test that the pool exposes the tools reported by the server."""
+        tool = MagicMock()
+        tool.name = "generateImageUrl"
+        make_mcp_mocks(mock_session, mock_client, tools=[tool])
+        pool = MCPSessionPool("http://mcp.test", size=1)
+
+        await pool.start()
+
+        assert pool.tool_names == ["generateImageUrl"]
+        assert pool.stats()["idle"] == 1
+        await pool.close()
@@ -0,0 +1,20 @@
+import json
+from datetime import datetime
+from app.raw_json import encode, splice_object
+
+
+class TestRawJSON:
+    """Test cases for splicing stored JSON into response bodies."""
+
+    def test_splice_keeps_raw_members_verbatim(self):
+        """Test that raw members are embedded as JSON values, not strings."""
+        body = splice_object({"id": 1, "query": "q"}, {"results": '[{"title": "a"}]'})
+        assert json.loads(body) == {"id": 1, "query": "q", "results": [{"title": "a"}]}
+
+    def test_splice_without_fields(self):
+        """Test an object made only of raw members."""
+        assert json.loads(splice_object({}, {"a": "[]", "b": "{}"})) == {"a": [], "b": {}}
+
+    def test_datetimes_match_fastapi_encoding(self):
+        """Test that timestamps are ISO 8601 strings."""
+        assert encode({"t": datetime(2024, 1, 2, 3, 4, 5)}) == '{"t":"2024-01-02T03:04:05"}'
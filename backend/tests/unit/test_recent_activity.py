@@ -0,0 +1,94 @@
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from app.recent_activity import RecentActivity
+
+BASE = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def image(entry_id: int, seconds: int, user_id: int = 1):
+    return SimpleNamespace(id=entry_id, prompt=f"image {entry_id}", image_url="https://example.com/x.jpg", timestamp=BASE + timedelta(seconds=seconds), user_id=user_id)
+
+
+class TestRecentActivityBuffer:
+    """Test cases for the per-user ring buffers."""
+
+    def test_head_misses_until_seeded(self):
+        """Test that only a seeded buffer answers, and only for as many rows as it holds."""
+        buffers = RecentActivity(capacity=3)
+        assert buffers.head(1, "image", 2, 0) is None
+
+        buffers.seed(buffers.begin_load(1), "image", [image(3, 3), image(2, 2), image(1, 1)], complete=False, seq=0)
+        assert [e.id for e in buffers.head(1, "image", 2, 0)] == [3, 2]
+        assert buffers.head(1, "image", 4, 0) is None
+        assert buffers.stats()["hits"] == 1
+
+    def test_complete_buffer_answers_any_count(self):
+        """Test that a buffer holding all of a user's rows answers larger pages too."""
+        buffers = RecentActivity(capacity=5)
+        buffers.seed(buffers.begin_load(1), "image", [image(1, 1)], complete=True, seq=0)
+        assert [e.id for e in buffers.head(1, "image", 21, 0)] == [1]
+
+    def test_record_keeps_newest_first_and_bounded(self):
+        """Test that new rows are inserted in order and the oldest falls off."""
+        buffers = RecentActivity(capacity=3)
+        buffers.seed(buffers.begin_load(1), "image", [image(2, 2), image(1, 1)], complete=True, seq=0)
+        buffers.record("image", image(4, 4))
+        buffers.record("image", image(3, 3))
+        assert [e.id for e in buffers.head(1, "image", 3, 0)] == [4, 3, 2]
+        assert buffers.head(1, "image", 4, 0) is None
+
+    def test_record_of_a_seeded_row_is_not_duplicated(self):
+        """Test that recording a row a load already picked up replaces it instead of adding it twice."""
+        buffers = RecentActivity(capacity=3)
+        buffers.seed(buffers.begin_load(1), "image", [image(7, 7), image(6, 6)], complete=True, seq=0)
+        buffers.record("image", image(7, 7))
+        assert [e.id for e in buffers.head(1, "image", 3, 0)] == [7, 6]
+
+        buffers.seed(buffers.begin_load(1), "image", [image(9, 9), image(8, 8), image(7, 7)], complete=False, seq=0)
+        buffers.record("image", image(8, 8))
+        assert [e.id for e in buffers.head(1, "image", 3, 0)] == [9, 8, 7]
+
+    def test_write_during_load_discards_the_seed(self):
+        """Test that rows read before a concurrent write are not installed."""
+        buffers = RecentActivity(capacity=3)
+        token = buffers.begin_load(1)
+        buffers.record("image", image(2, 2))
+        buffers.seed(token, "image", [image(1, 1)], complete=True, seq=0)
+        assert buffers.head(1, "image", 1, 0) is None
+
+    def test_users_are_evicted_lru(self):
+        """Test that the least recently used user goes first."""
+        buffers = RecentActivity(capacity=3, max_users=2)
+        for user_id in (1, 2):
+            buffers.seed(buffers.begin_load(user_id), "image", [], complete=True, seq=0)
+        buffers.head(1, "image", 1, 0)
+        buffers.seed(buffers.begin_load(3), "image", [], complete=True, seq=0)
+
+        assert buffers.head(2, "image", 1, 0) is None
+        assert buffers.head(1, "image", 1, 0) == []
+        assert buffers.stats()["evictions"] == 1
+
+    def test_buffer_answers_only_for_its_seq(self):
+        """Test that a read probing another change-log position misses."""
+        buffers = RecentActivity(capacity=3)
+        buffers.seed(buffers.begin_load(1), "image", [image(1, 1)], complete=True, seq=5)
+        assert [e.id for e in buffers.head(1, "image", 1, 5)] == [1]
+        assert buffers.head(1, "image", 1, 6) is None
+
+    def test_own_writes_advance_the_seq(self):
+        """Test that a write continuing from the buffered seq keeps every kind's buffer, and a gap drops them."""
+        buffers = RecentActivity(capacity=3)
+        buffers.seed(buffers.begin_load(1), "image", [image(1, 1)], complete=True, seq=5)
+        buffers.seed(buffers.begin_load(1), "search", [], complete=True, seq=5)
+
+        buffers.advance({1: (5, 7)})
+        buffers.record("image", image(2, 2))
+        assert [e.id for e in buffers.head(1, "image", 2, 7)] == [2, 1]
+        assert buffers.head(1, "search", 1, 7) == []
+
+        # Another worker wrote seq 8; this process's write at 9 can't vouch for it
+        buffers.advance({1: (8, 9)})
+        buffers.record("image", image(3, 3))
+        assert buffers.head(1, "image", 1, 9) is None
+        assert buffers.head(1, "search", 1, 9) is None
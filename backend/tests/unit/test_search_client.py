@@ -0,0 +1,86 @@
+import pytest
+import asyncio
+import threading
+import time
+from fastapi import HTTPException
+from app.search_backend import ThreadedSearchClient
+
+
+class TestThreadedSearchClient:
+    """Test cases for the async DuckDuckGo adapter."""
+
+    @pytest.mark.asyncio
+    async def test_blocking_search_does_not_block_the_loop(self):
+        """Test that the event loop keeps running while a search blocks its thread."""
+        release = threading.Event()
+
+        def slow_fetch(query):
+            release.wait(5)
+            return [{"title": query}]
+
+        client = ThreadedSearchClient(slow_fetch, workers=1, queue_limit=1, timeout=5)
+        search = asyncio.create_task(client("python"))
+        ticks = 0
+        while ticks < 5:
+            await asyncio.sleep(0.01)
+            ticks += 1
+        release.set()
+
+        assert await search == [{"title": "python"}]
+        client.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_deadline_raises_gateway_timeout(self):
+        """Test that a search past its deadline fails with 504."""
+        client = ThreadedSearchClient(lambda q: time.sleep(0.5) or [], workers=1, queue_limit=1, timeout=0.05)
+        with pytest.raises(HTTPException) as exc_info:
+            await client("slow")
+        assert exc_info.value.status_code == 504
+        assert client.stats()["timeouts"] == 1
+        client.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_saturated_executor_rejects_with_503(self):
+        """Test that searches beyond workers + queue_limit are rejected."""
+        release = threading.Event()
+        client = ThreadedSearchClient(lambda q: release.wait(5) and [], workers=1, queue_limit=1, timeout=5)
+        running = [asyncio.create_task(client(f"q{i}")) for i in range(2)]
+        await asyncio.sleep(0.05)
+        assert client.stats()["running"] == 1
+        assert client.stats()["queued"] == 1
+
+        with pytest.raises(HTTPException) as exc_info:
+            await client("one too many")
+        assert exc_info.value.status_code == 503
+
+        release.set()
+        await asyncio.gather(*running)
+        assert client.stats()["rejected"] == 1
+        client.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_search_leaves_the_queue(self):
+        """Test that cancelling a queued search stops it from ever running."""
+        release = threading.Event()
+        ran = []
+
+        def fetch(query):
+            ran.append(query)
+            release.wait(5)
+            return []
+
+        client = ThreadedSearchClient(fetch, workers=1, queue_limit=4, timeout=5)
+        first = asyncio.create_task(client("first"))
+        queued = asyncio.create_task(client("queued"))
+        await asyncio.sleep(0.05)
+        queued.cancel()
+        await asyncio.sleep(0.01)
+        assert client.stats()["queued"] == 0
+
+        release.set()
+        await first
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        assert ran == ["first"]
+        assert client.stats()["cancelled"] == 1
+        client.shutdown()
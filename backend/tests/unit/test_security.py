@@ -1,10 +1,13 @@
 import pytest
+import asyncio
 from datetime import datetime, timedelta
+from fastapi import HTTPException
 from app.security import (
     verify_password, 
     get_password_hash, 
     create_access_token, 
-    decode_access_token
+    decode_access_token,
+    PasswordHasher
 )
 from app.config import settings
 
@@ -213,4 +216,37 @@ class TestSecurityIntegration:
         # 4. Decode and verify admin token
         decoded = decode_access_token(token)
         assert decoded["sub"] == "adminuser"
-        assert decoded["is_admin"] is True
\ No newline at end of file
+        assert decoded["is_admin"] is True
+
+
+class TestPasswordHasher:
+    """Test the process-pool password service."""
+
+    @pytest.mark.asyncio
+    async def test_hash_and_verify_in_pool(self):
+        """Test hashing and verification round-trip through the process pool."""
+        hasher = PasswordHasher(workers=1, queue_limit=4)
+        try:
+            hashed = await hasher.hash("poolpass123")
+            assert hashed != "poolpass123"
+            assert await hasher.verify("poolpass123", hashed) is True
+            assert await hasher.verify("wrongpass", hashed) is False
+        finally:
+            hasher.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_saturated_pool_rejects_fast(self):
+        """Test that requests beyond the workers plus queue limit get 503 without waiting."""
+        hasher = PasswordHasher(workers=1, queue_limit=1)
+        try:
+            results = await asyncio.gather(
+                *(hasher.hash(f"pass{i}") for i in range(4)),
+                return_exceptions=True,
+            )
+            rejected = [r for r in results if isinstance(r, HTTPException)]
+            assert len(rejected) == 2
+            assert all(r.status_code == 503 for r in rejected)
+            assert hasher.stats()["rejected"] == 2
+            assert hasher.stats()["pending"] == 0
+        finally:
+            hasher.shutdown()
@@ -0,0 +1,129 @@
+import pytest
+import asyncio
+from app.singleflight import SingleFlight
+
+
+class TestSingleFlight:
+    """Test cases for request coalescing."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_one_call(self):
+        """Test that callers with the same key await a single execution."""
+        flight = SingleFlight()
+        calls = []
+        release = asyncio.Event()
+
+        async def fetch():
+            calls.append(1)
+            await release.wait()
+            return "result"
+
+        waiters = [asyncio.create_task(flight.do("key", fetch)) for _ in range(10)]
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await asyncio.gather(*waiters) == ["result"] * 10
+        assert len(calls) == 1
+        assert flight.stats() == {"in_flight": 0, "calls": 1, "coalesced": 9}
+
+    @pytest.mark.asyncio
+    async def test_different_keys_run_separately(self):
+        """Test that only identical keys are coalesced."""
+        flight = SingleFlight()
+
+        async def echo(value):
+            await asyncio.sleep(0)
+            return value
+
+        results = await asyncio.gather(flight.do("a", lambda: echo("a")), flight.do("b", lambda: echo("b")))
+        assert results == ["a", "b"]
+        assert flight.stats()["calls"] == 2
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_waiter(self):
+        """Test that a failed shared call raises in all callers and is not remembered."""
+        flight = SingleFlight()
+
+        async def boom():
+            await asyncio.sleep(0)
+            raise RuntimeError("upstream down")
+
+        results = await asyncio.gather(flight.do("k", boom), flight.do("k", boom), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert flight.stats()["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_others(self):
+        """Test that one caller going away leaves the shared call running."""
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return 42
+
+        first = asyncio.create_task(flight.do("k", fetch))
+        second = asyncio.create_task(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+
+        assert await second == 42
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    @pytest.mark.asyncio
+    async def test_last_waiter_leaving_cancels_the_call(self):
+        """Test that the shared call is cancelled once nobody is waiting for it."""
+        flight = SingleFlight()
+        started = asyncio.Event()
+        cancelled = []
+
+        async def fetch():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        waiter = asyncio.create_task(flight.do("k", fetch))
+        await started.wait()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0)
+
+        assert cancelled == [True]
+        assert flight.stats()["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_caller_after_cancellation_starts_a_new_call(self):
+        """Test that a caller arriving while an abandoned call winds down is not handed its cancellation."""
+        flight = SingleFlight()
+        started = asyncio.Event()
+        wound_down = asyncio.Event()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            if len(calls) == 1:
+                started.set()
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    # Slow cleanup keeps the cancelled call around for a while
+                    await asyncio.sleep(0.01)
+                    wound_down.set()
+                    raise
+            return "fresh"
+
+        waiter = asyncio.create_task(flight.do("k", fetch))
+        await started.wait()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert await flight.do("k", fetch) == "fresh"
+        assert len(calls) == 2
+        await wound_down.wait()